@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ligne de commande du projet iQuesta.
+
+Les commandes d'administration (users, criteria, applications, snapshot, stats, reset, runs, import)
+n'importent que database/user_database.py : elles démarrent sans charger
+Selenium. Le scraper n'est importé que par les commandes scrape et daemon.
+
+Exemples :
+    python cli.py users
+    python cli.py criteria --email votre@email.com --add "Développeur Python" "Auvergne-Rhône-Alpes"
+    python cli.py applications --email votre@email.com
+    python cli.py snapshot --email votre@email.com https://www.iquesta.com/offre/... -o offre.html
+    python cli.py stats
+    python cli.py reset --email votre@email.com --yes
+    python cli.py runs --trends
+    python cli.py import utilisateurs.csv
+    python cli.py scrape --email votre@email.com --headless
+    python cli.py daemon --workers 2 -- --headless
+"""
+
+import os
+import sys
+import csv
+import json
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Ajout du chemin racine pour les imports locaux
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+dotenv_path = os.path.join(project_root, '.env')
+
+# Chargement des variables d'environnement
+load_dotenv(dotenv_path=dotenv_path, override=True)
+
+from database.user_database import UserDatabase, chemin_base_de_donnees
+
+# Colonnes acceptées par la commande import (create_user)
+COLONNES_IMPORT = ('email', 'first_name', 'last_name', 'cv_path', 'lm_path',
+                   'search_query', 'location', 'contract_type')
+
+
+def _utilisateur(db, email):
+    user = db.get_user_by_email(email)
+    if not user:
+        print(f"Utilisateur '{email}' introuvable.")
+        sys.exit(1)
+    return user
+
+
+def commande_users(db, args):
+    users = db.list_users()
+    if not users:
+        print("Aucun utilisateur.")
+        return
+    for user in users:
+        print(f"{user['id']:>4}  {user['email']:<35} {user['first_name']} {user['last_name']}  "
+              f"| {user['search_query'] or '-'} / {user['location'] or '-'} / {user['contract_type'] or 'Tous'}  "
+              f"| {user['nb_applications']} candidatures")
+
+
+def commande_criteria(db, args):
+    user = _utilisateur(db, args.email)
+    if args.add:
+        recherche, lieu = args.add
+        if db.add_search_criteria(user['id'], recherche, lieu, args.contract_type) is None:
+            print("Critère déjà présent (ou erreur d'enregistrement).")
+    if args.remove is not None and not db.remove_search_criteria(user['id'], args.remove):
+        print(f"Critère #{args.remove} introuvable.")
+    for critere in db.get_search_criteria(user['id']):
+        identifiant = f"#{critere['id']}" if critere['id'] else "profil"
+        print(f"{identifiant:>7}  {critere['search_query']} / {critere['location']} / {critere['contract_type'] or 'Tous'}")
+
+
+def commande_applications(db, args):
+    user = _utilisateur(db, args.email)
+    applications = db.get_user_applications(user['id'])
+    if args.status:
+        applications = [a for a in applications if a['status'] == args.status]
+    for app in applications[:args.limit] if args.limit else applications:
+        print(f"{app['applied_at']}  {app['status'] or '-':<20} {app['job_title'] or '-'} "
+              f"({app['company'] or '-'})  {app['job_url']}")
+    print(f"{len(applications)} candidatures.")
+
+
+def commande_snapshot(db, args):
+    user = _utilisateur(db, args.email)
+    empreinte = db.get_snapshot_hash(user['id'], args.url)
+    if not empreinte:
+        print("Aucun instantané enregistré pour cette candidature.")
+        sys.exit(1)
+    # Import tardif : le magasin n'utilise que la bibliothèque standard
+    sys.path.insert(0, os.path.join(project_root, 'scraper'))
+    from instantanes import MagasinInstantanes, dossier_par_defaut
+    dossier = os.getenv('SNAPSHOTS_DIR') or dossier_par_defaut(chemin_base_de_donnees())
+    if not os.path.isabs(dossier):
+        dossier = os.path.join(project_root, dossier)
+    contenu = MagasinInstantanes(dossier).lire(empreinte)
+    if contenu is None:
+        print(f"Instantané {empreinte[:12]} absent du magasin {dossier} (supprimé par le plafond de taille ?).")
+        sys.exit(1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(contenu)
+        print(f"Instantané {empreinte[:12]} écrit dans {args.output}.")
+    else:
+        print(contenu)
+
+
+def commande_stats(db, args):
+    user_id = _utilisateur(db, args.email)['id'] if args.email else None
+    stats = db.get_stats(user_id)
+    if args.json:
+        print(json.dumps(stats, indent=2, ensure_ascii=False, default=str))
+        return
+    print(f"Candidatures : {stats['total']}")
+    for statut, nombre in sorted(stats['par_statut'].items(), key=lambda item: -item[1]):
+        print(f"  - {statut or '(sans statut)'}: {nombre}")
+    if stats['total']:
+        print(f"Période : {stats['premiere']} → {stats['derniere']}")
+
+
+def commande_reset(db, args):
+    user_id = _utilisateur(db, args.email)['id'] if args.email else None
+    cible = f"de {args.email}" if args.email else "de tous les utilisateurs"
+    if not args.yes:
+        reponse = input(f"Supprimer toutes les candidatures {cible} ? [o/N] ")
+        if reponse.strip().lower() not in ('o', 'oui', 'y', 'yes'):
+            print("Annulé.")
+            return
+    supprimees = db.reset_applications(user_id)
+    if supprimees is None:
+        sys.exit(1)
+    print(f"{supprimees} candidatures supprimées.")
+
+
+def commande_runs(db, args):
+    user_id = _utilisateur(db, args.email)['id'] if args.email else None
+    if args.trends:
+        for jour in db.get_run_trends(user_id, args.days):
+            etapes = ", ".join(f"{etape} {duree:.2f}s" for etape, duree in jour['stages'].items())
+            taux = f"{jour['success_rate']:.0%}" if jour['success_rate'] is not None else "-"
+            print(f"{jour['day']}  {jour['runs']} sessions  {jour['applied']} envoyées / {jour['failed']} échecs  "
+                  f"succès {taux}  {jour['seconds_per_offer'] or '-'} s/offre  | {etapes}")
+        return
+    for run in db.get_run_history(user_id, args.limit):
+        print(f"#{run['id']:<5} {run['started_at']}  utilisateur {run['user_id']}  {run['mode'] or '-':<12} "
+              f"{run['discovered']} découvertes, {run['applied']} envoyées, {run['failed']} échecs, "
+              f"{run['skipped']} ignorées, {run['restarts']} redémarrages  "
+              f"{run['duration'] or 0:.0f}s  [{run['exit_reason'] or 'en cours'}]")
+
+
+def _lire_import(chemin):
+    with open(chemin, encoding='utf-8', newline='') as f:
+        if chemin.lower().endswith('.json'):
+            lignes = json.load(f)
+            return lignes if isinstance(lignes, list) else [lignes]
+        return list(csv.DictReader(f))
+
+
+def commande_import(db, args):
+    crees = ignores = 0
+    for ligne in _lire_import(args.fichier):
+        valeurs = {colonne: (ligne.get(colonne) or None) for colonne in COLONNES_IMPORT}
+        if not valeurs['email']:
+            ignores += 1
+            continue
+        if db.create_user(**valeurs):
+            crees += 1
+        else:
+            ignores += 1
+    print(f"{crees} utilisateurs créés, {ignores} ignorés (email manquant ou déjà existant).")
+
+
+def commande_scrape(args):
+    # Import tardif : Selenium et webdriver_manager ne sont chargés que pour le scraping
+    sys.path.insert(0, os.path.join(project_root, 'scraper'))
+    import iquesta_scraper
+    iquesta_scraper.main(args.arguments)
+
+
+def commande_daemon(args):
+    sys.path.insert(0, os.path.join(project_root, 'scraper'))
+    import demon
+    demon.main(args.arguments)
+
+
+def construire_parser():
+    """Construit le parseur des sous-commandes."""
+    parser = argparse.ArgumentParser(description="Administration et lancement du scraper iQuesta.")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Affiche les logs de la base de données.")
+    sous_parsers = parser.add_subparsers(dest='commande', required=True)
+
+    sous_parsers.add_parser('users', help="Liste les utilisateurs.")
+
+    p = sous_parsers.add_parser('criteria', help="Liste, ajoute ou supprime les critères de recherche d'un utilisateur.")
+    p.add_argument('--email', required=True)
+    p.add_argument('--add', nargs=2, metavar=('RECHERCHE', 'LIEU'), help="Ajoute un critère (poste recherché et région).")
+    p.add_argument('--contract-type', help="Type de contrat du critère ajouté (CDI, Stage, Alternance...).")
+    p.add_argument('--remove', type=int, metavar='ID', help="Supprime le critère d'ID donné.")
+
+    p = sous_parsers.add_parser('applications', help="Liste les candidatures d'un utilisateur.")
+    p.add_argument('--email', required=True)
+    p.add_argument('--status', help="Filtre sur le statut (ex: 'Candidature envoyée').")
+    p.add_argument('--limit', type=int, help="Nombre maximal de lignes affichées.")
+
+    p = sous_parsers.add_parser('snapshot', help="Affiche la page de l'offre conservée pour une candidature (--snapshots).")
+    p.add_argument('--email', required=True)
+    p.add_argument('url', help="URL de l'offre (job_url de la candidature).")
+    p.add_argument('-o', '--output', help="Écrit la page HTML dans ce fichier.")
+
+    p = sous_parsers.add_parser('stats', help="Statistiques des candidatures.")
+    p.add_argument('--email', help="Limite les statistiques à cet utilisateur.")
+    p.add_argument('--json', action='store_true', help="Sortie JSON.")
+
+    p = sous_parsers.add_parser('reset', help="Supprime les candidatures.")
+    p.add_argument('--email', help="Limite la suppression à cet utilisateur.")
+    p.add_argument('--yes', action='store_true', help="Ne demande pas de confirmation.")
+
+    p = sous_parsers.add_parser('runs', help="Historique et tendances des sessions du scraper.")
+    p.add_argument('--email', help="Limite aux sessions de cet utilisateur.")
+    p.add_argument('--limit', type=int, default=20, help="Nombre de sessions affichées.")
+    p.add_argument('--trends', action='store_true', help="Agrégats quotidiens (s/offre, taux de succès, durée par étape).")
+    p.add_argument('--days', type=int, default=30, help="Fenêtre des tendances en jours.")
+
+    p = sous_parsers.add_parser('import', help="Importe des utilisateurs depuis un fichier CSV ou JSON.")
+    p.add_argument('fichier', help=f"Colonnes/clés : {', '.join(COLONNES_IMPORT)}")
+
+    p = sous_parsers.add_parser('scrape', help="Lance le scraper (arguments transmis à iquesta_scraper.py).")
+    p.add_argument('arguments', nargs=argparse.REMAINDER)
+
+    p = sous_parsers.add_parser('daemon', help="Planifie en continu les sessions de chaque utilisateur (arguments transmis à demon.py).")
+    p.add_argument('arguments', nargs=argparse.REMAINDER)
+    return parser
+
+
+COMMANDES = {
+    'users': commande_users,
+    'criteria': commande_criteria,
+    'applications': commande_applications,
+    'snapshot': commande_snapshot,
+    'stats': commande_stats,
+    'reset': commande_reset,
+    'runs': commande_runs,
+    'import': commande_import,
+}
+
+
+# Sous-commandes dont les arguments, options comprises, sont transmis tels quels au script
+COMMANDES_TRANSMISES = {
+    'scrape': commande_scrape,
+    'daemon': commande_daemon,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] and argv[0] in COMMANDES_TRANSMISES:
+        # argparse refuserait les options (--email...) placées devant le reste des arguments
+        COMMANDES_TRANSMISES[argv[0]](argparse.Namespace(arguments=argv[1:]))
+        return
+    args = construire_parser().parse_args(argv)
+    sys.path.insert(0, os.path.join(project_root, 'scraper'))
+    from journalisation import configurer_journalisation
+    # -v : détail des requêtes de la base (journalisées en DEBUG)
+    configurer_journalisation('DEBUG' if args.verbose else None)
+    if not args.verbose:
+        logging.getLogger('database.user_database').setLevel(logging.WARNING)
+    db = UserDatabase(chemin_base_de_donnees())
+    try:
+        COMMANDES[args.commande](db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,88 @@
 import os
 import json
+import time
 import sqlite3
+import functools
 from datetime import datetime
 import logging
 
 # Configuration du logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+def _chronometre(methode):
+    """Transmet la durée de chaque appel à l'observateur de la base, s'il est défini."""
+    @functools.wraps(methode)
+    def enveloppe(self, *args, **kwargs):
+        debut = time.monotonic()
+        try:
+            return methode(self, *args, **kwargs)
+        finally:
+            # Lu sur la classe : un seul observateur pour toutes les connexions
+            observateur = type(self).observateur
+            if observateur:
+                observateur(methode.__name__, time.monotonic() - debut)
+    return enveloppe
+
+# Racine du projet : un chemin de base relatif s'y rapporte
+RACINE_PROJET = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def chemin_base_de_donnees(chemin=None):
+    """
+    Chemin de la base SQLite : chemin, sinon DATABASE_PATH, sinon database/users.db.
+
+    Un chemin relatif se rapporte à la racine du projet, quel que soit le
+    répertoire courant (scraper, cli.py, démon).
+    """
+    db_path = chemin or os.getenv('DATABASE_PATH')
+    if not db_path:
+        return os.path.join(RACINE_PROJET, 'database', 'users.db')
+    if not os.path.isabs(db_path):
+        db_path = os.path.join(RACINE_PROJET, db_path)
+    return db_path
+
+# Insertion ou mise à jour d'une ligne de applications (même URL pour le même
+# utilisateur) ; le statut 'Candidature envoyée' n'est jamais remplacé, un
+# passage ultérieur ('Déjà postulé', 'Doublon') ne remplace que la réservation
+# 'En cours', et un champ vide ne remplace pas celui déjà enregistré
+UPSERT_CANDIDATURE = '''
+INSERT INTO applications (user_id, job_url, job_title, company, location, description, status, simhash, snapshot_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id, job_url) DO UPDATE SET
+    job_title = COALESCE(NULLIF(excluded.job_title, ''), applications.job_title),
+    company = COALESCE(NULLIF(excluded.company, ''), applications.company),
+    location = COALESCE(NULLIF(excluded.location, ''), applications.location),
+    description = COALESCE(NULLIF(excluded.description, ''), applications.description),
+    status = CASE
+        WHEN applications.status = 'Candidature envoyée' THEN applications.status
+        WHEN excluded.status IN ('Déjà postulé', 'Doublon') AND applications.status <> 'En cours'
+            THEN applications.status
+        ELSE excluded.status
+    END,
+    simhash = COALESCE(excluded.simhash, applications.simhash),
+    snapshot_hash = COALESCE(excluded.snapshot_hash, applications.snapshot_hash)
+'''
+
 class UserDatabase:
     """Gère les interactions avec la base de données utilisateurs et candidatures."""
     
+    # Fonction observateur(nom_methode, duree) appelée après chaque méthode chronométrée
+    observateur = None
+    
     def __init__(self, db_path=None):
         """Initialise la connexion à la base de données."""
-        logger.info("========== DB : INITIALISATION DE LA CONNEXION ==========")
+        logger.debug("========== DB : INITIALISATION DE LA CONNEXION ==========")
         if not db_path:
             # Utilise le chemin spécifié dans .env, ou le chemin par défaut
             db_path = os.getenv('DATABASE_PATH', os.path.join(os.path.dirname(__file__), 'users.db'))
-            logger.info(f"Chemin de base de données utilisé: {db_path}")
+            logger.debug(f"Chemin de base de données utilisé: {db_path}")
         
         directory = os.path.dirname(db_path)
         if directory and not os.path.exists(directory):
             logger.info(f"Création du répertoire {directory}")
             os.makedirs(directory)
             
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=30)
         self.conn.row_factory = sqlite3.Row  # Pour pouvoir accéder aux colonnes par nom
         self.cursor = self.conn.cursor()
         self._create_tables_if_not_exist()
@@ -59,6 +117,64 @@ class UserDatabase:
             description TEXT,
             status TEXT,
             applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            simhash INTEGER,
+            snapshot_hash TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(user_id, job_url)
+        )
+        ''')
+        # Bases créées avant l'ajout de l'empreinte de contenu
+        self._ajouter_colonne('applications', 'simhash', 'INTEGER')
+        self._ajouter_colonne('applications', 'snapshot_hash', 'TEXT')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_applications_user_simhash ON applications (user_id, simhash)')
+        
+        # Table des sessions du scraper (historique et performances)
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ended_at TIMESTAMP,
+            search_query TEXT,
+            location TEXT,
+            contract_type TEXT,
+            mode TEXT,
+            discovered INTEGER DEFAULT 0,
+            skipped INTEGER DEFAULT 0,
+            applied INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            restarts INTEGER DEFAULT 0,
+            duration REAL,
+            stage_timings TEXT,
+            exit_reason TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_runs_user_started ON runs (user_id, started_at)')
+        
+        # Critères de recherche supplémentaires (plusieurs métiers/régions par utilisateur)
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_criteria (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            search_query TEXT,
+            location TEXT,
+            contract_type TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(user_id, search_query, location, contract_type)
+        )
+        ''')
+        
+        # File des offres restant à traiter (sessions arrêtées par leur budget)
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS offer_queue (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            job_url TEXT,
+            position INTEGER,
+            run_id INTEGER,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id),
             UNIQUE(user_id, job_url)
         )
@@ -66,6 +182,14 @@ class UserDatabase:
         
         self.conn.commit()
     
+    def _ajouter_colonne(self, table, colonne, type_colonne):
+        """Ajoute une colonne à une table existante si elle est absente."""
+        self.cursor.execute(f'PRAGMA table_info({table})')
+        if colonne not in [row['name'] for row in self.cursor.fetchall()]:
+            logger.info(f"Migration : ajout de la colonne {table}.{colonne}")
+            self.cursor.execute(f'ALTER TABLE {table} ADD COLUMN {colonne} {type_colonne}')
+    
+    @_chronometre
     def create_user(self, email, first_name, last_name, cv_path, lm_path, search_query=None, location=None, contract_type=None):
         """Crée un nouvel utilisateur dans la base de données."""
         try:
@@ -84,10 +208,11 @@ class UserDatabase:
             self.conn.rollback()
             return None
     
+    @_chronometre
     def get_user_by_email(self, email):
         """Récupère les informations d'un utilisateur par son email."""
-        logger.info("========== DB : RECHERCHE D'UTILISATEUR ==========")
-        logger.info(f"Recherche de l'utilisateur par email: {email}")
+        logger.debug("========== DB : RECHERCHE D'UTILISATEUR ==========")
+        logger.debug(f"Recherche de l'utilisateur par email: {email}")
         try:
             self.cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
             user = self.cursor.fetchone()
@@ -95,7 +220,7 @@ class UserDatabase:
                 # Convertir le résultat en dictionnaire
                 columns = [column[0] for column in self.cursor.description]
                 user_dict = {columns[i]: user[i] for i in range(len(columns))}
-                logger.info(f"Utilisateur trouvé: ID={user_dict['id']}, {user_dict['first_name']} {user_dict['last_name']}")
+                logger.debug(f"Utilisateur trouvé: ID={user_dict['id']}, {user_dict['first_name']} {user_dict['last_name']}")
                 return user_dict
             else:
                 logger.warning(f"Aucun utilisateur trouvé avec l'email {email}")
@@ -104,6 +229,7 @@ class UserDatabase:
             logger.error(f"Erreur lors de la récupération de l'utilisateur: {e}")
             return None
     
+    @_chronometre
     def update_user(self, user_id, **kwargs):
         """Met à jour les informations d'un utilisateur."""
         if not kwargs:
@@ -124,55 +250,198 @@ class UserDatabase:
             self.conn.rollback()
             return False
     
+    @_chronometre
     def record_application(self, user_id, offer_details):
-        """Enregistre une candidature dans la base de données."""
-        logger.info("========== DB : ENREGISTREMENT DE CANDIDATURE ==========")
-        logger.info(f"Enregistrement pour utilisateur ID: {user_id}")
-        logger.info(f"Détails de l'offre: Titre='{offer_details.get('Titre')}', Entreprise='{offer_details.get('Entreprise')}', Statut='{offer_details.get('Statut')}'")
+        """
+        Enregistre le résultat du traitement d'une offre (candidature, doublon, échec...).
+
+        Une ligne existante pour la même URL (réservation 'En cours', passage
+        précédent) est mise à jour, sauf son statut s'il vaut déjà
+        'Candidature envoyée' : un passage ultérieur ne doit pas faire oublier
+        la candidature, ni la retirer de la détection des offres republiées
+        (find_near_duplicate). De même, 'Déjà postulé' et 'Doublon' ne
+        remplacent qu'une réservation 'En cours' : un échec reste un échec.
+
+        Returns:
+            bool: True si l'enregistrement a réussi, False sinon
+        """
+        logger.debug("========== DB : ENREGISTREMENT DE CANDIDATURE ==========")
+        logger.debug(f"Enregistrement pour utilisateur ID: {user_id}")
+        logger.debug(f"Détails de l'offre: Titre='{offer_details.get('Titre')}', Entreprise='{offer_details.get('Entreprise')}', Statut='{offer_details.get('Statut')}'")
         try:
-            self.cursor.execute('''
-            INSERT INTO applications (user_id, job_url, job_title, company, location, description, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.cursor.execute(UPSERT_CANDIDATURE, (
                 user_id,
                 offer_details.get('Lien', ''),
                 offer_details.get('Titre', ''),
                 offer_details.get('Entreprise', ''),
                 offer_details.get('Lieu', ''),
                 offer_details.get('Description', ''),
-                offer_details.get('Statut', '')
+                offer_details.get('Statut', ''),
+                offer_details.get('Empreinte'),
+                offer_details.get('Instantane')
             ))
             self.conn.commit()
-            logger.info(f"Candidature enregistrée pour le poste: {offer_details.get('Titre')} chez {offer_details.get('Entreprise')}")
+            logger.debug(f"Offre enregistrée ({offer_details.get('Statut')}): {offer_details.get('Titre')} chez {offer_details.get('Entreprise')}")
             return True
-        except sqlite3.IntegrityError:
-            logger.info(f"Cette candidature a déjà été enregistrée (utilisateur {user_id}, URL {offer_details.get('Lien')})")
-            return False
         except Exception as e:
             logger.error(f"Erreur lors de l'enregistrement de la candidature: {e}")
             self.conn.rollback()
             return False
     
+    @_chronometre
     def check_if_applied(self, user_id, job_url):
         """Vérifie si un utilisateur a déjà postulé à une offre."""
-        logger.info("========== DB : VÉRIFICATION DE CANDIDATURE ==========")
-        logger.info(f"Vérification pour utilisateur ID: {user_id}")
-        logger.info(f"URL de l'offre: {job_url}")
+        logger.debug("========== DB : VÉRIFICATION DE CANDIDATURE ==========")
+        logger.debug(f"Vérification pour utilisateur ID: {user_id}")
+        logger.debug(f"URL de l'offre: {job_url}")
         try:
             self.cursor.execute('SELECT COUNT(*) FROM applications WHERE user_id = ? AND job_url = ?', 
                                (user_id, job_url))
             count = self.cursor.fetchone()[0]
             result = count > 0
-            logger.info(f"Résultat de la vérification: {result} (count={count})")
+            logger.debug(f"Résultat de la vérification: {result} (count={count})")
             return result
         except Exception as e:
             logger.error(f"Erreur lors de la vérification de candidature: {e}")
             return False
     
+    @_chronometre
+    def claim_application(self, user_id, job_url):
+        """
+        Réserve une offre pour un utilisateur avant d'y postuler.
+
+        Insère une ligne 'En cours' si aucune candidature n'existe pour cette URL.
+        Plusieurs processus peuvent appeler cette méthode en concurrence : un seul
+        obtient la réservation.
+
+        Returns:
+            bool: True si l'offre a été réservée par cet appel, False sinon
+        """
+        try:
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO applications (user_id, job_url, status)
+            VALUES (?, ?, 'En cours')
+            ''', (user_id, job_url))
+            self.conn.commit()
+            return self.cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Erreur lors de la réservation de l'offre {job_url}: {e}")
+            self.conn.rollback()
+            return False
+    
+    @_chronometre
+    def release_application(self, user_id, job_url):
+        """Annule la réservation 'En cours' d'une offre (claim_application) à laquelle on n'a pas postulé."""
+        try:
+            self.cursor.execute('''
+            DELETE FROM applications WHERE user_id = ? AND job_url = ? AND status = 'En cours'
+            ''', (user_id, job_url))
+            self.conn.commit()
+            return self.cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Erreur lors de la libération de l'offre {job_url}: {e}")
+            self.conn.rollback()
+            return False
+    
+    @_chronometre
+    def release_stale_claims(self, user_id, max_age_seconds):
+        """
+        Supprime les réservations 'En cours' plus anciennes que max_age_seconds.
+
+        Un processus arrêté brutalement entre claim_application et l'enregistrement
+        du résultat laisse sa réservation : sans expiration, l'offre resterait
+        bloquée pour toutes les sessions suivantes.
+
+        Returns:
+            int: Nombre de réservations supprimées
+        """
+        try:
+            self.cursor.execute('''
+            DELETE FROM applications
+            WHERE user_id = ? AND status = 'En cours' AND applied_at < datetime('now', ?)
+            ''', (user_id, f'-{int(max_age_seconds)} seconds'))
+            self.conn.commit()
+            return self.cursor.rowcount
+        except Exception as e:
+            logger.error(f"Erreur lors de l'expiration des réservations: {e}")
+            self.conn.rollback()
+            return 0
+    
+    @_chronometre
+    def find_near_duplicate(self, user_id, simhash, max_distance, job_url=None):
+        """
+        Cherche une offre à laquelle l'utilisateur a déjà postulé et dont le contenu
+        est quasi identique (distance de Hamming des empreintes <= max_distance).
+
+        Args:
+            user_id: ID de l'utilisateur
+            simhash: Empreinte de l'offre examinée
+            max_distance: Nombre maximal de bits différents
+            job_url: URL de l'offre examinée (exclue de la recherche)
+
+        Returns:
+            dict: {'job_url', 'job_title', 'company', 'distance'} de l'offre la plus proche, ou None
+        """
+        if simhash is None or max_distance < 0:
+            return None
+        try:
+            # Comparaison en Python de toutes les empreintes des candidatures de l'utilisateur
+            self.cursor.execute('''
+            SELECT job_url, job_title, company, simhash FROM applications
+            WHERE user_id = ? AND simhash IS NOT NULL AND status = 'Candidature envoyée' AND job_url != ?
+            ''', (user_id, job_url or ''))
+            plus_proche = None
+            for row in self.cursor.fetchall():
+                distance = bin((row['simhash'] ^ simhash) & 0xFFFFFFFFFFFFFFFF).count('1')
+                if distance <= max_distance and (plus_proche is None or distance < plus_proche['distance']):
+                    plus_proche = {'job_url': row['job_url'], 'job_title': row['job_title'],
+                                   'company': row['company'], 'distance': distance}
+            return plus_proche
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de doublons: {e}")
+            return None
+    
+    @_chronometre
+    def get_snapshot_hash(self, user_id, job_url):
+        """Clé de l'instantané de la page d'une candidature (magasin d'instantanés), ou None."""
+        try:
+            self.cursor.execute('SELECT snapshot_hash FROM applications WHERE user_id = ? AND job_url = ?',
+                                (user_id, job_url))
+            row = self.cursor.fetchone()
+            return row['snapshot_hash'] if row else None
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'instantané: {e}")
+            return None
+    
+    @_chronometre
+    def get_job_descriptions(self, job_urls):
+        """
+        Descriptions déjà enregistrées (tous utilisateurs confondus) pour ces URLs.
+
+        Returns:
+            dict: {job_url: description}
+        """
+        descriptions = {}
+        job_urls = list(job_urls)
+        try:
+            # Par lots pour rester sous la limite de paramètres de SQLite
+            for debut in range(0, len(job_urls), 500):
+                lot = job_urls[debut:debut + 500]
+                self.cursor.execute(f'''
+                SELECT job_url, description FROM applications
+                WHERE job_url IN ({', '.join('?' * len(lot))}) AND description IS NOT NULL AND description != ''
+                ''', lot)
+                descriptions.update({row['job_url']: row['description'] for row in self.cursor.fetchall()})
+            return descriptions
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des descriptions: {e}")
+            return {}
+    
+    @_chronometre
     def get_user_applications(self, user_id):
         """Récupère toutes les candidatures d'un utilisateur."""
-        logger.info("========== DB : LISTE DES CANDIDATURES ==========")
-        logger.info(f"Récupération des candidatures pour l'utilisateur ID: {user_id}")
+        logger.debug("========== DB : LISTE DES CANDIDATURES ==========")
+        logger.debug(f"Récupération des candidatures pour l'utilisateur ID: {user_id}")
         try:
             self.cursor.execute('''
             SELECT * FROM applications
@@ -181,12 +450,331 @@ class UserDatabase:
             ''', (user_id,))
             applications = self.cursor.fetchall()
             result = [dict(app) for app in applications]
-            logger.info(f"Nombre de candidatures trouvées: {len(result)}")
+            logger.debug(f"Nombre de candidatures trouvées: {len(result)}")
             return result
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des candidatures: {e}")
             return []
     
+    @_chronometre
+    def list_users(self):
+        """Liste les utilisateurs avec leur nombre de candidatures."""
+        try:
+            self.cursor.execute('''
+            SELECT u.*, COUNT(a.id) AS nb_applications
+            FROM users u
+            LEFT JOIN applications a ON a.user_id = u.id
+            GROUP BY u.id
+            ORDER BY u.id
+            ''')
+            return [dict(row) for row in self.cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des utilisateurs: {e}")
+            return []
+    
+    @_chronometre
+    def get_stats(self, user_id=None):
+        """
+        Statistiques des candidatures, globales ou pour un utilisateur.
+
+        Returns:
+            dict: {'total': n, 'par_statut': {statut: n}, 'premiere': date, 'derniere': date}
+        """
+        filtre, parametres = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        try:
+            self.cursor.execute(f'''
+            SELECT status, COUNT(*) AS nombre, MIN(applied_at) AS premiere, MAX(applied_at) AS derniere
+            FROM applications {filtre}
+            GROUP BY status
+            ''', parametres)
+            lignes = self.cursor.fetchall()
+            return {
+                'total': sum(ligne['nombre'] for ligne in lignes),
+                'par_statut': {ligne['status'] or '': ligne['nombre'] for ligne in lignes},
+                'premiere': min((ligne['premiere'] for ligne in lignes), default=None),
+                'derniere': max((ligne['derniere'] for ligne in lignes), default=None),
+            }
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des statistiques: {e}")
+            return {'total': 0, 'par_statut': {}, 'premiere': None, 'derniere': None}
+    
+    @_chronometre
+    def reset_applications(self, user_id=None):
+        """
+        Supprime les candidatures, de tous les utilisateurs ou d'un seul.
+
+        Returns:
+            int: Nombre de candidatures supprimées, ou None en cas d'erreur
+        """
+        try:
+            if user_id is None:
+                self.cursor.execute('DELETE FROM applications')
+            else:
+                self.cursor.execute('DELETE FROM applications WHERE user_id = ?', (user_id,))
+            self.conn.commit()
+            logger.info(f"{self.cursor.rowcount} candidatures supprimées.")
+            return self.cursor.rowcount
+        except Exception as e:
+            logger.error(f"Erreur lors de la réinitialisation des candidatures: {e}")
+            self.conn.rollback()
+            return None
+    
+    @_chronometre
+    def start_run(self, user_id, search_query=None, location=None, contract_type=None, mode=None):
+        """Enregistre le début d'une session du scraper. Retourne l'ID de la session."""
+        try:
+            self.cursor.execute('''
+            INSERT INTO runs (user_id, search_query, location, contract_type, mode)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, search_query, location, contract_type, mode))
+            self.conn.commit()
+            return self.cursor.lastrowid
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de la session: {e}")
+            self.conn.rollback()
+            return None
+    
+    @_chronometre
+    def finish_run(self, run_id, resume, exit_reason):
+        """
+        Clôt une session avec son résumé.
+
+        Args:
+            run_id: ID retourné par start_run
+            resume: Résumé de main() (compteurs, 'duree', 'etapes')
+            exit_reason: Motif de fin ('termine', 'aucune_offre', 'erreur: ...')
+        """
+        try:
+            self.cursor.execute('''
+            UPDATE runs SET ended_at = CURRENT_TIMESTAMP, discovered = ?, skipped = ?, applied = ?,
+                failed = ?, restarts = ?, duration = ?, stage_timings = ?, exit_reason = ?
+            WHERE id = ?
+            ''', (
+                resume.get('decouvertes', 0),
+                resume.get('deja_postule', 0) + resume.get('doublons', 0),
+                resume.get('envoyees', 0),
+                resume.get('echecs', 0),
+                resume.get('redemarrages', 0),
+                resume.get('duree'),
+                json.dumps(resume.get('etapes', {})),
+                exit_reason,
+                run_id,
+            ))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de la clôture de la session {run_id}: {e}")
+            self.conn.rollback()
+            return False
+    
+    @_chronometre
+    def get_run_history(self, user_id=None, limit=20):
+        """Dernières sessions (toutes ou d'un utilisateur), les plus récentes d'abord."""
+        filtre, parametres = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        try:
+            self.cursor.execute(f'''
+            SELECT * FROM runs {filtre}
+            ORDER BY started_at DESC, id DESC
+            LIMIT ?
+            ''', parametres + (limit,))
+            runs = []
+            for row in self.cursor.fetchall():
+                run = dict(row)
+                run['stage_timings'] = json.loads(run['stage_timings']) if run['stage_timings'] else {}
+                runs.append(run)
+            return runs
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'historique des sessions: {e}")
+            return []
+    
+    @_chronometre
+    def get_run_trends(self, user_id=None, days=30):
+        """
+        Tendance quotidienne des sessions terminées sur les derniers jours.
+
+        Returns:
+            list: Un dict par jour (le plus récent d'abord) : runs, discovered, applied, failed,
+            avg_duration, seconds_per_offer, success_rate et stages (durée moyenne par passage)
+        """
+        filtre, parametres = ('AND user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        try:
+            self.cursor.execute(f'''
+            SELECT date(started_at) AS day, duration, discovered, skipped, applied, failed, stage_timings
+            FROM runs
+            WHERE ended_at IS NOT NULL AND started_at >= datetime('now', ?) {filtre}
+            ORDER BY started_at
+            ''', (f'-{int(days)} days',) + parametres)
+            jours = {}
+            for row in self.cursor.fetchall():
+                jour = jours.setdefault(row['day'], {'day': row['day'], 'runs': 0, 'discovered': 0, 'skipped': 0,
+                                                     'applied': 0, 'failed': 0, 'duration': 0.0, 'stages': {}})
+                jour['runs'] += 1
+                for colonne in ('discovered', 'skipped', 'applied', 'failed'):
+                    jour[colonne] += row[colonne] or 0
+                jour['duration'] += row['duration'] or 0.0
+                for etape, mesure in json.loads(row['stage_timings'] or '{}').items():
+                    cumul = jour['stages'].setdefault(etape, [0.0, 0])
+                    cumul[0] += mesure.get('total', 0.0)
+                    cumul[1] += mesure.get('passages', 0)
+            tendances = []
+            for jour in sorted(jours.values(), key=lambda j: j['day'], reverse=True):
+                offres = jour['applied'] + jour['failed'] + jour['skipped']
+                tentatives = jour['applied'] + jour['failed']
+                tendances.append({
+                    'day': jour['day'],
+                    'runs': jour['runs'],
+                    'discovered': jour['discovered'],
+                    'applied': jour['applied'],
+                    'failed': jour['failed'],
+                    'avg_duration': round(jour['duration'] / jour['runs'], 1),
+                    'seconds_per_offer': round(jour['duration'] / offres, 2) if offres else None,
+                    'success_rate': round(jour['applied'] / tentatives, 3) if tentatives else None,
+                    'stages': {etape: round(total / passages, 3) for etape, (total, passages) in jour['stages'].items() if passages},
+                })
+            return tendances
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des tendances des sessions: {e}")
+            return []
+    
+    @_chronometre
+    def add_search_criteria(self, user_id, search_query, location, contract_type=None):
+        """Ajoute un critère de recherche à l'utilisateur. Retourne son ID (None s'il existe déjà)."""
+        try:
+            self.cursor.execute('''
+            INSERT OR IGNORE INTO search_criteria (user_id, search_query, location, contract_type)
+            VALUES (?, ?, ?, ?)
+            ''', (user_id, search_query, location, contract_type))
+            self.conn.commit()
+            return self.cursor.lastrowid if self.cursor.rowcount == 1 else None
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ajout du critère de recherche: {e}")
+            self.conn.rollback()
+            return None
+    
+    @_chronometre
+    def remove_search_criteria(self, user_id, criteria_id):
+        """Supprime un critère de recherche de l'utilisateur."""
+        try:
+            self.cursor.execute('DELETE FROM search_criteria WHERE id = ? AND user_id = ?', (criteria_id, user_id))
+            self.conn.commit()
+            return self.cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Erreur lors de la suppression du critère de recherche: {e}")
+            self.conn.rollback()
+            return False
+    
+    @_chronometre
+    def get_search_criteria(self, user_id):
+        """
+        Critères de recherche de l'utilisateur : celui du profil (table users) en premier,
+        puis les critères supplémentaires, sans doublon.
+
+        Returns:
+            list: Dicts {'id', 'search_query', 'location', 'contract_type'} (id None pour le profil)
+        """
+        try:
+            self.cursor.execute('''
+            SELECT NULL AS id, search_query, location, contract_type FROM users WHERE id = ?
+            ''', (user_id,))
+            criteres = [dict(row) for row in self.cursor.fetchall() if row['search_query'] and row['location']]
+            self.cursor.execute('''
+            SELECT id, search_query, location, contract_type FROM search_criteria
+            WHERE user_id = ? ORDER BY id
+            ''', (user_id,))
+            vus = {(c['search_query'], c['location'], c['contract_type']) for c in criteres}
+            for row in self.cursor.fetchall():
+                cle = (row['search_query'], row['location'], row['contract_type'])
+                if cle not in vus:
+                    vus.add(cle)
+                    criteres.append(dict(row))
+            return criteres
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des critères de recherche: {e}")
+            return []
+    
+    @_chronometre
+    def get_offer_queue(self, user_id):
+        """URLs des offres remises en file pour un utilisateur, dans l'ordre de priorité."""
+        try:
+            self.cursor.execute('SELECT job_url FROM offer_queue WHERE user_id = ? ORDER BY position', (user_id,))
+            return [row['job_url'] for row in self.cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de la file d'offres: {e}")
+            return []
+    
+    @_chronometre
+    def save_offer_queue(self, user_id, job_urls, run_id=None):
+        """Remplace la file d'offres de l'utilisateur par job_urls (liste vide : file vidée)."""
+        try:
+            self.cursor.execute('DELETE FROM offer_queue WHERE user_id = ?', (user_id,))
+            self.cursor.executemany('''
+            INSERT OR IGNORE INTO offer_queue (user_id, job_url, position, run_id)
+            VALUES (?, ?, ?, ?)
+            ''', [(user_id, url, position, run_id) for position, url in enumerate(job_urls)])
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de la file d'offres: {e}")
+            self.conn.rollback()
+            return False
+    
+    def data_version(self):
+        """Valeur de PRAGMA data_version : change quand une autre connexion modifie la base."""
+        return self.cursor.execute('PRAGMA data_version').fetchone()[0]
+    
+    @_chronometre
+    def get_user_versions(self):
+        """
+        Signature de chaque utilisateur (profil, fichiers et critères de recherche).
+
+        Returns:
+            dict: {id: {'email', 'signature'}} ; la signature change dès que le profil
+            ou un critère de l'utilisateur est modifié
+        """
+        try:
+            self.cursor.execute('''
+            SELECT u.id, u.email,
+                   json_array(u.first_name, u.last_name, u.cv_path, u.lm_path, u.search_query, u.location,
+                              u.contract_type,
+                              (SELECT group_concat(c.id || ':' || c.search_query || ':' || c.location || ':'
+                                                   || ifnull(c.contract_type, ''), '|')
+                               FROM search_criteria c WHERE c.user_id = u.id)) AS signature
+            FROM users u
+            ''')
+            return {row['id']: {'email': row['email'], 'signature': row['signature']} for row in self.cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture des versions des utilisateurs: {e}")
+            return None
+    
+    @_chronometre
+    def copy_profiles(self, db_path):
+        """
+        Copie la base dans db_path sans son historique (candidatures, sessions, file d'offres).
+
+        Utilisateurs et critères de recherche sont conservés : un rejeu hors ligne
+        peut ainsi tourner sans écrire dans la base réelle, en partant toujours du
+        même état.
+
+        Returns:
+            bool: True si la copie a réussi, False sinon
+        """
+        try:
+            destination = sqlite3.connect(db_path)
+            try:
+                self.conn.backup(destination)
+                destination.executescript('''
+                    DELETE FROM applications;
+                    DELETE FROM runs;
+                    DELETE FROM offer_queue;
+                ''')
+                destination.commit()
+            finally:
+                destination.close()
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de la copie de la base vers {db_path}: {e}")
+            return False
+
     def close(self):
         """Ferme la connexion à la base de données."""
         if self.conn:
@@ -14,6 +14,13 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from metriques import mesurer_duree, repli_selecteur
+from empreintes import empreinte_offre
+from reseau_cdp import collecter_apres
+from delais_adaptatifs import attendre
+from disjoncteur import surveiller
+from database.user_database import UPSERT_CANDIDATURE
+
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
@@ -27,9 +34,9 @@ def extraire_details_offre(driver):
     Returns:
         dict: Dictionnaire contenant les détails de l'offre
     """
-    logger.info("========== ÉTAPE : EXTRACTION DES DÉTAILS DE L'OFFRE ==========")
-    logger.info(f"URL actuelle: {driver.current_url}")
-    logger.info(f"Titre de la page: {driver.title}")
+    logger.debug("========== ÉTAPE : EXTRACTION DES DÉTAILS DE L'OFFRE ==========")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"URL actuelle: {driver.current_url} | Titre de la page: {driver.title}")
     details = {}
     try:
         # Tenter d'extraire le titre de l'offre
@@ -38,6 +45,7 @@ def extraire_details_offre(driver):
         except:
             try:
                 details['Titre'] = driver.find_element(By.CSS_SELECTOR, ".offer-title").text
+                repli_selecteur('extraire_details_offre', 'titre')
             except:
                 details['Titre'] = "Titre non trouvé"
         
@@ -47,6 +55,7 @@ def extraire_details_offre(driver):
         except:
             try:
                 details['Entreprise'] = driver.find_element(By.CSS_SELECTOR, ".company-name").text
+                repli_selecteur('extraire_details_offre', 'entreprise')
             except:
                 details['Entreprise'] = "Entreprise non trouvée"
         
@@ -56,12 +65,16 @@ def extraire_details_offre(driver):
         except:
             try:
                 details['Lieu'] = driver.find_element(By.CSS_SELECTOR, ".offer-location").text
+                repli_selecteur('extraire_details_offre', 'lieu')
             except:
                 details['Lieu'] = "Lieu non trouvé"
         
         # Tenter d'extraire la description
         try:
-            details['Description'] = driver.find_element(By.CSS_SELECTOR, ".offer-description").text[:500]  # Limiter à 500 caractères
+            description = driver.find_element(By.CSS_SELECTOR, ".offer-description").text
+            details['Description'] = description[:500]  # Limiter à 500 caractères
+            # Empreinte du contenu complet, pour reconnaître une offre republiée sous une autre URL
+            details['Empreinte'] = empreinte_offre(details['Titre'], details['Entreprise'], description)
         except:
             details['Description'] = "Description non trouvée"
         
@@ -84,6 +97,9 @@ def extraire_details_offre(driver):
             'Statut': 'Erreur'
         }
 
+@collecter_apres('candidature')
+@mesurer_duree('verifier_et_postuler')
+@surveiller('candidature')
 def verifier_et_postuler(driver, user_data):
     """
     Remplit le formulaire et postule à l'offre avec des temps d'attente.
@@ -96,17 +112,17 @@ def verifier_et_postuler(driver, user_data):
         bool: True si la candidature a été envoyée, False sinon
     """
     try:
-        logger.info("========== ÉTAPE : CANDIDATURE À L'OFFRE ==========")
-        logger.info(f"URL actuelle: {driver.current_url}")
-        logger.info(f"Titre de la page: {driver.title}")
-        logger.info(f"Utilisateur: {user_data['first_name']} {user_data['last_name']} ({user_data['email']})")
+        logger.debug("========== ÉTAPE : CANDIDATURE À L'OFFRE ==========")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"URL actuelle: {driver.current_url} | Titre de la page: {driver.title}")
+        logger.debug(f"Utilisateur: {user_data['first_name']} {user_data['last_name']} ({user_data['email']})")
         
         # Attendre quelques secondes que la page se charge complètement avant de chercher le formulaire
-        logger.info("Attente du chargement complet de la page...")
+        logger.debug("Attente du chargement complet de la page...")
         time.sleep(5)  # Augmenté à 5 secondes pour mieux assurer le chargement
         
         # Vérifions d'abord s'il y a un bouton de candidature à cliquer avant d'accéder au formulaire
-        logger.info("Recherche d'un bouton pour accéder au formulaire de candidature...")
+        logger.debug("Recherche d'un bouton pour accéder au formulaire de candidature...")
         apply_button_selectors = [
             ".postuler-btn", 
             ".apply-btn", 
@@ -118,14 +134,15 @@ def verifier_et_postuler(driver, user_data):
             "#candidature-link"
         ]
         
-        for selector in apply_button_selectors:
+        for index, selector in enumerate(apply_button_selectors):
             try:
-                apply_button = WebDriverWait(driver, 2).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                )
-                logger.info(f"Bouton d'accès au formulaire trouvé: {apply_button.text if hasattr(apply_button, 'text') else selector}")
+                apply_button = attendre(driver, f"bouton_acces:{selector}",
+                                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector)), 2)
+                logger.debug(f"Bouton d'accès au formulaire trouvé: {apply_button.text if hasattr(apply_button, 'text') else selector}")
+                if index > 0:
+                    repli_selecteur('verifier_et_postuler', 'bouton_acces')
                 apply_button.click()
-                logger.info("Clic sur le bouton d'accès au formulaire...")
+                logger.debug("Clic sur le bouton d'accès au formulaire...")
                 time.sleep(3)  # Attendre le chargement du formulaire
                 break
             except Exception as e:
@@ -133,7 +150,7 @@ def verifier_et_postuler(driver, user_data):
                 continue
         
         # Essayer différents sélecteurs pour trouver le formulaire
-        logger.info("Recherche du formulaire de candidature...")
+        logger.debug("Recherche du formulaire de candidature...")
         form = None
         selectors = [
             "#application-form",
@@ -146,21 +163,21 @@ def verifier_et_postuler(driver, user_data):
             "form"
         ]
         
-        for selector in selectors:
+        for index, selector in enumerate(selectors):
             try:
-                form = WebDriverWait(driver, 5).until(  # Augmenté à 5 secondes
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
-                logger.info(f"Formulaire trouvé avec le sélecteur: {selector}")
+                form = attendre(driver, f"formulaire:{selector}",
+                                EC.presence_of_element_located((By.CSS_SELECTOR, selector)), 5)
+                logger.debug(f"Formulaire trouvé avec le sélecteur: {selector}")
+                if index > 0:
+                    repli_selecteur('verifier_et_postuler', 'formulaire')
                 break
             except Exception as e:
                 logger.debug(f"Erreur avec sélecteur {selector}: {str(e)[:50]}")
                 continue
                 
-        # Affichons le code source de la page pour le déboggage
-        logger.info("Dumping page source pour debug:")
-        page_source = driver.page_source[:500]  # Afficher seulement les 500 premiers caractères
-        logger.info(f"Page source (début): {page_source}...")
+        # Code source de la page pour le débogage (aller-retour WebDriver évité hors DEBUG)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Page source (début): {driver.page_source[:500]}...")
         
         if form is None:
             # Essayer de chercher un autre indicateur de candidature, comme un message qui indique qu'on a déjà postulé
@@ -172,18 +189,18 @@ def verifier_et_postuler(driver, user_data):
                 logger.info(f"Aucun formulaire de candidature trouvé et pas d'indication de candidature existante: {e}")
                 return False
         
-        logger.info("Formulaire de candidature trouvé. Pause avant remplissage...")
+        logger.debug("Formulaire de candidature trouvé. Pause avant remplissage...")
         time.sleep(2)  # Pause avant remplissage
 
         # Remplissage des champs du formulaire selon la structure du site iQuesta
-        logger.info("Remplissage des informations...")
+        logger.debug("Remplissage des informations...")
         try:
             # Remplir l'email
             try:
                 email_field = form.find_element(By.NAME, "email")
                 email_field.clear()
                 email_field.send_keys(user_data['email'])
-                logger.info(f"- Email rempli: {user_data['email']}")
+                logger.debug(f"- Email rempli: {user_data['email']}")
             except Exception as e:
                 logger.warning(f"Erreur lors du remplissage de l'email: {e}")
             
@@ -192,7 +209,7 @@ def verifier_et_postuler(driver, user_data):
                 firstname = form.find_element(By.NAME, "firstName")
                 firstname.clear()
                 firstname.send_keys(user_data['first_name'])
-                logger.info(f"- Prénom rempli: {user_data['first_name']}")
+                logger.debug(f"- Prénom rempli: {user_data['first_name']}")
             except Exception as e:
                 logger.warning(f"Erreur lors du remplissage du prénom: {e}")
             
@@ -201,7 +218,7 @@ def verifier_et_postuler(driver, user_data):
                 lastname = form.find_element(By.NAME, "lastName")
                 lastname.clear()
                 lastname.send_keys(user_data['last_name'])
-                logger.info(f"- Nom rempli: {user_data['last_name']}")
+                logger.debug(f"- Nom rempli: {user_data['last_name']}")
             except Exception as e:
                 logger.warning(f"Erreur lors du remplissage du nom: {e}")
             
@@ -211,15 +228,15 @@ def verifier_et_postuler(driver, user_data):
                 message_text = "Je suis très intéressé(e) par cette opportunité qui correspond parfaitement à mes compétences et à mon projet professionnel. Je serais ravi(e) d'échanger avec vous à ce sujet."
                 message.clear()
                 message.send_keys(message_text)
-                logger.info("- Message rempli")
+                logger.debug("- Message rempli")
             except Exception as e:
-                logger.info(f"Champ message non trouvé ou non requis: {e}")
+                logger.debug(f"Champ message non trouvé ou non requis: {e}")
 
             # Upload du CV (obligatoire)
             try:
                 cv_upload = form.find_element(By.NAME, "cv")
                 cv_upload.send_keys(user_data['cv_path'])
-                logger.info(f"- CV uploadé: {user_data['cv_path']}")
+                logger.debug(f"- CV uploadé: {user_data['cv_path']}")
             except Exception as e:
                 logger.error(f"Erreur lors de l'upload du CV: {e}")
                 # Si le CV est obligatoire et qu'on ne peut pas l'uploader, on ne peut pas continuer
@@ -230,18 +247,18 @@ def verifier_et_postuler(driver, user_data):
             try:
                 lm_upload = form.find_element(By.NAME, "lm")
                 lm_upload.send_keys(user_data['lm_path'])
-                logger.info(f"- Lettre de motivation uploadée: {user_data['lm_path']}")
+                logger.debug(f"- Lettre de motivation uploadée: {user_data['lm_path']}")
             except Exception as e:
                 logger.warning(f"Champ pour lettre de motivation non trouvé ou erreur: {e}")
             
             # Pause après remplissage avant de cliquer sur le bouton
-            logger.info("Pause après remplissage...")
+            logger.debug("Pause après remplissage...")
             time.sleep(2)
             
             # Faire défiler jusqu'en bas du formulaire pour s'assurer que le bouton est visible
             try:
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                logger.info("Défilement jusqu'au bas de la page pour voir le bouton")
+                logger.debug("Défilement jusqu'au bas de la page pour voir le bouton")
             except Exception as e:
                 logger.warning(f"Erreur lors du défilement: {e}")
             
@@ -250,13 +267,13 @@ def verifier_et_postuler(driver, user_data):
             success = False
             
             # Assurons-nous que la page est bien chargée et prête pour le clic
-            logger.info("Pause pour s'assurer que le formulaire est prêt pour soumission")
+            logger.debug("Pause pour s'assurer que le formulaire est prêt pour soumission")
             time.sleep(5)
             
             # Défiler jusqu'au bas du formulaire où le bouton est probablement situé
             try:
                 driver.execute_script("arguments[0].scrollIntoView({block: 'end', behavior: 'smooth'});", form)
-                logger.info("Défilement jusqu'au bas du formulaire effectué")
+                logger.debug("Défilement jusqu'au bas du formulaire effectué")
                 time.sleep(2)  # Attendre la fin du défilement
             except Exception as e:
                 logger.warning(f"Erreur lors du défilement vers le bas: {e}")
@@ -266,7 +283,7 @@ def verifier_et_postuler(driver, user_data):
                     break
                     
                 element = "formulaire" if context == form else "page"
-                logger.info(f"Recherche du bouton de soumission dans le {element}...")
+                logger.debug(f"Recherche du bouton de soumission dans le {element}...")
                 
                 # Liste des sélecteurs pour trouver le bouton de soumission (liste étendue)
                 submit_selectors = [
@@ -289,25 +306,25 @@ def verifier_et_postuler(driver, user_data):
                 ]
                 
                 # Essai de chaque sélecteur
-                for selector in submit_selectors:
+                for index, selector in enumerate(submit_selectors):
                     try:
-                        # Augmenter le temps d'attente à 5 secondes
-                        submit_button = WebDriverWait(context, 5).until(
-                            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                        )
-                        logger.info(f"Bouton de soumission trouvé: {submit_button.text if hasattr(submit_button, 'text') else selector}")
+                        submit_button = attendre(context, f"bouton_soumission:{selector}",
+                                                 EC.element_to_be_clickable((By.CSS_SELECTOR, selector)), 5)
+                        logger.debug(f"Bouton de soumission trouvé: {submit_button.text if hasattr(submit_button, 'text') else selector}")
+                        if index > 0 or context is not form:
+                            repli_selecteur('verifier_et_postuler', 'bouton_soumission')
                         
                         # Méthode optimisée : DOUBLE CLIC NORMAL (méthode validée)
                         try:
-                            logger.info("🎯 Utilisation de la méthode validée : DOUBLE CLIC normal")
+                            logger.debug("🎯 Utilisation de la méthode validée : DOUBLE CLIC normal")
                             # Premier clic
                             submit_button.click()
-                            logger.info("   → Premier clic effectué")
+                            logger.debug("   → Premier clic effectué")
                             # Pause courte entre les clics
                             time.sleep(0.5)
                             # Deuxième clic
                             submit_button.click()
-                            logger.info("   → Deuxième clic effectué")
+                            logger.debug("   → Deuxième clic effectué")
                             logger.info("✅ Double clic normal réussi - Candidature soumise")
                         except Exception as click_error:
                             logger.error(f"❌ Échec du double clic normal: {click_error}")
@@ -317,7 +334,7 @@ def verifier_et_postuler(driver, user_data):
                         success = True
                         
                         # Attendre un peu pour voir si la page change après le clic
-                        logger.info("⏳ Attente post-clic pour voir si la page change...")
+                        logger.debug("⏳ Attente post-clic pour voir si la page change...")
                         time.sleep(5)
                         
                         break
@@ -327,7 +344,7 @@ def verifier_et_postuler(driver, user_data):
             
             # Si aucun bouton n'a été trouvé avec les sélecteurs CSS, essayer via XPath
             if not success:
-                logger.info("Tentative de recherche du bouton par texte via XPath...")
+                logger.debug("Tentative de recherche du bouton par texte via XPath...")
                 xpath_selectors = [
                     "//button[contains(text(),'Postuler')]",
                     "//input[@value='Postuler']",
@@ -339,10 +356,10 @@ def verifier_et_postuler(driver, user_data):
                 
                 for xpath in xpath_selectors:
                     try:
-                        submit_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, xpath))
-                        )
-                        logger.info(f"Bouton trouvé via XPath: {xpath}")
+                        submit_button = attendre(driver, f"bouton_soumission:{xpath}",
+                                                 EC.element_to_be_clickable((By.XPATH, xpath)), 5)
+                        logger.debug(f"Bouton trouvé via XPath: {xpath}")
+                        repli_selecteur('verifier_et_postuler', 'xpath')
                         driver.execute_script("arguments[0].click();", submit_button)
                         success = True
                         time.sleep(5)  # Attendre après le clic
@@ -354,6 +371,7 @@ def verifier_et_postuler(driver, user_data):
             if not success:
                 try:
                     logger.info("Dernier recours: tentative de clic par JavaScript général")
+                    repli_selecteur('verifier_et_postuler', 'javascript')
                     driver.execute_script("""
                         // Essayer de trouver un élément qui ressemble à un bouton de soumission
                         var buttons = document.querySelectorAll('button, input[type="submit"], .btn');
@@ -398,6 +416,26 @@ def verifier_et_postuler(driver, user_data):
         # On retourne True quand même pour continuer avec les autres offres
         return True
 
+def chercher_doublon(db, user_id, offer_details, distance_max):
+    """
+    Cherche une candidature déjà envoyée à une offre au contenu quasi identique
+    (même offre republiée sous une autre URL).
+
+    Args:
+        db: Instance de UserDatabase
+        user_id: ID de l'utilisateur
+        offer_details: Détails extraits de l'offre (clé 'Empreinte')
+        distance_max: Distance de Hamming maximale (négative : recherche désactivée)
+
+    Returns:
+        dict: Offre déjà postulée la plus proche, ou None
+    """
+    doublon = db.find_near_duplicate(user_id, offer_details.get('Empreinte'), distance_max, offer_details.get('Lien'))
+    if doublon:
+        logger.info(f"Offre republiée : contenu identique à '{doublon['job_title']}' ({doublon['job_url']}, "
+                    f"distance {doublon['distance']}).")
+    return doublon
+
 def enregistrer_candidature(conn, cursor, user_data, offer_details):
     """
     Enregistre une candidature dans la base de données.
@@ -411,22 +449,21 @@ def enregistrer_candidature(conn, cursor, user_data, offer_details):
     Returns:
         bool: True si l'enregistrement a réussi, False sinon
     """
-    logger.info("========== ÉTAPE : ENREGISTREMENT DE LA CANDIDATURE EN BDD ==========")
-    logger.info(f"Utilisateur ID: {user_data['id']}")
-    logger.info(f"Offre: {offer_details.get('Titre')} | {offer_details.get('Entreprise')} | {offer_details.get('Lieu')}")
+    logger.debug("========== ÉTAPE : ENREGISTREMENT DE LA CANDIDATURE EN BDD ==========")
+    logger.debug(f"Utilisateur ID: {user_data['id']}")
+    logger.debug(f"Offre: {offer_details.get('Titre')} | {offer_details.get('Entreprise')} | {offer_details.get('Lieu')}")
     try:
-        cursor.execute('''
-        INSERT OR REPLACE INTO applications 
-        (user_id, job_url, job_title, company, location, description, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        # Même requête que UserDatabase.record_application : une candidature envoyée garde son statut
+        cursor.execute(UPSERT_CANDIDATURE, (
             user_data['id'],
             offer_details.get('Lien', ''),
             offer_details.get('Titre', ''),
             offer_details.get('Entreprise', ''),
             offer_details.get('Lieu', ''),
             offer_details.get('Description', ''),
-            offer_details.get('Statut', '')
+            offer_details.get('Statut', ''),
+            offer_details.get('Empreinte'),
+            offer_details.get('Instantane')
         ))
         conn.commit()
         return True
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Emplacement des artefacts produits par une session (profils, mesures réseau...).
+"""
+
+import os
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_id_session = None
+_nb_sessions = 0
+
+
+def nouvelle_session():
+    """
+    Démarre une nouvelle session : horodatage + PID (+ numéro si le processus,
+    réutilisé par le démon, a déjà lancé une session).
+
+    Returns:
+        str: Identifiant de la session
+    """
+    global _id_session, _nb_sessions
+    _nb_sessions += 1
+    _id_session = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    if _nb_sessions > 1:
+        _id_session += f"-{_nb_sessions}"
+    return _id_session
+
+
+def id_session():
+    """Identifiant de la session courante (démarrée au besoin)."""
+    return _id_session or nouvelle_session()
+
+
+def dossier_artefacts():
+    """
+    Dossier des artefacts de la session courante, créé au besoin.
+
+    Racine : ARTIFACTS_DIR (relatif à la racine du projet) ou artifacts/.
+    """
+    racine = os.getenv('ARTIFACTS_DIR', 'artifacts')
+    if not os.path.isabs(racine):
+        racine = os.path.join(project_root, racine)
+    dossier = os.path.join(racine, id_session())
+    os.makedirs(dossier, exist_ok=True)
+    return dossier
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Budget d'une session : durée maximale et nombre maximal de candidatures.
+
+Le coût d'une offre (ouverture, candidature, enregistrement) est mesuré au fil
+de la session ; une nouvelle offre n'est commencée que si elle tient encore
+dans le temps restant, marge comprise. Quand les offres en attente ne tiennent
+plus toutes, les moins pertinentes (score de classement.py) sont différées.
+Les offres qui ne tiennent plus sont remises en file (table offer_queue) pour
+la session suivante : une session calée sur un créneau cron s'arrête proprement
+au lieu d'être tuée en pleine soumission de formulaire.
+"""
+
+import time
+import logging
+import threading
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Coût supposé d'une offre tant qu'aucune n'a été mesurée (secondes)
+COUT_INITIAL_DEFAUT = 60.0
+
+# Marge appliquée au coût estimé avant de commencer une offre
+MARGE_DEFAUT = 0.25
+
+# Nombre de mesures récentes prises en compte dans l'estimation du coût
+FENETRE_COUTS = 20
+
+
+class _Compteur:
+    """Compteur local au processus, même interface que multiprocessing.Value."""
+
+    def __init__(self, valeur=0):
+        self.value = valeur
+        self._verrou = threading.Lock()
+
+    def get_lock(self):
+        return self._verrou
+
+
+class BudgetSession:
+    """
+    Budget en temps et en candidatures d'une session.
+
+    Args:
+        duree_max: Durée maximale de la session en secondes (None : illimitée)
+        candidatures_max: Nombre maximal de candidatures envoyées (None : illimité)
+        cout_initial: Coût supposé d'une offre avant la première mesure
+        marge: Fraction ajoutée au coût estimé avant de commencer une offre
+    """
+
+    def __init__(self, duree_max=None, candidatures_max=None, cout_initial=COUT_INITIAL_DEFAUT, marge=MARGE_DEFAUT):
+        # Échéance en temps réel : comparable entre les processus travailleurs
+        self.echeance = time.time() + duree_max if duree_max else None
+        self.candidatures_max = candidatures_max
+        self.cout_initial = cout_initial
+        self.marge = marge
+        self.couts = []
+        self._engagees = _Compteur()
+
+    def partager(self, ctx):
+        """Partage le compteur de candidatures entre les processus du contexte ctx."""
+        self._engagees = ctx.Value('i', self._engagees.value)
+        return self
+
+    # --- Mesures ---
+
+    def observer(self, duree):
+        """Ajoute le coût mesuré d'une offre traitée."""
+        self.couts.append(duree)
+        del self.couts[:-FENETRE_COUTS]
+
+    def cout_offre(self):
+        """Coût estimé d'une offre : moyenne des mesures récentes, ou coût initial."""
+        if not self.couts:
+            return self.cout_initial
+        return sum(self.couts) / len(self.couts)
+
+    # --- Décisions ---
+
+    def temps_restant(self):
+        return None if self.echeance is None else max(0.0, self.echeance - time.time())
+
+    def offres_restantes(self, voies=1):
+        """
+        Nombre d'offres qui tiennent encore dans le budget (None : illimité).
+
+        Args:
+            voies: Nombre de processus qui traitent des offres en parallèle ; le
+                plafond de candidatures est partagé entre eux, pas le temps
+        """
+        restantes = None
+        if self.candidatures_max is not None:
+            restantes = -(-max(0, self.candidatures_max - self._engagees.value) // voies)
+        if self.echeance is not None:
+            en_temps = int(self.temps_restant() // (self.cout_offre() * (1 + self.marge)))
+            restantes = en_temps if restantes is None else min(restantes, en_temps)
+        return restantes
+
+    def epuise(self):
+        """Vrai si aucune nouvelle offre ne peut être commencée."""
+        restantes = self.offres_restantes()
+        return restantes is not None and restantes < 1
+
+    def serre(self, en_attente, voies=1):
+        """Vrai si les en_attente offres restantes ne tiennent pas toutes dans le budget."""
+        restantes = self.offres_restantes(voies)
+        return restantes is not None and restantes < en_attente
+
+    def differer(self, liens, priorites=None, voies=1):
+        """
+        Garde les offres les plus pertinentes qui tiennent encore dans le budget.
+
+        Args:
+            liens: Offres en attente, dans l'ordre de traitement
+            priorites: {lien: score de pertinence} ; une offre sans score (remise
+                en file, carte sans texte) passe après les offres classées
+            voies: Nombre de processus se partageant le plafond de candidatures
+
+        Returns:
+            tuple: (offres à traiter, offres différées à remettre en file) ; la
+            liste est inchangée si toutes les offres tiennent
+        """
+        restantes = self.offres_restantes(voies)
+        if restantes is None or restantes >= len(liens):
+            return list(liens), []
+        priorites = priorites or {}
+        # Tri stable : à score égal, l'ordre de traitement est conservé
+        ordre = sorted(liens, key=lambda lien: 1 if priorites.get(lien) is None else -priorites[lien])
+        return ordre[:restantes], ordre[restantes:]
+
+    def reserver(self):
+        """Engage une candidature dans le budget ; False si le plafond est atteint."""
+        with self._engagees.get_lock():
+            if self.candidatures_max is not None and self._engagees.value >= self.candidatures_max:
+                return False
+            self._engagees.value += 1
+            return True
+
+    def liberer(self):
+        """Rend une candidature engagée qui n'a pas été envoyée."""
+        with self._engagees.get_lock():
+            self._engagees.value -= 1
+
+    def etat(self):
+        """Description courte du budget pour les logs."""
+        morceaux = []
+        if self.candidatures_max is not None:
+            morceaux.append(f"{self._engagees.value}/{self.candidatures_max} candidatures")
+        if self.echeance is not None:
+            morceaux.append(f"{self.temps_restant():.0f}s restantes, ~{self.cout_offre():.0f}s par offre")
+        return ', '.join(morceaux) or 'illimité'
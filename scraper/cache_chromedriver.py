@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache de résolution du chromedriver.
+
+webdriver_manager interroge le réseau pour trouver le driver correspondant à
+Chrome. Le chemin obtenu est mémorisé par version de Chrome installée, avec la
+version et l'empreinte SHA-256 du binaire ; tant que l'entrée est fraîche et
+valide, aucune résolution n'est faite.
+
+Ordre de résolution :
+1. entrée du cache fraîche et valide
+2. webdriver_manager (sauf mode hors ligne CHROMEDRIVER_OFFLINE=1)
+3. CHROME_DRIVER_PATH, si sa version correspond à celle de Chrome
+4. entrée du cache périmée mais toujours valide
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import subprocess
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Fichier du cache (surchargé par CHROMEDRIVER_CACHE)
+CHEMIN_CACHE_DEFAUT = os.path.join(os.path.expanduser('~'), '.cache', 'iquesta', 'chromedriver.json')
+
+# Durée de validité d'une entrée avant nouvelle résolution (surchargée par CHROMEDRIVER_CACHE_TTL)
+DUREE_VALIDITE_DEFAUT = 7 * 24 * 3600
+
+# Exécutables de Chrome essayés si CHROME_BINARY n'est pas défini
+BINAIRES_CHROME = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+_MOTIF_VERSION = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+
+class ChromeDriverIntrouvable(Exception):
+    """Aucun chromedriver utilisable n'a pu être trouvé."""
+
+
+def _version(executable):
+    """Version (x.y.z.w) affichée par `executable --version`, ou None."""
+    try:
+        sortie = subprocess.run([executable, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    correspondance = _MOTIF_VERSION.search(sortie)
+    return correspondance.group(0) if correspondance else None
+
+
+def _majeure(version):
+    return version.split('.', 1)[0] if version else None
+
+
+def executable_chrome():
+    """Chemin de l'exécutable Chrome (CHROME_BINARY ou premier binaire connu trouvé), ou None."""
+    candidats = [os.getenv('CHROME_BINARY')] if os.getenv('CHROME_BINARY') else BINAIRES_CHROME
+    for candidat in candidats:
+        executable = shutil.which(candidat) or (candidat if os.path.isfile(candidat) else None)
+        if executable:
+            return executable
+    return None
+
+
+def version_chrome():
+    """Version de Chrome installée, ou None si elle ne peut pas être déterminée."""
+    executable = executable_chrome()
+    return _version(executable) if executable else None
+
+
+def empreinte(chemin):
+    """SHA-256 du fichier chemin."""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+class CacheChromeDriver:
+    """
+    Mémorise le chemin du chromedriver par version de Chrome.
+
+    Args:
+        chemin_cache: Fichier JSON du cache
+        duree_validite: Âge maximal (secondes) d'une entrée considérée fraîche
+        hors_ligne: N'utilise jamais webdriver_manager
+    """
+
+    def __init__(self, chemin_cache=None, duree_validite=None, hors_ligne=None):
+        self.chemin_cache = chemin_cache or os.getenv('CHROMEDRIVER_CACHE', CHEMIN_CACHE_DEFAUT)
+        self.duree_validite = (duree_validite if duree_validite is not None
+                               else int(os.getenv('CHROMEDRIVER_CACHE_TTL', DUREE_VALIDITE_DEFAUT)))
+        self.hors_ligne = (hors_ligne if hors_ligne is not None
+                           else os.getenv('CHROMEDRIVER_OFFLINE', '').lower() in ('1', 'true', 'oui'))
+
+    # --- Fichier du cache ---
+
+    def _lire(self):
+        try:
+            with open(self.chemin_cache, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _ecrire(self, entrees):
+        dossier = os.path.dirname(self.chemin_cache)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        temporaire = f"{self.chemin_cache}.{os.getpid()}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(entrees, f, indent=2)
+        os.replace(temporaire, self.chemin_cache)
+
+    def _memoriser(self, version_navigateur, chemin, version_driver):
+        entrees = self._lire()
+        entrees[version_navigateur or 'inconnue'] = {
+            'chemin': chemin,
+            'version_driver': version_driver,
+            'sha256': empreinte(chemin),
+            'resolu_le': time.time(),
+        }
+        try:
+            self._ecrire(entrees)
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le cache chromedriver {self.chemin_cache}: {e}")
+
+    # --- Validation ---
+
+    @staticmethod
+    def _entree_valide(entree, version_navigateur):
+        chemin = entree.get('chemin')
+        if not chemin or not os.path.isfile(chemin) or not os.access(chemin, os.X_OK):
+            return False
+        if version_navigateur and _majeure(entree.get('version_driver')) != _majeure(version_navigateur):
+            return False
+        try:
+            return empreinte(chemin) == entree.get('sha256')
+        except OSError:
+            return False
+
+    @staticmethod
+    def _driver_compatible(chemin, version_navigateur):
+        """Retourne la version du driver chemin s'il est utilisable avec ce Chrome, sinon None."""
+        if not chemin or not os.path.isfile(chemin):
+            return None
+        version_driver = _version(chemin)
+        if not version_driver:
+            return None
+        if version_navigateur and _majeure(version_driver) != _majeure(version_navigateur):
+            logger.warning(f"chromedriver {chemin} ({version_driver}) incompatible avec Chrome {version_navigateur}.")
+            return None
+        return version_driver
+
+    # --- Résolution ---
+
+    def resoudre(self):
+        """
+        Returns:
+            str: Chemin d'un chromedriver compatible avec le Chrome installé
+
+        Raises:
+            ChromeDriverIntrouvable: si aucune source ne fournit de driver valide
+        """
+        version_navigateur = version_chrome()
+        entree = self._lire().get(version_navigateur or 'inconnue')
+        entree_valide = bool(entree) and self._entree_valide(entree, version_navigateur)
+        if entree_valide and time.time() - entree.get('resolu_le', 0) < self.duree_validite:
+            logger.info(f"chromedriver en cache pour Chrome {version_navigateur}: {entree['chemin']}")
+            return entree['chemin']
+
+        if not self.hors_ligne:
+            try:
+                # Import tardif : webdriver_manager n'est chargé que si une résolution est nécessaire
+                from webdriver_manager.chrome import ChromeDriverManager
+                chemin = ChromeDriverManager().install()
+                version_driver = self._driver_compatible(chemin, version_navigateur)
+                if version_driver:
+                    self._memoriser(version_navigateur, chemin, version_driver)
+                    logger.info(f"chromedriver {version_driver} résolu par webdriver_manager: {chemin}")
+                    return chemin
+            except Exception as e:
+                logger.warning(f"Résolution du chromedriver par webdriver_manager impossible: {str(e)[:200]}")
+
+        chemin_local = os.getenv('CHROME_DRIVER_PATH')
+        version_driver = self._driver_compatible(chemin_local, version_navigateur)
+        if version_driver:
+            self._memoriser(version_navigateur, chemin_local, version_driver)
+            logger.info(f"chromedriver local utilisé (CHROME_DRIVER_PATH): {chemin_local}")
+            return chemin_local
+
+        if entree_valide:
+            logger.warning(f"Entrée du cache chromedriver périmée réutilisée: {entree['chemin']}")
+            return entree['chemin']
+
+        raise ChromeDriverIntrouvable(
+            f"Aucun chromedriver compatible avec Chrome {version_navigateur or '(version inconnue)'} : "
+            f"définissez CHROME_DRIVER_PATH ou autorisez l'accès réseau.")
+
+
+def resoudre_chromedriver():
+    """Chemin du chromedriver selon la configuration de l'environnement."""
+    return CacheChromeDriver().resoudre()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Classement des offres découvertes par pertinence (TF-IDF + cosinus, NumPy).
+
+Le texte de chaque offre (titre, texte de la carte de résultat et description
+déjà connue en base) est comparé à la recherche de l'utilisateur. Les offres
+sont triées par score décroissant et celles sous le seuil sont écartées, pour
+que les candidatures, coûteuses, portent d'abord sur les meilleures offres.
+"""
+
+import re
+import logging
+import unicodedata
+import numpy as np
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Score minimal par défaut (cosinus entre 0 et 1)
+SEUIL_DEFAUT = 0.05
+
+# Poids de la recherche (search_query) par rapport au lieu et au contrat
+POIDS_RECHERCHE = 3
+
+MOTS_VIDES = frozenset("""
+au aux avec ce ces dans de des du elle en et eux il je la le les leur lui ma mais me meme mes moi mon ne nos
+notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous est sont
+h f hf poste offre
+""".split())
+
+_MOT = re.compile(r"[a-z0-9]{2,}")
+
+
+def tokeniser(texte):
+    """Mots normalisés (minuscules, sans accents ni mots vides) du texte."""
+    texte = unicodedata.normalize('NFKD', (texte or '').lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return [mot for mot in _MOT.findall(texte) if mot not in MOTS_VIDES]
+
+
+def _matrice_tfidf(documents, vocabulaire):
+    """Matrice documents × vocabulaire des fréquences de termes (tf sous-linéaire : log(1 + n))."""
+    tf = np.zeros((len(documents), len(vocabulaire)), dtype=np.float32)
+    for i, mots in enumerate(documents):
+        for mot in mots:
+            indice = vocabulaire.get(mot)
+            if indice is not None:
+                tf[i, indice] += 1
+    np.log1p(tf, out=tf)
+    return tf
+
+
+def scores_pertinence(textes, requete):
+    """
+    Similarité cosinus TF-IDF entre chaque texte et la requête.
+
+    Returns:
+        numpy.ndarray: Un score entre 0 et 1 par texte
+    """
+    documents = [tokeniser(texte) for texte in textes]
+    mots_requete = tokeniser(requete)
+    vocabulaire = {}
+    for mots in documents + [mots_requete]:
+        for mot in mots:
+            vocabulaire.setdefault(mot, len(vocabulaire))
+    if not vocabulaire or not mots_requete:
+        return np.zeros(len(textes), dtype=np.float32)
+
+    tf = _matrice_tfidf(documents, vocabulaire)
+    # IDF lissé calculé sur les offres de la session
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+    matrice = tf * idf
+    vecteur = _matrice_tfidf([mots_requete], vocabulaire)[0] * idf
+
+    normes = np.linalg.norm(matrice, axis=1)
+    normes[normes == 0] = 1
+    norme_requete = np.linalg.norm(vecteur) or 1
+    return (matrice @ vecteur) / (normes * norme_requete)
+
+
+def requete_utilisateur(user_data):
+    """Texte de référence : recherche de l'utilisateur (pondérée), lieu et type de contrat."""
+    morceaux = [user_data.get('search_query') or ''] * POIDS_RECHERCHE
+    morceaux += [user_data.get('location') or '', user_data.get('contract_type') or '']
+    return ' '.join(morceaux)
+
+
+def classer_offres(cartes, user_data, seuil=SEUIL_DEFAUT, descriptions=None, criteres=None):
+    """
+    Trie les cartes d'offres par pertinence et écarte celles sous le seuil.
+
+    Les cartes sans aucun texte ne sont pas écartées (placées en fin de liste).
+
+    Args:
+        cartes: Liste de dicts {'Lien', 'Titre', 'Texte'}
+        user_data: Dictionnaire de l'utilisateur
+        seuil: Score minimal conservé
+        descriptions: {url: description} déjà connues, ajoutées au texte de l'offre
+        criteres: Critères de recherche de l'utilisateur ; une offre garde son meilleur score
+
+    Returns:
+        list: (carte, score) triés par score décroissant
+    """
+    if not cartes:
+        return []
+    descriptions = descriptions or {}
+    textes = [' '.join((carte.get('Titre', ''), carte.get('Titre', ''), carte.get('Texte', ''),
+                        descriptions.get(carte['Lien'], '')))
+              for carte in cartes]
+    requetes = [requete_utilisateur(critere) for critere in criteres or [user_data]]
+    scores = np.max([scores_pertinence(textes, requete) for requete in requetes], axis=0)
+    classees = []
+    sans_texte = []
+    for carte, texte, score in zip(cartes, textes, scores.tolist()):
+        if not texte.strip():
+            sans_texte.append((carte, None))
+        elif score >= seuil:
+            classees.append((carte, round(score, 4)))
+    # Tri stable : à score égal, l'ordre de la page est conservé
+    classees.sort(key=lambda element: -element[1])
+    ecartees = len(cartes) - len(classees) - len(sans_texte)
+    if ecartees:
+        logger.info(f"{ecartees} offres écartées (score de pertinence < {seuil}).")
+    return classees + sans_texte
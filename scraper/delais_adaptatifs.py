@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Délais d'attente appris à partir des latences observées.
+
+Chaque attente WebDriverWait est identifiée par une clé « étape:sélecteur ».
+Sa durée réelle est mesurée et conservée (fenêtre glissante, persistée en
+JSON d'une session à l'autre). Le délai suivant vaut un percentile élevé des
+observations récentes plus une marge, borné par un plancher et un plafond :
+court quand le site répond vite, plus long quand il ralentit.
+
+Les observations sont rangées par site (hôte de IQUESTA_URL) : un serveur
+local (rejeu, benchmark) qui répond en quelques millisecondes n'apprend pas
+ses délais à iquesta.com.
+
+Une attente qui expire est comptée à la valeur du délai accordé : si le site
+ralentit au point de faire expirer les attentes, le percentile monte jusqu'au
+délai et la marge l'augmente à chaque session. Un sélecteur qui n'a jamais
+abouti après de nombreux essais (sélecteur de repli absent du site) ne coûte
+plus que le plancher.
+
+Désactivé par l'option --timeouts fixes du scraper (ADAPTIVE_TIMEOUTS=0) :
+les délais codés en dur s'appliquent alors tels quels.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+try:
+    import fcntl
+except ImportError:  # Windows : écritures concurrentes non verrouillées
+    fcntl = None
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Site par défaut (IQUESTA_URL), dont l'hôte range les observations
+URL_DEFAUT = "https://www.iquesta.com/"
+
+# Fichier des observations (surchargé par ADAPTIVE_TIMEOUTS_FILE)
+CHEMIN_DEFAUT = os.path.join(os.path.expanduser('~'), '.cache', 'iquesta', 'delais.json')
+
+# Percentile des observations retenu et marge ajoutée (surchargés par TIMEOUT_PERCENTILE, TIMEOUT_MARGIN)
+PERCENTILE_DEFAUT = 0.95
+MARGE_DEFAUT = 0.5
+
+# Bornes des délais appris en secondes (surchargées par TIMEOUT_FLOOR, TIMEOUT_CEILING)
+PLANCHER_DEFAUT = 1.0
+PLAFOND_DEFAUT = 60.0
+
+# Nombre d'observations conservées par clé, et nécessaires avant d'abandonner le délai par défaut
+FENETRE = 100
+OBSERVATIONS_MIN = 10
+
+
+def percentile(valeurs, p):
+    """Percentile p (0 à 1) des valeurs, par interpolation linéaire."""
+    triees = sorted(valeurs)
+    position = (len(triees) - 1) * p
+    bas = int(position)
+    haut = min(bas + 1, len(triees) - 1)
+    return triees[bas] + (triees[haut] - triees[bas]) * (position - bas)
+
+
+class PolitiqueDelais:
+    """
+    Délais d'attente par clé « étape:sélecteur », appris et persistés.
+
+    Args:
+        chemin: Fichier JSON des observations
+        site: Site dont les observations sont lues et enregistrées ; défaut hôte de IQUESTA_URL
+        percentile: Percentile des durées observées retenu (0 à 1)
+        marge: Fraction ajoutée au percentile
+        plancher: Délai minimal (secondes)
+        plafond: Délai maximal (secondes)
+    """
+
+    def __init__(self, chemin=None, percentile=None, marge=None, plancher=None, plafond=None, site=None):
+        self.chemin = chemin or os.getenv('ADAPTIVE_TIMEOUTS_FILE', CHEMIN_DEFAUT)
+        self.site = site or urlsplit(os.getenv('IQUESTA_URL', URL_DEFAUT)).netloc
+        self.percentile = percentile if percentile is not None else float(os.getenv('TIMEOUT_PERCENTILE', PERCENTILE_DEFAUT))
+        self.marge = marge if marge is not None else float(os.getenv('TIMEOUT_MARGIN', MARGE_DEFAUT))
+        self.plancher = plancher if plancher is not None else float(os.getenv('TIMEOUT_FLOOR', PLANCHER_DEFAUT))
+        self.plafond = plafond if plafond is not None else float(os.getenv('TIMEOUT_CEILING', PLAFOND_DEFAUT))
+        self._verrou = threading.Lock()
+        # {clé: {'durees': [...], 'succes': n, 'expirations': n}} du site
+        self.cles = self._lire().get(self.site, {})
+        # Observations de ce processus, fusionnées au fichier à l'enregistrement
+        self._nouvelles = {}
+        self._observees = set()
+
+    # --- Fichier ---
+
+    def _lire(self):
+        """Contenu du fichier : {site: {clé: observations}}."""
+        try:
+            with open(self.chemin, encoding='utf-8') as f:
+                sites = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(sites, dict):
+            return {}
+        # Fichier antérieur au rangement par site ({clé: observations}) : sa
+        # provenance est inconnue, il est ignoré et remplacé au prochain enregistrement
+        return {site: cles for site, cles in sites.items() if isinstance(cles, dict) and 'durees' not in cles}
+
+    def enregistrer(self):
+        """Fusionne les observations de ce processus dans le fichier (écriture atomique)."""
+        with self._verrou:
+            if not self._nouvelles:
+                return
+            nouvelles, self._nouvelles = self._nouvelles, {}
+        try:
+            dossier = os.path.dirname(self.chemin)
+            if dossier:
+                os.makedirs(dossier, exist_ok=True)
+            # Plusieurs processus travailleurs enregistrent en fin de session
+            with open(f"{self.chemin}.lock", 'w') as verrou:
+                if fcntl:
+                    fcntl.flock(verrou, fcntl.LOCK_EX)
+                sites = self._lire()
+                cles = sites.setdefault(self.site, {})
+                for cle, ajout in nouvelles.items():
+                    entree = cles.setdefault(cle, {'durees': [], 'succes': 0, 'expirations': 0})
+                    entree['durees'] = (entree['durees'] + ajout['durees'])[-FENETRE:]
+                    entree['succes'] += ajout['succes']
+                    entree['expirations'] += ajout['expirations']
+                temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+                with open(temporaire, 'w', encoding='utf-8') as f:
+                    json.dump(sites, f, indent=2, sort_keys=True)
+                os.replace(temporaire, self.chemin)
+            self.cles = cles
+            logger.debug(f"Délais d'attente de {self.site} enregistrés dans {self.chemin} ({len(nouvelles)} clés mises à jour).")
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer les délais d'attente {self.chemin}: {e}")
+
+    # --- Observations ---
+
+    def observer(self, cle, duree, abouti=True):
+        """Ajoute la durée d'une attente ; abouti=False pour une attente expirée (durée = délai accordé)."""
+        duree = round(duree, 3)
+        with self._verrou:
+            for cles in (self.cles, self._nouvelles):
+                entree = cles.setdefault(cle, {'durees': [], 'succes': 0, 'expirations': 0})
+                entree['durees'].append(duree)
+                del entree['durees'][:-FENETRE]
+                entree['succes' if abouti else 'expirations'] += 1
+            self._observees.add(cle)
+
+    def delai(self, cle, defaut):
+        """
+        Délai d'attente pour cle.
+
+        Args:
+            cle: Clé « étape:sélecteur »
+            defaut: Délai codé en dur, utilisé tant que les observations sont insuffisantes
+
+        Returns:
+            float: Délai en secondes
+        """
+        with self._verrou:
+            entree = self.cles.get(cle)
+            if not entree or len(entree['durees']) < OBSERVATIONS_MIN:
+                return defaut
+            if not entree['succes']:
+                # Sélecteur jamais trouvé sur le site
+                return self.plancher
+            valeur = percentile(entree['durees'], self.percentile) * (1 + self.marge)
+        return round(min(self.plafond, max(self.plancher, valeur)), 2)
+
+    def attendre(self, contexte, cle, condition, defaut):
+        """
+        WebDriverWait(contexte, délai).until(condition), en mesurant l'attente.
+
+        Returns:
+            Résultat de la condition
+
+        Raises:
+            TimeoutException: Si la condition n'est pas remplie dans le délai
+        """
+        delai = self.delai(cle, defaut)
+        debut = time.monotonic()
+        try:
+            resultat = WebDriverWait(contexte, delai).until(condition)
+        except TimeoutException:
+            self.observer(cle, delai, abouti=False)
+            raise
+        self.observer(cle, time.monotonic() - debut)
+        return resultat
+
+    def bilan(self):
+        """{clé: délai appris} des clés observées par ce processus et disposant d'assez d'observations."""
+        delais = {cle: self.delai(cle, None) for cle in sorted(self._observees)}
+        return {cle: delai for cle, delai in delais.items() if delai is not None}
+
+
+class DelaisFixes:
+    """Même interface que PolitiqueDelais, avec les délais codés en dur."""
+
+    def delai(self, cle, defaut):
+        return defaut
+
+    def attendre(self, contexte, cle, condition, defaut):
+        return WebDriverWait(contexte, defaut).until(condition)
+
+    def observer(self, cle, duree, abouti=True):
+        pass
+
+    def enregistrer(self):
+        pass
+
+    def bilan(self):
+        return {}
+
+
+_politique = None
+
+
+def politique():
+    """Politique du processus : apprise, sauf ADAPTIVE_TIMEOUTS=0 (hérité par les processus travailleurs)."""
+    global _politique
+    if _politique is None:
+        if os.getenv('ADAPTIVE_TIMEOUTS', '1').lower() in ('0', 'false', 'non'):
+            _politique = DelaisFixes()
+        else:
+            _politique = PolitiqueDelais()
+    return _politique
+
+
+def attendre(contexte, cle, condition, defaut):
+    """Attente WebDriverWait de la politique du processus (voir PolitiqueDelais.attendre)."""
+    return politique().attendre(contexte, cle, condition, defaut)
+
+
+def enregistrer():
+    """Persiste les observations de ce processus (fin de session ou de processus travailleur)."""
+    if _politique is not None:
+        _politique.enregistrer()
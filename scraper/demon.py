@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Démon de planification des sessions du scraper.
+
+Au lieu d'un processus lancé par cron pour chaque session, le démon tourne en
+continu. Il surveille la table users (PRAGMA data_version, une lecture par
+sondage) et relit les signatures des utilisateurs seulement quand une autre
+connexion a modifié la base. Un nouvel utilisateur, ou un utilisateur dont le
+profil ou les critères changent, est planifié aussitôt. Chaque utilisateur
+est ensuite relancé à intervalle fixe, avec une gigue qui étale les sessions.
+
+Les sessions tournent dans un pool de processus réutilisés : Selenium, le
+chromedriver résolu, les délais appris et l'état du disjoncteur restent
+chauds d'une session à l'autre.
+
+Chaque session a son propre dossier d'artefacts ; l'environnement modifié
+par une session (fichiers de mesures, magasin d'instantanés...) est restauré
+avant la suivante. Les sessions ne servent pas de métriques : avec
+--metrics-port PORT, chaque processus du pool sert les métriques cumulées de
+ses sessions sur le premier port libre de PORT à PORT + workers - 1.
+
+SIGTERM ou SIGINT arrête le démon proprement : plus aucune session n'est
+lancée, celles en cours vont à leur terme (les processus du pool ignorent le
+signal).
+
+Lancement (les arguments après -- sont transmis à chaque session) :
+    python scraper/demon.py --workers 2 --interval 3600 -- --headless --max-duration 1800
+"""
+
+import os
+import sys
+import time
+import random
+import signal
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Ajout du chemin racine pour les imports locaux
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from database.user_database import UserDatabase, chemin_base_de_donnees
+import journalisation
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux sessions d'un utilisateur (secondes, surchargé par DAEMON_INTERVAL)
+INTERVALLE_DEFAUT = 3600
+
+# Gigue appliquée à l'intervalle, en fraction (surchargée par DAEMON_JITTER)
+GIGUE_DEFAUT = 0.1
+
+# Période de sondage de la base et des sessions terminées (secondes, surchargée par DAEMON_POLL)
+SONDAGE_DEFAUT = 5
+
+
+# --- Côté processus du pool ---
+
+def _servir_metriques(port, nb_ports):
+    """Sert les métriques du processus sur le premier port libre de port à port + nb_ports - 1."""
+    import metriques
+    for candidat in range(port, port + nb_ports):
+        try:
+            return metriques.servir(candidat)
+        except OSError:
+            continue
+    logger.warning(f"Aucun port libre entre {port} et {port + nb_ports - 1} : métriques non servies par ce processus.")
+    return None
+
+
+def _initialiser_travailleur(contexte_journal=None, port_metriques=None, nb_ports=1):
+    """Charge le scraper une fois par processus du pool."""
+    journalisation.rattacher(contexte_journal)
+    # L'arrêt est piloté par le démon : une session en cours va jusqu'à son terme
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import iquesta_scraper
+    try:
+        iquesta_scraper.chemin_chromedriver()
+    except Exception as e:
+        logger.warning(f"Résolution anticipée du chromedriver impossible: {str(e)[:100]}")
+    if port_metriques:
+        _servir_metriques(port_metriques, nb_ports)
+
+
+def _session(email, arguments):
+    """Lance une session du scraper pour email et retourne un résumé court."""
+    import iquesta_scraper
+    import reseau_cdp
+    from disjoncteur import sante
+    # Bilans propres à la session ; l'état du disjoncteur est conservé
+    reseau_cdp.blocage.reinitialiser()
+    sante().reinitialiser_bilan()
+    environnement = dict(os.environ)
+    try:
+        # Les sessions simultanées ne se disputent pas un port : métriques servies par le processus
+        resume = iquesta_scraper.main(['--email', email, *arguments, '--metrics-port', '0'])
+    finally:
+        # Variables posées par la session (NETWORK_TIMINGS_FILE, SNAPSHOTS_DIR...) : la suivante repart de celles du démon
+        os.environ.clear()
+        os.environ.update(environnement)
+    if not resume:
+        return None
+    return {cle: resume.get(cle, 0) for cle in ('decouvertes', 'envoyees', 'echecs', 'duree')}
+
+
+# --- Côté démon ---
+
+class Planificateur:
+    """
+    Planifie une session par utilisateur à intervalle régulier.
+
+    Args:
+        db_path: Chemin de la base SQLite
+        nb_travailleurs: Nombre de sessions simultanées (processus du pool)
+        intervalle: Intervalle entre deux sessions d'un utilisateur (secondes)
+        gigue: Fraction de l'intervalle tirée au hasard (±) pour étaler les sessions
+        arguments: Arguments transmis à chaque session du scraper
+        sondage: Période de sondage de la base (secondes)
+        port_metriques: Premier port des métriques servies par les processus du pool (None : aucun)
+    """
+
+    def __init__(self, db_path, nb_travailleurs=1, intervalle=INTERVALLE_DEFAUT, gigue=GIGUE_DEFAUT, arguments=(),
+                 sondage=SONDAGE_DEFAUT, port_metriques=None):
+        self.db_path = db_path
+        self.nb_travailleurs = nb_travailleurs
+        self.intervalle = intervalle
+        self.gigue = gigue
+        self.arguments = list(arguments)
+        self.sondage = sondage
+        self.port_metriques = port_metriques
+        self.utilisateurs = {}
+        # {user_id: échéance time.monotonic()} ; absent pendant la session de l'utilisateur
+        self.prochaines = {}
+        self.en_cours = {}
+        self.version = None
+        self.arret = []
+        self._executeur = None
+
+    def _delai(self):
+        return self.intervalle * (1 + random.uniform(-self.gigue, self.gigue))
+
+    def _bientot(self):
+        return time.monotonic() + random.uniform(0, self.gigue * self.intervalle)
+
+    def synchroniser(self, db):
+        """Relit les utilisateurs si la base a changé et planifie les nouveaux ou modifiés."""
+        version = db.data_version()
+        if version == self.version:
+            return
+        versions = db.get_user_versions()
+        if versions is None:
+            return
+        self.version = version
+        for user_id, info in versions.items():
+            ancien = self.utilisateurs.get(user_id)
+            if ancien is None:
+                logger.info(f"Utilisateur {info['email']} planifié.")
+                self.prochaines[user_id] = self._bientot()
+            elif ancien['signature'] != info['signature']:
+                logger.info(f"Profil de {info['email']} modifié, session avancée.")
+                self.prochaines[user_id] = min(self.prochaines.get(user_id, float('inf')), self._bientot())
+        for user_id in set(self.utilisateurs) - set(versions):
+            logger.info(f"Utilisateur {self.utilisateurs[user_id]['email']} supprimé, plus planifié.")
+            self.prochaines.pop(user_id, None)
+        self.utilisateurs = versions
+
+    def _nouvel_executeur(self):
+        return ProcessPoolExecutor(max_workers=self.nb_travailleurs, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_initialiser_travailleur,
+                                   initargs=(journalisation.contexte_journal(), self.port_metriques, self.nb_travailleurs))
+
+    def lancer_echues(self):
+        """Soumet au pool les sessions arrivées à échéance, dans la limite des processus libres."""
+        maintenant = time.monotonic()
+        occupes = set(self.en_cours.values())
+        for user_id, prochaine in sorted(self.prochaines.items(), key=lambda element: element[1]):
+            if len(self.en_cours) >= self.nb_travailleurs or prochaine > maintenant:
+                break
+            if user_id in occupes:
+                # Modifié pendant sa session : relancé à la fin de celle-ci
+                continue
+            email = self.utilisateurs[user_id]['email']
+            try:
+                futur = self._executeur.submit(_session, email, self.arguments)
+            except BrokenProcessPool:
+                logger.error("Pool de processus inutilisable, recréation.")
+                self._executeur = self._nouvel_executeur()
+                return
+            logger.info(f"Session lancée pour {email}.")
+            self.en_cours[futur] = user_id
+            del self.prochaines[user_id]
+
+    def collecter(self):
+        """Journalise les sessions terminées et replanifie leurs utilisateurs."""
+        for futur in [f for f in self.en_cours if f.done()]:
+            user_id = self.en_cours.pop(futur)
+            email = self.utilisateurs.get(user_id, {}).get('email', user_id)
+            try:
+                resume = futur.result()
+            except BrokenProcessPool:
+                logger.error(f"Processus du pool arrêté pendant la session de {email}.")
+            except Exception as e:
+                logger.error(f"Session de {email} en erreur: {type(e).__name__}: {str(e)[:200]}")
+            else:
+                if resume:
+                    logger.info(f"Session de {email} terminée : {resume['envoyees']} candidatures, "
+                                f"{resume['echecs']} échecs, {resume['duree']:.0f}s.")
+                else:
+                    logger.warning(f"Session de {email} non démarrée (profil incomplet ?).")
+            if user_id in self.utilisateurs and user_id not in self.prochaines:
+                self.prochaines[user_id] = time.monotonic() + self._delai()
+
+    def executer(self):
+        """Boucle du démon, jusqu'à SIGTERM/SIGINT puis fin des sessions en cours."""
+        def demander_arret(signum, frame):
+            self.arret.append(signum)
+        signal.signal(signal.SIGTERM, demander_arret)
+        signal.signal(signal.SIGINT, demander_arret)
+
+        db = UserDatabase(self.db_path)
+        self._executeur = self._nouvel_executeur()
+        logger.info(f"Démon actif ({self.nb_travailleurs} processus, intervalle {self.intervalle:.0f}s "
+                    f"± {self.gigue:.0%}).")
+        try:
+            while not self.arret:
+                self.synchroniser(db)
+                self.collecter()
+                self.lancer_echues()
+                time.sleep(self.sondage)
+            logger.info(f"Arrêt demandé : fin des {len(self.en_cours)} sessions en cours.")
+            self._executeur.shutdown(wait=True)
+            self.collecter()
+        finally:
+            db.close()
+        logger.info("Démon arrêté.")
+
+
+def construire_parser():
+    parser = argparse.ArgumentParser(description="Planifie en continu les sessions du scraper iQuesta de chaque utilisateur.")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('DAEMON_WORKERS', 1)), help="Nombre de sessions simultanées (processus réutilisés).")
+    parser.add_argument('--interval', type=float, default=float(os.getenv('DAEMON_INTERVAL', INTERVALLE_DEFAUT)), metavar='SECONDES', help="Intervalle entre deux sessions d'un même utilisateur.")
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('DAEMON_JITTER', GIGUE_DEFAUT)), help="Gigue de l'intervalle, en fraction (0.1 : ±10 %%).")
+    parser.add_argument('--poll', type=float, default=float(os.getenv('DAEMON_POLL', SONDAGE_DEFAUT)), metavar='SECONDES', help="Période de sondage de la base.")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('DAEMON_METRICS_PORT', 0)) or None, metavar='PORT', help="Chaque processus du pool sert ses métriques sur le premier port libre de PORT à PORT + workers - 1.")
+    parser.add_argument('arguments', nargs=argparse.REMAINDER, help="Arguments transmis à chaque session (après --).")
+    return parser
+
+
+def main(argv=None):
+    args = construire_parser().parse_args(argv)
+    # Réglages LOG_* de l'environnement ; les sessions écrivent dans la même file
+    journalisation.configurer_journalisation()
+    arguments = args.arguments[1:] if args.arguments[:1] == ['--'] else args.arguments
+    if any(argument.startswith('--metrics-port') for argument in arguments):
+        logger.warning("--metrics-port ignoré pour les sessions : utilisez --metrics-port du démon.")
+    # Même résolution du chemin de la base (et du .env) que les sessions
+    import iquesta_scraper
+    Planificateur(chemin_base_de_donnees(), args.workers, args.interval, args.jitter, arguments,
+                  args.poll, args.metrics_port).executer()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Disjoncteur de santé du site iquesta.com.
+
+Les temps de chargement des pages et les résultats (succès ou erreur) de la
+recherche, de l'ouverture des offres et des candidatures alimentent une
+fenêtre glissante. Seuls les signaux techniques comptent comme erreurs :
+exceptions (délai expiré, session interrompue) et réponses HTTP 5xx. Une offre
+à laquelle on ne peut pas postuler (pas de formulaire, candidature externe) ne
+dit rien de la santé du site. Quand le taux d'erreur ou la latence médiane
+dépasse son seuil, le disjoncteur s'ouvre : aucune offre n'est commencée
+pendant une pause qui double à chaque ouverture consécutive. La pause écoulée,
+il passe en semi-ouvert et une requête de sonde (page d'accueil) décide de sa
+fermeture ou d'une nouvelle pause.
+
+Chaque processus a son propre disjoncteur ; les réglages (CIRCUIT_*) sont
+lus dans l'environnement, hérité par les processus travailleurs.
+"""
+
+import os
+import time
+import logging
+import functools
+import threading
+from collections import deque
+
+import metriques
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+FERME = 'ferme'
+OUVERT = 'ouvert'
+SEMI_OUVERT = 'semi_ouvert'
+
+# Seuils d'ouverture (surchargés par CIRCUIT_ERROR_RATE et CIRCUIT_MAX_LATENCY)
+TAUX_ERREUR_MAX_DEFAUT = 0.5
+LATENCE_MAX_DEFAUT = 20.0
+
+# Pause après la première ouverture, doublée à chaque ouverture consécutive
+# jusqu'au plafond (surchargées par CIRCUIT_PAUSE et CIRCUIT_MAX_PAUSE)
+PAUSE_INITIALE_DEFAUT = 30.0
+PAUSE_MAX_DEFAUT = 600.0
+
+# Taille de la fenêtre glissante et nombre de mesures nécessaires avant de juger
+FENETRE = 10
+OBSERVATIONS_MIN = 4
+
+
+class Disjoncteur:
+    """
+    Disjoncteur fermé / ouvert / semi-ouvert avec pause exponentielle.
+
+    Args:
+        taux_erreur_max: Part d'erreurs dans la fenêtre au-delà de laquelle le disjoncteur s'ouvre
+        latence_max: Temps de chargement médian (secondes) au-delà duquel il s'ouvre
+        pause_initiale: Pause après la première ouverture (secondes)
+        pause_max: Plafond de la pause (secondes)
+        actif: False pour ne jamais ouvrir (observations ignorées)
+    """
+
+    def __init__(self, taux_erreur_max=None, latence_max=None, pause_initiale=None, pause_max=None, actif=True):
+        self.taux_erreur_max = (taux_erreur_max if taux_erreur_max is not None
+                                else float(os.getenv('CIRCUIT_ERROR_RATE', TAUX_ERREUR_MAX_DEFAUT)))
+        self.latence_max = latence_max if latence_max is not None else float(os.getenv('CIRCUIT_MAX_LATENCY', LATENCE_MAX_DEFAUT))
+        self.pause_initiale = (pause_initiale if pause_initiale is not None
+                               else float(os.getenv('CIRCUIT_PAUSE', PAUSE_INITIALE_DEFAUT)))
+        self.pause_max = pause_max if pause_max is not None else float(os.getenv('CIRCUIT_MAX_PAUSE', PAUSE_MAX_DEFAUT))
+        self.actif = actif
+        self.etat = FERME
+        self.resultats = deque(maxlen=FENETRE)
+        self.chargements = deque(maxlen=FENETRE)
+        self.ouvertures = 0
+        self.ouvertures_consecutives = 0
+        self.pause_totale = 0.0
+        self._reouverture = None
+        self._verrou = threading.Lock()
+        # Une seule sonde à la fois (étapes du pipeline async dans des threads distincts)
+        self._verrou_sonde = threading.Lock()
+
+    # --- Observations ---
+
+    def observer(self, succes, source=''):
+        """Ajoute le résultat d'une opération (recherche, ouverture d'offre, candidature)."""
+        if not self.actif:
+            return
+        with self._verrou:
+            self.resultats.append(bool(succes))
+            self._evaluer(source)
+
+    def observer_chargement(self, duree, source=''):
+        """Ajoute le temps de chargement d'une page (secondes)."""
+        if not self.actif:
+            return
+        with self._verrou:
+            self.chargements.append(duree)
+            self._evaluer(source)
+
+    def _raison_ouverture(self):
+        if len(self.resultats) >= OBSERVATIONS_MIN:
+            taux = self.resultats.count(False) / len(self.resultats)
+            if taux >= self.taux_erreur_max:
+                return f"taux d'erreur {taux:.0%}"
+        if len(self.chargements) >= OBSERVATIONS_MIN:
+            mediane = sorted(self.chargements)[len(self.chargements) // 2]
+            if mediane > self.latence_max:
+                return f"chargement médian {mediane:.1f}s > {self.latence_max:.0f}s"
+        return None
+
+    def _evaluer(self, source):
+        if self.etat == FERME and (raison := self._raison_ouverture()):
+            self._ouvrir(f"{raison}{f', {source}' if source else ''}")
+
+    # --- Transitions ---
+
+    def _ouvrir(self, raison):
+        pause = min(self.pause_max, self.pause_initiale * 2 ** self.ouvertures_consecutives)
+        self.etat = OUVERT
+        self._reouverture = time.monotonic() + pause
+        self.ouvertures += 1
+        self.ouvertures_consecutives += 1
+        metriques.ouvertures_disjoncteur.inc()
+        logger.warning(f"⚡ Disjoncteur ouvert ({raison}) : pause de {pause:.0f}s avant la sonde.")
+
+    def _fermer(self):
+        self.etat = FERME
+        self.ouvertures_consecutives = 0
+        # Nouvelle fenêtre : les mesures de la panne ne doivent pas rouvrir le disjoncteur
+        self.resultats.clear()
+        self.chargements.clear()
+        logger.info("Disjoncteur refermé, reprise du traitement.")
+
+    def ferme(self):
+        return self.etat == FERME
+
+    def pause_restante(self):
+        if self.etat != OUVERT:
+            return 0.0
+        return max(0.0, self._reouverture - time.monotonic())
+
+    def patienter(self, sonde, echeance=None):
+        """
+        Attend que le disjoncteur soit fermé avant une nouvelle offre.
+
+        Tant qu'il est ouvert, attend la fin de la pause puis passe en semi-ouvert
+        et appelle sonde() : la sonde ferme le disjoncteur si elle réussit dans le
+        délai de latence, sinon une pause plus longue commence.
+
+        Args:
+            sonde: Fonction sans argument chargeant une page du site (lève une exception en cas d'échec)
+            echeance: Horodatage time.time() au-delà duquel il est inutile d'attendre (budget de session)
+
+        Returns:
+            bool: True si le traitement peut continuer, False si la pause dépasse l'échéance
+        """
+        while self.actif and not self.ferme():
+            pause = self.pause_restante()
+            if echeance is not None and time.time() + pause >= echeance:
+                logger.warning("Disjoncteur ouvert au-delà de l'échéance de la session.")
+                return False
+            if pause:
+                time.sleep(pause)
+                self.pause_totale += pause
+                metriques.pause_disjoncteur.inc(pause)
+            with self._verrou_sonde:
+                if self.etat != OUVERT or self.pause_restante():
+                    # Sonde déjà faite par un autre thread
+                    continue
+                with self._verrou:
+                    self.etat = SEMI_OUVERT
+                logger.info("Disjoncteur semi-ouvert : requête de sonde.")
+                debut = time.monotonic()
+                try:
+                    sonde()
+                    duree = time.monotonic() - debut
+                    erreur = f"sonde lente ({duree:.1f}s)" if duree > self.latence_max else None
+                except Exception as e:
+                    erreur = f"sonde en échec: {str(e)[:100]}"
+                with self._verrou:
+                    if erreur:
+                        self._ouvrir(erreur)
+                    else:
+                        self._fermer()
+        return True
+
+    def reinitialiser_bilan(self):
+        """Remet les compteurs du bilan à zéro, sans changer l'état (nouvelle session dans un processus réutilisé)."""
+        self.ouvertures = 0
+        self.pause_totale = 0.0
+
+    def bilan(self):
+        """Ouvertures et temps passé en pause, pour le résumé de session."""
+        return {'ouvertures': self.ouvertures, 'pause': round(self.pause_totale, 1), 'etat': self.etat}
+
+
+def surveiller(source):
+    """
+    Décorateur : une exception levée par la fonction compte comme une erreur pour le disjoncteur.
+
+    Tout retour, y compris False (offre sans formulaire, candidature externe),
+    compte comme un succès : le site a répondu.
+    """
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            try:
+                resultat = fonction(*args, **kwargs)
+            except Exception:
+                sante().observer(False, source)
+                raise
+            sante().observer(True, source)
+            return resultat
+        return enveloppe
+    return decorateur
+
+
+def statut_http(driver):
+    """Code HTTP de la page chargée (Navigation Timing), ou None s'il n'est pas disponible."""
+    try:
+        statut = driver.execute_script(
+            "const n = performance.getEntriesByType('navigation')[0]; return n ? n.responseStatus : null;")
+    except Exception:
+        return None
+    return statut if isinstance(statut, int) and statut > 0 else None
+
+
+def fusionner_bilans(bilans):
+    """Additionne les bilans des disjoncteurs de plusieurs processus."""
+    total = {'ouvertures': 0, 'pause': 0.0}
+    for bilan in bilans:
+        total['ouvertures'] += bilan.get('ouvertures', 0)
+        total['pause'] = round(total['pause'] + bilan.get('pause', 0.0), 1)
+    return total
+
+
+_sante = None
+
+
+def sante():
+    """Disjoncteur du processus (inactif si CIRCUIT_BREAKER=0)."""
+    global _sante
+    if _sante is None:
+        _sante = Disjoncteur(actif=os.getenv('CIRCUIT_BREAKER', '1').lower() not in ('0', 'false', 'non'))
+    return _sante
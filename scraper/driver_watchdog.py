@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module de supervision du WebDriver pour le scraper iQuesta.
+Ce module impose une échéance par offre, détecte une session morte ou
+bloquée et recrée le navigateur pour que la suite du traitement continue.
+Le navigateur est aussi recyclé entre deux offres quand sa mémoire dépasse un
+seuil ou après un nombre donné d'offres ouvertes.
+"""
+
+import time
+import logging
+import threading
+from selenium.common.exceptions import WebDriverException
+
+from memoire_navigateur import rss_navigateur
+import metriques
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Délai par défaut (en secondes) accordé au traitement complet d'une offre
+DELAI_OFFRE_DEFAUT = 300
+# Délai de chargement d'une page imposé au driver
+DELAI_CHARGEMENT_PAGE = 60
+# Délai accordé à la sonde de vie et à la fermeture du driver (secondes)
+DELAI_SONDE = 5
+# Intervalle minimal entre deux mesures mémoire (parcours de /proc) avant une offre (secondes)
+INTERVALLE_MESURE_MEMOIRE = 30
+
+
+class DelaiOffreDepasse(Exception):
+    """Levée lorsque le traitement d'une offre dépasse son échéance."""
+
+
+def _appeler_avec_delai(fonction, delai, nom="offre-selenium"):
+    """
+    Exécute fonction() dans un thread séparé et attend au plus delai secondes.
+
+    Returns:
+        dict: {'valeur': ...} ou {'erreur': ...}, ou None si l'appel est toujours bloqué
+    """
+    resultat = {}
+
+    def cible():
+        try:
+            resultat['valeur'] = fonction()
+        except BaseException as e:
+            resultat['erreur'] = e
+
+    thread = threading.Thread(target=cible, name=nom, daemon=True)
+    thread.start()
+    thread.join(delai)
+    return None if thread.is_alive() else resultat
+
+
+class SuperviseurDriver:
+    """
+    Encapsule le WebDriver et le recrée lorsqu'il est mort ou bloqué.
+
+    Args:
+        fabrique: Fonction sans argument retournant un nouveau driver (ou None)
+        preparation: Fonction appelée avec le nouveau driver (page d'accueil, cookies)
+        delai_offre: Échéance en secondes pour le traitement d'une offre
+        memoire_max_mo: RSS (Mo) de l'arbre chromedriver/Chrome au-delà de laquelle
+            le navigateur est recyclé entre deux offres (None : pas de seuil) ;
+            mesurée au plus toutes les INTERVALLE_MESURE_MEMOIRE secondes
+        offres_max: Nombre d'offres ouvertes par un navigateur avant son
+            recyclage (None : pas de limite)
+    """
+
+    def __init__(self, fabrique, preparation=None, delai_offre=DELAI_OFFRE_DEFAUT, memoire_max_mo=None, offres_max=None):
+        self.fabrique = fabrique
+        self.preparation = preparation
+        self.delai_offre = delai_offre
+        self.memoire_max_mo = memoire_max_mo
+        self.offres_max = offres_max
+        self.driver = None
+        self.redemarrages = 0
+        self.recyclages = 0
+        self.offres_navigateur = 0
+        self.memoire_mo = None
+        self.pic_memoire_mo = None
+        self._mesure_memoire = None
+        self._echeance = None
+
+    def demarrer(self):
+        """Crée le premier driver. Retourne le driver ou None en cas d'échec."""
+        self.driver = self._creer_driver()
+        return self.driver
+
+    def _creer_driver(self):
+        driver = self.fabrique()
+        if not driver:
+            return None
+        try:
+            driver.set_page_load_timeout(DELAI_CHARGEMENT_PAGE)
+            if self.preparation:
+                self.preparation(driver)
+        except Exception as e:
+            logger.error(f"Erreur lors de la préparation du nouveau driver: {e}")
+        return driver
+
+    def est_vivant(self):
+        """Vérifie que la session répond encore (fenêtre ouverte, chromedriver joignable)."""
+        if not self.driver:
+            return False
+        driver = self.driver
+
+        def sonde():
+            _ = driver.current_window_handle
+            _ = driver.title
+
+        resultat = _appeler_avec_delai(sonde, DELAI_SONDE, nom="sonde-selenium")
+        if resultat is None:
+            logger.warning(f"Le navigateur ne répond plus depuis {DELAI_SONDE}s.")
+            return False
+        erreur = resultat.get('erreur')
+        if isinstance(erreur, WebDriverException):
+            logger.warning(f"Session du navigateur inutilisable: {str(erreur)[:100]}")
+            return False
+        if erreur is not None:
+            logger.warning(f"Le navigateur ne répond plus: {str(erreur)[:100]}")
+            return False
+        return True
+
+    def redemarrer(self, raison, recyclage=False):
+        """Ferme l'ancien driver (si possible) et en crée un nouveau."""
+        if recyclage:
+            logger.info(f"♻️ Recyclage du navigateur ({raison})...")
+        else:
+            logger.warning(f"🔄 Redémarrage du navigateur ({raison})...")
+        self.fermer()
+        self.driver = self._creer_driver()
+        if recyclage:
+            self.recyclages += 1
+            metriques.recyclages_navigateur.inc()
+        else:
+            self.redemarrages += 1
+            metriques.redemarrages_navigateur.inc()
+        if self.driver:
+            logger.info(f"Navigateur recréé ({'recyclage' if recyclage else 'redémarrage'} "
+                        f"n°{self.recyclages if recyclage else self.redemarrages}).")
+        else:
+            logger.critical("Impossible de recréer le navigateur.")
+        return self.driver
+
+    def mesurer_memoire(self):
+        """Mesure la RSS du navigateur courant (Mo) et met à jour le pic de la session."""
+        self.memoire_mo = rss_navigateur(self.driver) if self.driver else None
+        self._mesure_memoire = time.monotonic()
+        if self.memoire_mo is not None:
+            self.pic_memoire_mo = max(self.pic_memoire_mo or 0, self.memoire_mo)
+        return self.memoire_mo
+
+    def _raison_recyclage(self):
+        if self.offres_max and self.offres_navigateur >= self.offres_max:
+            return f"{self.offres_navigateur} offres ouvertes"
+        # Mesure espacée : le seuil est vérifié au plus toutes les INTERVALLE_MESURE_MEMOIRE secondes
+        if self._mesure_memoire is None or time.monotonic() - self._mesure_memoire >= INTERVALLE_MESURE_MEMOIRE:
+            self.mesurer_memoire()
+        memoire = self.memoire_mo
+        if self.memoire_max_mo and memoire is not None and memoire > self.memoire_max_mo:
+            return f"{memoire:.0f} Mo > {self.memoire_max_mo} Mo"
+        return None
+
+    def nouvelle_offre(self):
+        """Démarre l'échéance d'une nouvelle offre et s'assure que le driver est utilisable."""
+        self._echeance = time.monotonic() + self.delai_offre
+        if not self.est_vivant():
+            self.redemarrer("session morte avant l'offre")
+        elif (raison := self._raison_recyclage()):
+            # Entre deux offres : aucun formulaire n'est en cours
+            self.redemarrer(raison, recyclage=True)
+        self.offres_navigateur += 1
+        return self.driver
+
+    def relancer_echeance(self):
+        """Redémarre l'échéance de l'offre courante sans toucher au navigateur (page déjà chargée)."""
+        self._echeance = time.monotonic() + self.delai_offre
+
+    def sonder(self):
+        """Requête de sonde du disjoncteur : refait la préparation (page d'accueil) du navigateur."""
+        self._echeance = time.monotonic() + min(self.delai_offre, DELAI_CHARGEMENT_PAGE)
+        if not self.est_vivant():
+            self.redemarrer("session morte avant la sonde")
+        return self.executer(self.preparation or (lambda driver: driver.current_url))
+
+    def bilan_memoire(self):
+        """Mémoire actuelle et pic (Mo) du navigateur, et nombre de recyclages."""
+        if self.driver:
+            self.mesurer_memoire()
+        return {'rss_mo': self.memoire_mo, 'pic_mo': self.pic_memoire_mo, 'recyclages': self.recyclages}
+
+    def temps_restant(self):
+        """Temps restant (en secondes) avant l'échéance de l'offre courante."""
+        if self._echeance is None:
+            return self.delai_offre
+        return max(0.0, self._echeance - time.monotonic())
+
+    def executer(self, fonction, *args, **kwargs):
+        """
+        Exécute fonction(driver, *args, **kwargs) dans la limite de l'échéance de l'offre.
+
+        L'appel Selenium bloqué tourne dans un thread séparé : si l'échéance est
+        dépassée, le driver est fermé (ce qui débloque le thread) puis recréé.
+
+        Raises:
+            DelaiOffreDepasse: si l'échéance est dépassée
+            WebDriverException: si la session meurt pendant l'appel
+        """
+        if not self.driver:
+            raise WebDriverException("Aucun navigateur disponible")
+
+        restant = self.temps_restant()
+        if restant <= 0:
+            raise DelaiOffreDepasse("Échéance de l'offre déjà dépassée")
+
+        driver = self.driver
+        resultat = _appeler_avec_delai(lambda: fonction(driver, *args, **kwargs), restant)
+
+        if resultat is None:
+            logger.error(f"⏱️ Échéance de {self.delai_offre}s dépassée pour l'offre en cours.")
+            self.redemarrer("échéance de l'offre dépassée")
+            raise DelaiOffreDepasse(f"Traitement interrompu après {self.delai_offre}s")
+
+        if 'erreur' in resultat:
+            erreur = resultat['erreur']
+            if isinstance(erreur, WebDriverException) and not self.est_vivant():
+                self.redemarrer(type(erreur).__name__)
+            raise erreur
+        return resultat.get('valeur')
+
+    def fermer(self):
+        """Ferme le driver courant sans propager les erreurs."""
+        self.offres_navigateur = 0
+        # La prochaine offre mesure le nouveau navigateur
+        self.memoire_mo = None
+        self._mesure_memoire = None
+        if self.driver:
+            driver = self.driver
+            resultat = _appeler_avec_delai(driver.quit, DELAI_SONDE, nom="fermeture-selenium")
+            if resultat is None:
+                # chromedriver bloqué : arrêt forcé de son processus (et donc de Chrome)
+                logger.debug(f"Fermeture du navigateur bloquée après {DELAI_SONDE}s, arrêt forcé du chromedriver.")
+                try:
+                    driver.service.process.kill()
+                except Exception as e:
+                    logger.debug(f"Arrêt forcé du chromedriver impossible: {e}")
+            elif 'erreur' in resultat:
+                logger.debug(f"Erreur lors de la fermeture du navigateur: {resultat['erreur']}")
+            self.driver = None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Empreintes SimHash du contenu des offres.
+
+Une offre republiée sous une nouvelle URL garde, à quelques mots près, son
+titre, son entreprise et sa description : leurs empreintes SimHash 64 bits
+restent proches (une dizaine de bits au plus), quand deux offres distinctes
+en diffèrent d'une vingtaine ou plus. Sur les textes très courts (quelques
+dizaines de mots), chaque mot changé pèse davantage et l'écart est plus grand. La distance de Hamming entre deux empreintes
+permet de reconnaître ces doublons avant de postuler une seconde fois.
+"""
+
+import hashlib
+import numpy as np
+
+from classement import tokeniser
+
+# Taille des séquences de mots hachées (shingles) : les paires de mots
+# distinguent deux offres écrites sur le même gabarit, que les mots isolés
+# confondent
+TAILLE_SHINGLE = 2
+
+# Distance de Hamming maximale entre deux offres considérées comme identiques.
+# Calibrée par tests/test_empreintes.py : une offre de 300 mots dont 5 mots
+# changent reste à 10 bits au plus dans 98 % des cas, deux offres distinctes
+# partageant la moitié de leur texte sont au-delà
+DISTANCE_DEFAUT = 10
+
+_MASQUE = (1 << 64) - 1
+
+
+def simhash(texte):
+    """
+    Empreinte SimHash 64 bits du texte.
+
+    Returns:
+        int: Empreinte signée (stockable telle quelle dans une colonne INTEGER
+        SQLite), ou None si le texte ne contient aucun mot
+    """
+    mots = tokeniser(texte)
+    if not mots:
+        return None
+    shingles = {' '.join(mots[i:i + TAILLE_SHINGLE]) for i in range(max(1, len(mots) - TAILLE_SHINGLE + 1))}
+    condensats = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(condensats, dtype=np.uint8).reshape(-1, 8), axis=1)
+    # Chaque shingle vote pour chaque bit : 1 si majoritaire
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), 'big', signed=True)
+
+
+def empreinte_offre(titre, entreprise, description):
+    """Empreinte du contenu d'une offre (titre, entreprise et description complète)."""
+    return simhash(' '.join((titre or '', entreprise or '', description or '')))
+
+
+def distance_hamming(a, b):
+    """Nombre de bits différents entre deux empreintes."""
+    return bin((a ^ b) & _MASQUE).count('1')
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Serveur HTTP local imitant les pages d'iquesta.com utilisées par le scraper.
+
+Pages servies :
+- / : formulaire de recherche (#controlTerm, #selectRegion) et bannière de cookies
+- /jobs : résultats (#offerFormSearch, filtres de contrat, liens a.fw-bold)
+- /job/<n> : page d'offre avec formulaire de candidature multipart (cv, lm)
+- POST /job/<n>/apply : réception de la candidature
+
+La latence et le taux d'échec (réponses 503) sont configurables pour les mesures
+de performance.
+"""
+
+import time
+import random
+import logging
+import threading
+from html import escape
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+REGIONS = {
+    "10": "Ile de France",
+    "11": "Auvergne-Rhône-Alpes",
+    "12": "Provence-Alpes-Côte d'Azur",
+}
+
+# (valeur du filtre, libellé affiché sur le site)
+CONTRATS = [
+    ("emploi", "Emploi"),
+    ("stage", "Stage"),
+    ("alternance", "Contrat en alternance"),
+]
+
+ENTREPRISES = ["Artelia", "Voyages Plus", "DataSoft", "WebAgency", "FinTech Lab"]
+
+
+def _page(titre, corps):
+    return (
+        "<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'>"
+        f"<title>{escape(titre)} - iQuesta (local)</title></head><body>{corps}</body></html>"
+    )
+
+
+def _options_regions(selection):
+    options = ["<option value=''>Toutes les régions</option>"]
+    for valeur, libelle in REGIONS.items():
+        selectionne = " selected" if valeur == selection else ""
+        options.append(f"<option value='{valeur}'{selectionne}>{escape(libelle)}</option>")
+    return "".join(options)
+
+
+class FauxIquesta:
+    """
+    Serveur local imitant iquesta.com.
+
+    Args:
+        port: Port d'écoute (0 = port libre choisi par le système)
+        nb_offres: Nombre d'offres publiées
+        latence: Délai fixe ajouté à chaque réponse (secondes)
+        gigue: Délai aléatoire supplémentaire maximal (secondes)
+        taux_echec: Probabilité de répondre 503 à une requête
+        graine: Graine du générateur aléatoire (résultats reproductibles)
+    """
+
+    def __init__(self, port=0, nb_offres=15, latence=0.0, gigue=0.0, taux_echec=0.0, graine=None):
+        self.nb_offres = nb_offres
+        self.latence = latence
+        self.gigue = gigue
+        self.taux_echec = taux_echec
+        self._aleatoire = random.Random(graine)
+        self._verrou = threading.Lock()
+        self.stats = {'requetes': 0, 'echecs_injectes': 0, 'candidatures': 0, 'candidatures_invalides': 0}
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._gestionnaire())
+        self._thread = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self._serveur.server_address[1]}/"
+
+    def offre(self, numero):
+        """Données synthétiques de l'offre numero (déterministes)."""
+        valeur_contrat, libelle_contrat = CONTRATS[numero % len(CONTRATS)]
+        return {
+            'numero': numero,
+            'titre': f"Développeur Web #{numero}",
+            'entreprise': ENTREPRISES[numero % len(ENTREPRISES)],
+            'lieu': "Paris",
+            'contrat': valeur_contrat,
+            'libelle_contrat': libelle_contrat,
+            'description': f"Offre n°{numero} : développement d'applications web. " * 20,
+        }
+
+    def _compter(self, cle):
+        with self._verrou:
+            self.stats[cle] += 1
+
+    def _tirer_echec(self):
+        with self._verrou:
+            return self._aleatoire.random() < self.taux_echec
+
+    def _attendre(self):
+        delai = self.latence
+        if self.gigue:
+            with self._verrou:
+                delai += self._aleatoire.uniform(0, self.gigue)
+        if delai:
+            time.sleep(delai)
+
+    # --- Pages ---
+
+    def page_accueil(self):
+        return _page("Accueil", f"""
+<div id="didomi-notice"><p>Ce site utilise des cookies.</p>
+<button id="didomi-notice-agree-button" onclick="this.parentNode.remove()">Accepter</button></div>
+<form action="/jobs" method="get" id="homeSearch">
+  <input id="controlTerm" class="form-control" name="term" placeholder="Que cherchez-vous ?">
+  <select id="selectRegion" name="regions">{_options_regions('')}</select>
+  <button type="submit" class="btn btn-primary">Rechercher</button>
+</form>""")
+
+    def page_resultats(self, params):
+        terme = params.get('term', [''])[0]
+        region = params.get('regions', [''])[0]
+        contrats = set(params.get('contrat', []))
+        offres = [self.offre(n) for n in range(1, self.nb_offres + 1)]
+        if contrats:
+            offres = [o for o in offres if o['contrat'] in contrats]
+        filtres = "".join(
+            f"<input type='checkbox' id='contrat-{valeur}' name='contrat' value='{valeur}'"
+            f"{' checked' if valeur in contrats else ''} onchange='this.form.submit()'>"
+            f"<label for='contrat-{valeur}'>{escape(libelle)}</label>"
+            for valeur, libelle in CONTRATS
+        )
+        cartes = "".join(
+            f"<div class='card'><a class='fw-bold' href='/job/{o['numero']}'>{escape(o['titre'])}</a>"
+            f"<span class='company'>{escape(o['entreprise'])}</span>"
+            f"<span class='location'>{escape(o['lieu'])}</span> - {escape(o['libelle_contrat'])}</div>"
+            for o in offres
+        )
+        return _page("Offres", f"""
+<form action="/jobs" method="get" id="offerFormSearch">
+  <input name="term" value="{escape(terme)}" placeholder="Que cherchez-vous ?">
+  <select id="selectRegion" name="regions">{_options_regions(region)}</select>
+  <div class="form-check">{filtres}</div>
+</form>
+<div class="job-list">{cartes}</div>""")
+
+    def page_offre(self, numero):
+        o = self.offre(numero)
+        return _page(o['titre'], f"""
+<h1>{escape(o['titre'])}</h1>
+<div class="entreprise-name">{escape(o['entreprise'])}</div>
+<div class="location">{escape(o['lieu'])}</div>
+<div class="offer-description">{escape(o['description'])}</div>
+<a class="postuler-btn" href="#application-form">Postuler</a>
+<form id="application-form" action="/job/{numero}/apply" method="post" enctype="multipart/form-data">
+  <input name="email" type="email"><input name="firstName"><input name="lastName">
+  <textarea name="message"></textarea>
+  <input name="cv" type="file"><input name="lm" type="file">
+  <button type="submit" class="btn-application">Postuler</button>
+</form>
+<div id="resultat"></div>
+<script>
+document.getElementById('application-form').addEventListener('submit', function (e) {{
+  e.preventDefault();
+  if (this.dataset.envoye) return;
+  this.dataset.envoye = '1';
+  fetch(this.action, {{method: 'POST', body: new FormData(this)}}).then(function (r) {{
+    document.getElementById('resultat').innerHTML = r.ok
+      ? "<div class='alert alert-success'>Votre candidature a bien été envoyée.</div>"
+      : "<div class='alert alert-danger'>Erreur lors de l'envoi.</div>";
+  }});
+}});
+</script>""")
+
+    def recevoir_candidature(self, type_contenu, corps):
+        """Vérifie qu'une candidature multipart contient un CV non vide."""
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + type_contenu.encode('latin-1') + b"\r\n\r\n" + corps)
+        fichiers = {}
+        if message.is_multipart():
+            for partie in message.iter_parts():
+                nom = partie.get_param('name', header='content-disposition')
+                if nom in ('cv', 'lm'):
+                    fichiers[nom] = partie.get_payload(decode=True) or b''
+        if fichiers.get('cv'):
+            self._compter('candidatures')
+            return True
+        self._compter('candidatures_invalides')
+        return False
+
+    # --- Serveur HTTP ---
+
+    def _gestionnaire(self):
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def _repondre(self, code, contenu):
+                corps = contenu.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def _echec_injecte(self):
+                serveur._compter('requetes')
+                serveur._attendre()
+                if serveur._tirer_echec():
+                    serveur._compter('echecs_injectes')
+                    self._repondre(503, _page("Service indisponible", "<h1>503</h1>"))
+                    return True
+                return False
+
+            def _numero_offre(self, chemin):
+                morceaux = chemin.strip('/').split('/')
+                if len(morceaux) >= 2 and morceaux[0] == 'job' and morceaux[1].isdigit():
+                    numero = int(morceaux[1])
+                    if 1 <= numero <= serveur.nb_offres:
+                        return numero, morceaux[2:]
+                return None, None
+
+            def do_GET(self):
+                if self._echec_injecte():
+                    return
+                url = urlsplit(self.path)
+                if url.path == '/':
+                    self._repondre(200, serveur.page_accueil())
+                elif url.path == '/jobs':
+                    self._repondre(200, serveur.page_resultats(parse_qs(url.query)))
+                else:
+                    numero, reste = self._numero_offre(url.path)
+                    if numero and not reste:
+                        self._repondre(200, serveur.page_offre(numero))
+                    else:
+                        self._repondre(404, _page("Introuvable", "<h1>404</h1>"))
+
+            def do_POST(self):
+                corps = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self._echec_injecte():
+                    return
+                numero, reste = self._numero_offre(urlsplit(self.path).path)
+                if not numero or reste != ['apply']:
+                    self._repondre(404, _page("Introuvable", "<h1>404</h1>"))
+                elif serveur.recevoir_candidature(self.headers.get('Content-Type', ''), corps):
+                    self._repondre(200, _page("Candidature", "<div class='alert-success'>OK</div>"))
+                else:
+                    self._repondre(400, _page("Candidature", "<div class='alert-danger'>CV manquant</div>"))
+
+            def log_message(self, format, *args):
+                logger.debug(f"[faux iquesta] {format % args}")
+
+        return Gestionnaire
+
+    def demarrer(self):
+        """Démarre le serveur dans un thread et retourne son URL de base."""
+        self._thread = threading.Thread(target=self._serveur.serve_forever, name="faux-iquesta", daemon=True)
+        self._thread.start()
+        logger.info(f"Faux iQuesta démarré sur {self.url_base} ({self.nb_offres} offres, "
+                    f"latence {self.latence}s, échecs {self.taux_echec:.0%})")
+        return self.url_base
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
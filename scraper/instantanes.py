@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Magasin d'instantanés des pages d'offres, adressé par contenu.
+
+Chaque page visitée est compressée (lzma ou zlib) et rangée sous le SHA-256
+de son contenu : une même offre vue par plusieurs utilisateurs ou sessions
+n'est stockée qu'une fois. La colonne applications.snapshot_hash relie une
+candidature à son instantané, sans alourdir users.db.
+
+La taille totale est plafonnée : les instantanés les moins récemment écrits
+ou relus sont supprimés en premier.
+
+Le magasin est activé par l'option --snapshots du scraper ; les processus
+travailleurs le retrouvent via la variable d'environnement SNAPSHOTS_DIR.
+"""
+
+import os
+import lzma
+import zlib
+import hashlib
+import logging
+import threading
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Plafond par défaut de la taille du magasin (surchargé par SNAPSHOTS_MAX_MB)
+TAILLE_MAX_DEFAUT_MO = 512
+
+COMPRESSIONS = {
+    'lzma': ('.xz', lambda donnees: lzma.compress(donnees, preset=6), lzma.decompress),
+    'zlib': ('.zz', lambda donnees: zlib.compress(donnees, 9), zlib.decompress),
+}
+
+
+class MagasinInstantanes:
+    """
+    Instantanés compressés rangés sous racine/<2 premiers caractères>/<sha256><extension>.
+
+    Args:
+        racine: Dossier du magasin
+        taille_max_mo: Plafond de la taille totale (Mo)
+        compression: 'lzma' (plus compact) ou 'zlib' (plus rapide)
+    """
+
+    def __init__(self, racine, taille_max_mo=None, compression=None):
+        self.racine = racine
+        self.taille_max_mo = (taille_max_mo if taille_max_mo is not None
+                              else int(os.getenv('SNAPSHOTS_MAX_MB', TAILLE_MAX_DEFAUT_MO)))
+        self.compression = compression or os.getenv('SNAPSHOTS_COMPRESSION', 'lzma')
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Compression inconnue: {self.compression} (lzma ou zlib)")
+        self._taille = None
+        self._verrou = threading.Lock()
+
+    def _chemin(self, empreinte, extension):
+        return os.path.join(self.racine, empreinte[:2], empreinte + extension)
+
+    def _fichiers(self):
+        for dossier in os.scandir(self.racine):
+            if dossier.is_dir():
+                for fichier in os.scandir(dossier.path):
+                    if fichier.is_file() and not fichier.name.endswith('.tmp'):
+                        yield fichier
+
+    def enregistrer(self, contenu):
+        """
+        Enregistre contenu (str) s'il n'est pas déjà présent.
+
+        Returns:
+            str: SHA-256 du contenu, clé de l'instantané
+        """
+        donnees = contenu.encode('utf-8')
+        empreinte = hashlib.sha256(donnees).hexdigest()
+        extension, compresser, _ = COMPRESSIONS[self.compression]
+        for ext, _, _ in COMPRESSIONS.values():
+            existant = self._chemin(empreinte, ext)
+            if os.path.exists(existant):
+                # Déjà présent : rafraîchi pour l'éviction LRU
+                os.utime(existant)
+                return empreinte
+        chemin = self._chemin(empreinte, extension)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        compresse = compresser(donnees)
+        temporaire = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporaire, 'wb') as f:
+            f.write(compresse)
+        os.replace(temporaire, chemin)
+        logger.debug(f"Instantané {empreinte[:12]} enregistré ({len(donnees)} → {len(compresse)} octets).")
+        with self._verrou:
+            if self._taille is not None:
+                self._taille += len(compresse)
+        if self._taille is None or self._taille > self.taille_max_mo * 1024 * 1024:
+            self.nettoyer()
+        return empreinte
+
+    def lire(self, empreinte):
+        """Contenu de l'instantané, ou None s'il est absent (jamais enregistré ou évincé)."""
+        for extension, _, decompresser in COMPRESSIONS.values():
+            chemin = self._chemin(empreinte, extension)
+            try:
+                with open(chemin, 'rb') as f:
+                    donnees = decompresser(f.read())
+            except FileNotFoundError:
+                continue
+            os.utime(chemin)
+            return donnees.decode('utf-8')
+        return None
+
+    def nettoyer(self):
+        """Supprime les instantanés les moins récemment utilisés au-delà du plafond. Retourne le nombre supprimé."""
+        with self._verrou:
+            if not os.path.isdir(self.racine):
+                self._taille = 0
+                return 0
+            fichiers = sorted((f.stat().st_mtime, f.stat().st_size, f.path) for f in self._fichiers())
+            total = sum(taille for _, taille, _ in fichiers)
+            plafond = self.taille_max_mo * 1024 * 1024
+            supprimes = 0
+            for _, taille, chemin in fichiers:
+                if total <= plafond:
+                    break
+                try:
+                    os.remove(chemin)
+                except OSError:
+                    continue
+                total -= taille
+                supprimes += 1
+            self._taille = total
+        if supprimes:
+            logger.info(f"{supprimes} instantanés supprimés (plafond de {self.taille_max_mo} Mo).")
+        return supprimes
+
+
+def dossier_par_defaut(db_path):
+    """Dossier instantanes/ à côté de la base SQLite."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'instantanes')
+
+
+_magasin = None
+
+
+def activer_instantanes(racine):
+    """Active le magasin dans racine pour ce processus et ses processus travailleurs."""
+    global _magasin
+    if _magasin is None:
+        os.makedirs(racine, exist_ok=True)
+        # Les processus travailleurs retrouvent le magasin via l'environnement
+        os.environ['SNAPSHOTS_DIR'] = racine
+        _magasin = MagasinInstantanes(racine)
+        logger.info(f"Instantanés des offres enregistrés dans {racine}")
+    return _magasin
+
+
+def magasin_actif():
+    """Magasin activé (par activer_instantanes ou SNAPSHOTS_DIR), ou None."""
+    if _magasin is None and os.getenv('SNAPSHOTS_DIR'):
+        activer_instantanes(os.getenv('SNAPSHOTS_DIR'))
+    return _magasin
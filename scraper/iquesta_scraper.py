@@ -3,28 +3,19 @@ import sys
 import time
 import json
 import logging
-import sqlite3
+import asyncio
 import argparse
+import shutil
 import datetime
 import platform
+import tempfile
+import functools
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, NoSuchWindowException
-from webdriver_manager.chrome import ChromeDriverManager
-from pathlib import Path
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-import string
-import random
-
-# Import des fonctions des modules externes
-from application_handler import verifier_et_postuler, extraire_details_offre, enregistrer_candidature
-from search_handler import rechercher_offres, affiner_recherche_par_contrat, extraire_offres
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 # --- Configuration ---
 # Ajout du chemin racine pour les imports locaux
@@ -32,41 +23,152 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 dotenv_path = os.path.join(project_root, '.env')
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+# Import des fonctions des modules externes
+from application_handler import verifier_et_postuler, extraire_details_offre, enregistrer_candidature, chercher_doublon
+from search_handler import rechercher_offres, affiner_recherche_par_contrat
+from driver_watchdog import SuperviseurDriver, DelaiOffreDepasse, DELAI_OFFRE_DEFAUT
+from pipeline_async import PipelineCandidatures, TAILLE_FILE_DEFAUT
+from pool_navigateurs import traiter_offres_en_parallele, DEBIT_PAR_MINUTE_DEFAUT, AGE_MAX_RESERVATION
+from replay_fixtures import FabriqueEnregistreuse, ServeurRejeu, ARGUMENTS_CHROME_REJEU
+from mesures import ChronoEtapes
+from cache_chromedriver import resoudre_chromedriver
+from service_navigateurs import attacher_navigateur
+from profils_chrome import ProfilsChrome
+from classement import classer_offres, SEUIL_DEFAUT
+from budget import BudgetSession
+from empreintes import DISTANCE_DEFAUT
+from instantanes import activer_instantanes, magasin_actif, dossier_par_defaut
+from profilage import Profileur
+from artefacts import dossier_artefacts, nouvelle_session
+from database.user_database import UserDatabase, chemin_base_de_donnees
+import metriques
+import reseau_cdp
+import search_handler
+import delais_adaptatifs
+from journalisation import configurer_journalisation
+from disjoncteur import sante, surveiller, statut_http, fusionner_bilans as fusionner_bilans_disjoncteur
+
+# Configuration du logging (handlers installés par configurer_journalisation dans main)
 logger = logging.getLogger(__name__)
 
 # Chargement des variables d'environnement
 load_dotenv(dotenv_path=dotenv_path, override=True)
 
-URL_ACCUEIL = "https://www.iquesta.com/"
+URL_ACCUEIL = os.getenv('IQUESTA_URL', "https://www.iquesta.com/")
+
+@functools.lru_cache(maxsize=None)
+def chemin_chromedriver():
+    """Chemin du chromedriver, résolu une seule fois par processus (cache par version de Chrome)."""
+    return resoudre_chromedriver()
+
+# Profil « léger » pour les pages consultées sans interaction (découverte, extraction) :
+# headless, sans images, fenêtre réduite et moins de processus de rendu
+ARGUMENTS_PROFIL_LEGER = [
+    '--headless=new',
+    '--window-size=1024,768',
+    '--renderer-process-limit=2',
+    '--blink-settings=imagesEnabled=false',
+]
 
-def initialiser_driver():
-    """Initialisation du WebDriver avec Chrome."""
+def initialiser_driver(arguments_supplementaires=None, profil='complet', bloquer=False, journal=False, profils=None):
+    """
+    Initialisation du WebDriver avec Chrome.
+
+    Args:
+        arguments_supplementaires: Arguments Chrome ajoutés aux options par défaut
+        profil: 'complet' (Chrome par défaut) ou 'leger' (headless, chargement
+            'eager', images désactivées : moins de CPU et de mémoire par navigateur)
+        bloquer: Bloque statistiques, publicités, consentement et polices via CDP
+        journal: Active le journal « performance » (--network-report, --network-timings)
+        profils: ProfilsChrome de l'utilisateur (user-data-dir persistant), ou None
+    """
+    reserve = None
     try:
         logger.info("========== ÉTAPE : INITIALISATION DU NAVIGATEUR ==========")
-        logger.info("Initialisation du driver Chrome...")
+        logger.info(f"Initialisation du driver Chrome (profil {profil})...")
         options = webdriver.ChromeOptions()
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--disable-extensions')
         options.add_argument('--disable-gpu')
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        if profil == 'leger':
+            options.page_load_strategy = 'eager'
+            options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+            for argument in ARGUMENTS_PROFIL_LEGER:
+                options.add_argument(argument)
+        for argument in arguments_supplementaires or []:
+            if argument not in options.arguments:
+                options.add_argument(argument)
+        # Le blocage seul n'a pas besoin du journal, relu après chaque page
+        if journal:
+            reseau_cdp.activer_journal_performance(options)
+        reserve = profils.reserver() if profils else None
+        if reserve:
+            options.add_argument(f'--user-data-dir={reserve.chemin}')
+        driver = webdriver.Chrome(service=Service(chemin_chromedriver()), options=options)
+        if reserve:
+            # Le profil est rendu quand le navigateur est fermé (fin de session ou redémarrage)
+            driver.profil_reserve = reserve
+            quitter = driver.quit
+            def quitter_et_liberer():
+                try:
+                    quitter()
+                finally:
+                    reserve.liberer()
+            driver.quit = quitter_et_liberer
+        if bloquer:
+            try:
+                reseau_cdp.activer_blocage(driver, reseau_cdp.motifs_blocage())
+            except WebDriverException as e:
+                logger.warning(f"Blocage réseau impossible: {str(e)[:100]}")
         logger.info("Driver initialisé.")
         return driver
     except Exception as e:
         logger.critical(f"Erreur Driver: {e}")
+        if reserve:
+            reserve.liberer()
         return None
 
+def initialiser_driver_service(arguments_supplementaires=None, profil='complet', bloquer=False, journal=False, profils=None):
+    """
+    S'attache à un navigateur à chaud du service (service_navigateurs.py).
+    Lance un Chrome dédié (avec profil) si aucune instance n'est libre.
+
+    Une instance du service garde les options de son lancement : profil
+    complet, profil de l'instance (pas celui de l'utilisateur) et pas de
+    journal « performance ». profil et profils ne servent qu'au Chrome dédié ;
+    avec journal, l'instance n'est pas utilisée (main refuse déjà ce cas).
+    """
+    if journal:
+        logger.warning("Journal réseau demandé : navigateur du service non utilisé, lancement d'un Chrome dédié.")
+        return initialiser_driver(arguments_supplementaires, profil, bloquer, journal, profils)
+    try:
+        driver = attacher_navigateur(chemin_chromedriver())
+    except Exception as e:
+        logger.warning(f"Service de navigateurs injoignable: {str(e)[:100]}")
+        driver = None
+    if driver:
+        if bloquer:
+            try:
+                reseau_cdp.activer_blocage(driver, reseau_cdp.motifs_blocage())
+            except WebDriverException as e:
+                logger.warning(f"Blocage réseau impossible sur le navigateur du service: {str(e)[:100]}")
+        return driver
+    logger.info("Aucun navigateur du service disponible, lancement d'un Chrome dédié.")
+    return initialiser_driver(arguments_supplementaires, profil, bloquer, journal, profils)
+
 def gerer_cookies(driver):
-    """Tente de gérer la bannière de cookies si elle existe."""
+    """
+    Tente de gérer la bannière de cookies si elle existe.
+
+    Returns:
+        bool: True si le bouton d'acceptation a été cliqué, False sinon (pas de
+        bannière, gestionnaire de consentement bloqué, erreur)
+    """
     try:
-        logger.info("========== ÉTAPE : GESTION DES COOKIES ==========")
-        logger.info("Tentative de gestion des cookies...")
-        logger.info(f"URL actuelle: {driver.current_url}")
-        logger.info(f"Titre de la page: {driver.title}")
-        wait = WebDriverWait(driver, 5)
-        
+        logger.debug("========== ÉTAPE : GESTION DES COOKIES ==========")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"URL actuelle: {driver.current_url} | Titre de la page: {driver.title}")
         # Essaie plusieurs sélecteurs courants pour les boutons d'acceptation de cookies
         selectors = [
             "#didomi-notice-agree-button",
@@ -75,37 +177,48 @@ def gerer_cookies(driver):
             ".cookie-notice .accept"
         ]
         
-        for selector in selectors:
-            try:
-                bouton_cookies = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
-                bouton_cookies.click()
-                logger.info("Cookies acceptés.")
-                break
-            except:
-                pass
+        # Une seule attente pour tous les sélecteurs : sans bannière (gestionnaire de
+        # consentement bloqué, par exemple) on ne perd qu'un délai au lieu d'un par sélecteur
+        bouton_cookies = delais_adaptatifs.attendre(
+            driver, "cookies", EC.element_to_be_clickable((By.CSS_SELECTOR, ", ".join(selectors))), 5)
+        bouton_cookies.click()
+        logger.info("Cookies acceptés.")
+        if bouton_cookies.get_attribute('id') != selectors[0].lstrip('#'):
+            metriques.repli_selecteur('gerer_cookies', 'bouton_cookies')
+        return True
     except TimeoutException:
         logger.info("Pas de bannière de cookies détectée.")
+    except WebDriverException as e:
+        logger.warning(f"Impossible d'accepter les cookies: {str(e)[:100]}")
+    return False
 
 # Les fonctions rechercher_offres, affiner_recherche_par_contrat, try_select_region et click_search_button 
 # ont été déplacées vers le module search_handler.py
 
-def recuperer_liens_offres(driver):
-    """Récupère tous les liens vers les offres d'emploi sur la page actuelle."""
+def recuperer_cartes_offres(driver):
+    """
+    Récupère les offres de la page de résultats.
+
+    Returns:
+        list: Un dict {'Lien', 'Titre', 'Texte'} par offre (texte de la carte de résultat)
+    """
     try:
-        logger.info("========== ÉTAPE : RÉCUPÉRATION DES LIENS D'OFFRES ==========")
-        logger.info(f"URL actuelle: {driver.current_url}")
-        logger.info(f"Titre de la page: {driver.title}")
+        logger.debug("========== ÉTAPE : RÉCUPÉRATION DES LIENS D'OFFRES ==========")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"URL actuelle: {driver.current_url} | Titre de la page: {driver.title}")
         
         # Attendre que la liste des offres soit chargée
-        wait = WebDriverWait(driver, 10)
         try:
             selectors = [".job-list", ".offers-list", ".list-offers", ".search-results"]
             found = False
-            for selector in selectors:
+            for index, selector in enumerate(selectors):
                 try:
-                    logger.info(f"Essai du sélecteur pour liste d'offres: {selector}")
-                    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                    logger.info(f"Liste d'offres trouvée avec: {selector}")
+                    logger.debug(f"Essai du sélecteur pour liste d'offres: {selector}")
+                    delais_adaptatifs.attendre(driver, f"liste_offres:{selector}",
+                                               EC.presence_of_element_located((By.CSS_SELECTOR, selector)), 10)
+                    logger.debug(f"Liste d'offres trouvée avec: {selector}")
+                    if index > 0:
+                        metriques.repli_selecteur('recuperer_liens_offres', 'liste_offres')
                     found = True
                     break
                 except:
@@ -118,39 +231,301 @@ def recuperer_liens_offres(driver):
             # On continue quand même
         
         # Récupérer les liens vers les offres
-        liens_elements = WebDriverWait(driver, 10).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.fw-bold")))
-        liens = [elem.get_attribute('href') for elem in liens_elements]
-        logger.info(f"DEBUG: {len(liens)} liens d'offres trouvés sur la page.")
-        logger.info(f"{len(liens)} offres trouvées sur la page.")
-        return liens
+        delais_adaptatifs.attendre(driver, "liens_offres",
+                                   EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.fw-bold")), 10)
+        # Un seul aller-retour WebDriver pour les liens et le texte des cartes
+        cartes = driver.execute_script("""
+            return Array.from(document.querySelectorAll('a.fw-bold')).map(function (a) {
+                var carte = a.closest('.card, article, li') || a.parentElement;
+                return {Lien: a.href, Titre: a.innerText.trim(), Texte: (carte || a).innerText.trim()};
+            });
+        """)
+        logger.info(f"{len(cartes)} offres trouvées sur la page.")
+        return cartes
     except TimeoutException:
         logger.warning("Aucune offre trouvée sur la page de résultats.")
         return []
 
 def collect_offer_details(driver, url):
     """Collecte les détails d'une offre depuis la page de l'offre."""
-    logger.info("========== ÉTAPE : COLLECTE DES DÉTAILS D'OFFRE ==========")
-    logger.info(f"URL de l'offre: {url}")
-    logger.info(f"Titre de la page: {driver.title}")
+    logger.debug("========== ÉTAPE : COLLECTE DES DÉTAILS D'OFFRE ==========")
+    logger.debug(f"URL de l'offre: {url}")
     
     # Délégation à la fonction dans le module application_handler
     details = extraire_details_offre(driver)
     logger.info(f"Détails extraits: Titre='{details.get('Titre')}', Entreprise='{details.get('Entreprise')}', Lieu='{details.get('Lieu')}'")
     return details
-    
+
+# Page sans scripts ni cadres : plus compacte, et identique d'une visite à l'autre
+SCRIPT_PAGE_INSTANTANE = """
+    var copie = document.documentElement.cloneNode(true);
+    copie.querySelectorAll('script, noscript, iframe, template').forEach(function (e) { e.remove(); });
+    return '<!DOCTYPE html>' + copie.outerHTML;
+"""
+
+def verifier_statut(driver, url):
+    """Lève WebDriverException si la page chargée a répondu par une erreur serveur (5xx)."""
+    statut = statut_http(driver)
+    if statut and statut >= 500:
+        raise WebDriverException(f"Erreur serveur HTTP {statut} sur {url}")
+
+@surveiller('ouverture')
+def ouvrir_offre(driver, url):
+    """Navigue vers l'offre et en extrait les détails (et l'instantané de la page si le magasin est actif)."""
+    debut = time.monotonic()
+    driver.get(url)
+    sante().observer_chargement(time.monotonic() - debut, 'offre')
+    verifier_statut(driver, url)
+    details = collect_offer_details(driver, url)
+    magasin = magasin_actif()
+    if magasin:
+        try:
+            details['Instantane'] = magasin.enregistrer(driver.execute_script(SCRIPT_PAGE_INSTANTANE))
+        except (OSError, WebDriverException) as e:
+            logger.warning(f"Instantané de l'offre impossible: {str(e)[:100]}")
+    reseau_cdp.collecter(driver, 'offre')
     return details
 
+def preparer_navigateur(driver):
+    """Ouvre la page d'accueil et accepte les cookies sur un navigateur neuf."""
+    debut = time.monotonic()
+    driver.get(URL_ACCUEIL)
+    sante().observer_chargement(time.monotonic() - debut, 'accueil')
+    # Sonde du disjoncteur : une page d'accueil en 5xx la fait échouer
+    verifier_statut(driver, URL_ACCUEIL)
+    reserve = getattr(driver, 'profil_reserve', None)
+    if reserve and reserve.consentement_donne():
+        logger.info("Cookies déjà acceptés avec ce profil persistant.")
+    else:
+        # Marqueur écrit seulement après un vrai clic : sans bannière (didomi bloqué,
+        # délai expiré), le profil n'a pas donné son consentement
+        if gerer_cookies(driver) and reserve:
+            reserve.marquer_consentement()
+    reseau_cdp.collecter(driver, 'accueil')
+
+def recuperer_liens_offres(driver):
+    """Récupère tous les liens vers les offres d'emploi sur la page actuelle."""
+    return [carte['Lien'] for carte in recuperer_cartes_offres(driver)]
+
+def decouvrir_offres(driver, search_query, location, contract_type):
+    """Lance la recherche, applique le filtre de contrat et retourne les cartes d'offres."""
+    if not rechercher_offres(driver, metier=search_query, region_text=location):
+        return []
+    if contract_type:
+        affiner_recherche_par_contrat(driver, contract_type)
+    cartes = recuperer_cartes_offres(driver)
+    reseau_cdp.collecter(driver, 'resultats')
+    return cartes
+
+def cle_offre(lien):
+    """Clé de déduplication d'une offre : URL sans fragment ni barre oblique finale."""
+    return lien.split('#', 1)[0].rstrip('/')
+
+def decouvrir_offres_criteres(driver, criteres):
+    """
+    Lance une recherche par critère et fusionne les cartes, dédupliquées par offre.
+
+    Une offre trouvée par plusieurs critères n'est visitée qu'une fois.
+
+    Returns:
+        list: Cartes d'offres uniques, dans l'ordre de découverte
+    """
+    cartes = {}
+    trouvees = 0
+    for i, critere in enumerate(criteres):
+        if i:
+            # Nouvelle recherche depuis l'accueil : les filtres du critère précédent sont abandonnés
+            driver.get(URL_ACCUEIL)
+        logger.info(f"Critère {i+1}/{len(criteres)} : '{critere['search_query']}' à '{critere['location']}' "
+                    f"({critere.get('contract_type') or 'tous contrats'})")
+        for carte in decouvrir_offres(driver, critere['search_query'], critere['location'], critere.get('contract_type')):
+            trouvees += 1
+            cartes.setdefault(cle_offre(carte['Lien']), carte)
+    if len(criteres) > 1:
+        logger.info(f"{trouvees} résultats pour {len(criteres)} critères, {len(cartes)} offres uniques.")
+    return list(cartes.values())
+
+def completer_avec_file(liens, file_attente):
+    """Place d'abord les offres remises en file par une session précédente, sans doublon."""
+    vus = set()
+    return [lien for lien in list(file_attente) + list(liens)
+            if not (cle_offre(lien) in vus or vus.add(cle_offre(lien)))]
+
+def selectionner_offres(cartes, user_data, db_path, seuil, criteres=None, priorites=None):
+    """
+    Classe les offres découvertes par pertinence et écarte celles sous le seuil.
+
+    Args:
+        priorites: Dictionnaire complété avec le score {lien: score} des offres retenues
+
+    Returns:
+        list: Liens des offres retenues, les plus pertinentes d'abord
+    """
+    # Connexion dédiée : l'étape peut tourner dans le thread de découverte du pipeline async
+    db = UserDatabase(db_path)
+    try:
+        descriptions = db.get_job_descriptions([carte['Lien'] for carte in cartes])
+    finally:
+        db.close()
+    classees = classer_offres(cartes, user_data, seuil, descriptions, criteres)
+    for carte, score in classees[:5]:
+        logger.info(f"  [{score if score is not None else '-'}] {carte.get('Titre') or carte['Lien']}")
+    if priorites is not None:
+        priorites.update((carte['Lien'], score) for carte, score in classees)
+    return [carte['Lien'] for carte, _ in classees]
+
 # Cette fonction a été déplacée vers application_handler.py
 
-def main():
-    """Fonction principale pour orchestrer le scraping et enregistrer les données."""
+def construire_parser():
+    """Construit le parseur des arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Scraper iQuesta pour postuler aux offres d'emploi.")
+    parser.add_argument('--email', type=str, help="L'email de l'utilisateur pour lequel lancer le scraper. Surcharge la variable d'environnement USER_EMAIL.")
+    parser.add_argument('--offer-timeout', type=int, default=int(os.getenv('OFFER_TIMEOUT', DELAI_OFFRE_DEFAUT)), help="Échéance en secondes pour le traitement complet d'une offre (défaut: OFFER_TIMEOUT ou 300).")
+    parser.add_argument('--pipeline', choices=['sequentiel', 'async'], default=os.getenv('PIPELINE', 'sequentiel'), help="Mode d'orchestration : séquentiel (défaut) ou étapes asyncio reliées par des files bornées.")
+    parser.add_argument('--queue-size', type=int, default=TAILLE_FILE_DEFAUT, help="Taille maximale des files entre les étapes du pipeline async.")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WORKERS', 1)), help="Nombre de processus navigateurs se partageant les offres de la session (défaut: 1).")
+    parser.add_argument('--rate-limit', type=float, default=float(os.getenv('RATE_LIMIT_PER_MIN', DEBIT_PAR_MINUTE_DEFAUT)), help="Plafond global de requêtes par minute vers iquesta.com quand --workers > 1.")
+    parser.add_argument('--record', metavar='DOSSIER', help="Enregistre le HTML de chaque page visitée dans DOSSIER (fixtures de rejeu).")
+    parser.add_argument('--replay', metavar='DOSSIER', help="Rejoue hors ligne les fixtures de DOSSIER via un serveur local et un Chrome headless, sur une copie temporaire de la base sans historique (sauf --db).")
+    parser.add_argument('--db', metavar='FICHIER', help="Base SQLite à utiliser au lieu de DATABASE_PATH (relative à la racine du projet).")
+    parser.add_argument('--headless', action='store_true', help="Lance Chrome sans interface graphique.")
+    parser.add_argument('--metrics-file', default=os.getenv('METRICS_FILE'), help="Écrit les métriques Prometheus (format texte) dans ce fichier en fin de session.")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', 0)) or None, help="Sert les métriques sur http://127.0.0.1:PORT/metrics pendant la session.")
+    parser.add_argument('--browser-service', action='store_true', default=os.getenv('BROWSER_SERVICE', '').lower() in ('1', 'true', 'oui'), help="S'attache à un navigateur à chaud du service (scraper/service_navigateurs.py) au lieu de lancer Chrome ; sans effet avec --replay, --network-report ou --network-timings.")
+    parser.add_argument('--browser-profile', choices=['auto', 'complet', 'leger'], default=os.getenv('BROWSER_PROFILE', 'auto'), help="Profil Chrome : 'auto' (léger pour la découverte avec --workers, complet pour les navigateurs qui postulent), 'complet' ou 'leger' partout.")
+    parser.add_argument('--block-urls', choices=['auto', 'partout', 'jamais'], default=os.getenv('BLOCK_URLS', 'auto'), help="Blocage CDP des statistiques, publicités, consentement et polices (BLOCKLIST/BLOCKLIST_FILE) : 'auto' pour la découverte et l'extraction seulement, 'partout' ou 'jamais'.")
+    parser.add_argument('--network-report', action='store_true', default=os.getenv('NETWORK_REPORT', '').lower() in ('1', 'true', 'oui'), help="Compte les requêtes bloquées et estime les octets évités (journal performance de Chrome relu après chaque page) ; désactivé par défaut.")
+    parser.add_argument('--network-timings', nargs='?', const='', default=os.getenv('NETWORK_TIMINGS_FILE'), metavar='FICHIER', help="Enregistre TTFB, octets et requêtes les plus lentes de chaque page (journal performance de Chrome) dans FICHIER (JSONL, défaut: reseau.jsonl du dossier d'artefacts).")
+    parser.add_argument('--no-persistent-profile', action='store_true', default=os.getenv('PERSISTENT_PROFILES', '1').lower() in ('0', 'false', 'non'), help="Lance Chrome avec un profil temporaire au lieu du profil persistant de l'utilisateur (profils_chrome/ à côté de users.db).")
+    parser.add_argument('--min-score', type=float, default=float(os.getenv('MIN_RELEVANCE', SEUIL_DEFAUT)), help="Score de pertinence TF-IDF minimal (0 à 1) pour postuler à une offre ; 0 conserve toutes les offres, triées par pertinence.")
+    parser.add_argument('--max-duration', type=float, default=float(os.getenv('MAX_DURATION', 0)) or None, metavar='SECONDES', help="Durée maximale de la session : aucune offre n'est commencée si elle ne tient plus dans le temps restant (coût mesuré pendant la session) ; les offres restantes sont remises en file.")
+    parser.add_argument('--max-applications', type=int, default=int(os.getenv('MAX_APPLICATIONS', 0)) or None, metavar='N', help="Nombre maximal de candidatures envoyées pendant la session ; les offres restantes sont remises en file.")
+    parser.add_argument('--max-browser-memory', type=int, default=int(os.getenv('BROWSER_MAX_RSS_MB', 0)) or None, metavar='MO', help="Recycle le navigateur entre deux offres quand la RSS de chromedriver et Chrome dépasse MO mégaoctets (Linux).")
+    parser.add_argument('--recycle-after', type=int, default=int(os.getenv('BROWSER_RECYCLE_AFTER', 0)) or None, metavar='N', help="Recycle le navigateur après N offres ouvertes.")
+    parser.add_argument('--duplicate-distance', type=int, default=int(os.getenv('DUPLICATE_DISTANCE', DISTANCE_DEFAUT)), metavar='BITS', help="Distance de Hamming maximale (empreintes SimHash 64 bits) pour reconnaître une offre déjà postulée republiée sous une autre URL ; -1 désactive la détection.")
+    parser.add_argument('--snapshots', nargs='?', const='', default=os.getenv('SNAPSHOTS_DIR'), metavar='DOSSIER', help="Conserve la page complète de chaque offre visitée, compressée et dédupliquée par contenu, dans DOSSIER (défaut: instantanes/ à côté de users.db ; plafond SNAPSHOTS_MAX_MB).")
+    parser.add_argument('--timeouts', choices=['adaptatifs', 'fixes'], default='fixes' if os.getenv('ADAPTIVE_TIMEOUTS', '1').lower() in ('0', 'false', 'non') else 'adaptatifs', help="Délais d'attente des sélecteurs : 'adaptatifs' (percentile des latences observées plus marge, persistés dans ADAPTIVE_TIMEOUTS_FILE, bornés par TIMEOUT_FLOOR et TIMEOUT_CEILING) ou 'fixes' (valeurs codées en dur).")
+    parser.add_argument('--no-circuit-breaker', action='store_true', default=os.getenv('CIRCUIT_BREAKER', '1').lower() in ('0', 'false', 'non'), help="Désactive le disjoncteur qui suspend la session (pause exponentielle puis sonde de la page d'accueil) quand iquesta.com ralentit ou renvoie des erreurs (seuils CIRCUIT_ERROR_RATE et CIRCUIT_MAX_LATENCY).")
+    parser.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'), choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], type=str.upper, help="Niveau des logs ; DEBUG affiche le détail par offre et par sélecteur.")
+    parser.add_argument('--log-file', default=os.getenv('LOG_FILE'), metavar='FICHIER', help="Écrit aussi les logs dans FICHIER, avec rotation (LOG_MAX_MB, LOG_BACKUPS) et archives compressées en gzip.")
+    parser.add_argument('--log-json', action='store_true', default=os.getenv('LOG_FORMAT', '').lower() == 'json', help="Logs structurés : un objet JSON par ligne.")
+    parser.add_argument('--quiet', action='store_true', default=os.getenv('LOG_QUIET', '').lower() in ('1', 'true', 'oui'), help="N'affiche que les avertissements et erreurs à la console (le fichier de logs garde --log-level).")
+    parser.add_argument('--profile', nargs='?', const='', metavar='DOSSIER', help="Profile la session (cProfile, tracemalloc, piles pour flame graph) et écrit les résultats dans DOSSIER (défaut: dossier d'artefacts de la session).")
+    return parser
+
+def traiter_offres_sequentiel(superviseur, liens_offres, user_data, db, resume, chrono, budget=None, distance_doublons=-1,
+                              priorites=None):
+    """
+    Traite les offres une par une avec le navigateur supervisé.
+
+    Args:
+        priorites: {lien: score de pertinence} ; sous budget serré, les offres
+            les moins pertinentes qui ne tiennent plus sont différées
+
+    Returns:
+        list: Offres non traitées faute de budget (à remettre en file)
+    """
+    liens_offres = list(liens_offres)
+    differees = []
+    for i, lien in enumerate(liens_offres):
+        if budget and budget.epuise():
+            logger.warning(f"Budget de la session atteint ({budget.etat()}) : {len(liens_offres) - i} offres remises en file.")
+            return liens_offres[i:] + differees
+        if budget and budget.serre(len(liens_offres) - i):
+            a_traiter, ecartees = budget.differer(liens_offres[i:], priorites)
+            if ecartees:
+                logger.warning(f"Budget serré ({budget.etat()}) : {len(ecartees)} offres les moins pertinentes remises en file.")
+                differees.extend(ecartees)
+                # Seule la fin de la liste change : la boucle s'arrête à la nouvelle longueur
+                liens_offres[i:] = a_traiter
+                lien = liens_offres[i]
+        logger.info(f"--- Traitement de l'offre {i+1}/{len(liens_offres)} ---")
+        # Budget serré : une offre déjà traitée est écartée sans ouvrir sa page
+        if budget and budget.serre(len(liens_offres) - i):
+            with chrono.etape('filtrage'):
+                deja_traitee = db.check_if_applied(user_data['id'], lien)
+            if deja_traitee:
+                logger.info("Déjà postulé (vérifié dans la DB), page non ouverte.")
+                metriques.compter(resume, 'deja_postule')
+                continue
+        # Site en difficulté : pause puis sonde avant de commencer l'offre
+        if not sante().patienter(superviseur.sonder, budget.echeance if budget else None):
+            return liens_offres[i:] + differees
+        if not superviseur.nouvelle_offre():
+            logger.critical("Navigateur indisponible, arrêt du traitement des offres.")
+            return liens_offres[i:] + differees
+
+        debut_offre = time.monotonic()
+        try:
+            with chrono.etape('extraction'):
+                offer_details = superviseur.executer(ouvrir_offre, lien)
+        except (DelaiOffreDepasse, WebDriverException) as e:
+            logger.error(f"Offre ignorée, impossible de l'ouvrir: {str(e)[:100]}")
+            metriques.compter(resume, 'echecs')
+            with chrono.etape('enregistrement'):
+                enregistrer_candidature(db.conn, db.cursor, user_data, {'Lien': lien, 'Statut': 'Échec candidature'})
+            if budget:
+                budget.observer(time.monotonic() - debut_offre)
+            continue
+        
+        # Vérifier si déjà postulé
+        with chrono.etape('filtrage'):
+            already_applied = db.check_if_applied(user_data['id'], lien)
+        
+        if already_applied:
+            logger.info("Déjà postulé (vérifié dans la DB).")
+            offer_details['Statut'] = 'Déjà postulé'
+            metriques.compter(resume, 'deja_postule')
+        elif chercher_doublon(db, user_data['id'], offer_details, distance_doublons):
+            offer_details['Statut'] = 'Doublon'
+            metriques.compter(resume, 'doublons')
+        elif budget and not budget.reserver():
+            logger.warning(f"Plafond de candidatures atteint ({budget.etat()}) : {len(liens_offres) - i} offres remises en file.")
+            return liens_offres[i:] + differees
+        else:
+            resume['traitees'] += 1
+            try:
+                with chrono.etape('candidature'):
+                    postule = superviseur.executer(verifier_et_postuler, user_data)
+            except (DelaiOffreDepasse, WebDriverException) as e:
+                logger.error(f"Candidature interrompue: {str(e)[:100]}")
+                postule = False
+            if postule:
+                logger.info("Candidature envoyée avec succès. Enregistrement dans la base de données...")
+                offer_details['Statut'] = 'Candidature envoyée'
+                metriques.compter(resume, 'envoyees')
+            else:
+                offer_details['Statut'] = 'Échec candidature'
+                metriques.compter(resume, 'echecs')
+                if budget:
+                    budget.liberer()
+        
+        # Enregistrer la candidature
+        # Utilise la fonction du module application_handler pour enregistrer la candidature
+        with chrono.etape('enregistrement'):
+            if not enregistrer_candidature(db.conn, db.cursor, user_data, offer_details):
+                logger.warning("Échec de l'enregistrement de la candidature en base de données.")
+        if budget and offer_details['Statut'] != 'Déjà postulé':
+            budget.observer(time.monotonic() - debut_offre)
+    return differees
+
+def main(argv=None):
+    """
+    Fonction principale pour orchestrer le scraping et enregistrer les données.
+
+    Returns:
+        dict: Résumé de la session (compteurs, durée, temps par étape), ou None si
+        la session n'a pas pu démarrer
+    """
+    args = construire_parser().parse_args(argv)
+    # Sans effet dans un processus déjà configuré (démon)
+    configurer_journalisation(args.log_level, args.log_file, args.log_json, args.quiet)
+    # Dossier d'artefacts propre à la session, même dans un processus réutilisé par le démon
+    nouvelle_session()
+
     logger.info("========== DÉMARRAGE DU PROGRAMME ==========")
     logger.info(f"Date et heure de lancement: {datetime.datetime.now()}")
     logger.info(f"Système: {platform.system()} {platform.release()}")
-    
-    parser = argparse.ArgumentParser(description="Scraper iQuesta pour postuler aux offres d'emploi.")
-    parser.add_argument('--email', type=str, help="L'email de l'utilisateur pour lequel lancer le scraper. Surcharge la variable d'environnement USER_EMAIL.")
-    args = parser.parse_args()
 
     user_email_to_use = args.email if args.email else os.getenv("USER_EMAIL")
     logger.info(f"Email utilisateur spécifié: {user_email_to_use}")
@@ -161,115 +536,293 @@ def main():
 
     logger.info("========== LANCEMENT DU SCRAPER IQUESTA ==========")
     
-    # Accès SQLite direct - Chemin de la base de données
-    db_path = os.path.join(project_root, 'database', 'users.db')
+    # Chemin de la base de données
+    db_path = chemin_base_de_donnees(args.db)
+    dossier_rejeu = None
+    if args.replay and not args.db:
+        # Les offres rejouées ont des URL locales (port aléatoire) : elles ne doivent
+        # pas entrer dans l'historique réel, et chaque rejeu part du même état
+        dossier_rejeu = tempfile.mkdtemp(prefix="iquesta_rejeu_")
+        copie = os.path.join(dossier_rejeu, 'users.db')
+        source = UserDatabase(db_path)
+        copiee = source.copy_profiles(copie)
+        source.close()
+        if not copiee:
+            shutil.rmtree(dossier_rejeu, ignore_errors=True)
+            logger.critical("Impossible de préparer la base temporaire du rejeu. Arrêt.")
+            return
+        logger.info("Mode --replay : base temporaire sans historique, la base réelle n'est pas modifiée.")
+        db_path = copie
     logger.info(f"Connexion à la base de données: {db_path}")
+    UserDatabase.observateur = metriques.observer_base
     
-    # Récupération directe de l'utilisateur avec SQLite
-    try:
-        import sqlite3
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE email = ?', (user_email_to_use,))
-        user_row = cursor.fetchone()
-        
-        if not user_row:
-            logger.critical(f"Utilisateur '{user_email_to_use}' non trouvé dans la base de données. Arrêt.")
-            conn.close()
-            return
-            
-        # Convertir en dictionnaire
-        user_data = dict(user_row)
-        logger.info(f"Utilisateur '{user_data['first_name']}' (ID: {user_data['id']}) trouvé.")
-    except Exception as e:
-        logger.critical(f"Erreur lors de la récupération de l'utilisateur: {e}")
-        if 'conn' in locals():
-            conn.close()
+    # Récupération de l'utilisateur
+    db = UserDatabase(db_path)
+
+    def fermer_base():
+        db.close()
+        if dossier_rejeu:
+            shutil.rmtree(dossier_rejeu, ignore_errors=True)
+
+    user_data = db.get_user_by_email(user_email_to_use)
+    if not user_data:
+        logger.critical(f"Utilisateur '{user_email_to_use}' non trouvé dans la base de données. Arrêt.")
+        fermer_base()
         return
 
-    logger.info("DEBUG: Données utilisateur récupérées de la base de données :")
-    logger.info(json.dumps(user_data, indent=2, default=str))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Données utilisateur récupérées de la base de données :\n{json.dumps(user_data, indent=2, default=str)}")
 
     user_id = user_data['id']
     logger.info(f"Utilisateur '{user_data['first_name']}' (ID: {user_id}) trouvé.")
 
     if not os.path.exists(user_data['cv_path']) or not os.path.exists(user_data['lm_path']):
         logger.critical('Fichier CV ou LM introuvable. Vérifiez les chemins dans la base de données.')
-        db.close()
+        fermer_base()
         return
     logger.info("Chemins des fichiers CV et LM validés.")
 
-    search_query = user_data.get('search_query')
-    location = user_data.get('location')
-    contract_type = user_data.get('contract_type')
-    if not search_query or not location:
+    # Réservations laissées par un processus travailleur arrêté brutalement
+    expirees = db.release_stale_claims(user_id, AGE_MAX_RESERVATION)
+    if expirees:
+        logger.warning(f"{expirees} réservations 'En cours' expirées, offres de nouveau disponibles.")
+
+    criteres = db.get_search_criteria(user_id)
+    if not criteres:
         logger.critical("--- ACTION REQUISE ---")
         logger.critical("Le 'poste recherché' (search_query) ou le 'lieu' (location) ne sont pas définis pour cet utilisateur.")
-        logger.critical("Le scraper ne peut pas lancer de recherche. Veuillez mettre à jour le profil de l'utilisateur.")
+        logger.critical("Le scraper ne peut pas lancer de recherche. Veuillez mettre à jour le profil de l'utilisateur "
+                        "ou ajouter un critère (python cli.py criteria --email ... --add RECHERCHE LIEU).")
         logger.critical("Arrêt du scraper.")
-        db.close()
+        fermer_base()
         return
-    logger.info(f"Préférences : Poste='{search_query}', Lieu='{location}', Contrat='{contract_type or 'Tous'}'")
+    for critere in criteres:
+        logger.info(f"Préférences : Poste='{critere['search_query']}', Lieu='{critere['location']}', Contrat='{critere['contract_type'] or 'Tous'}'")
+    # Résumé des critères pour l'historique des sessions
+    search_query, location, contract_type = (
+        ' | '.join(dict.fromkeys(c[cle] for c in criteres if c[cle])) or None
+        for cle in ('search_query', 'location', 'contract_type'))
 
-    driver = initialiser_driver()
-    if not driver:
-        db.close()
-        return
+    global URL_ACCUEIL
+    arguments_chrome = ['--headless=new'] if args.headless else []
+    serveur_rejeu = None
+    if args.replay:
+        serveur_rejeu = ServeurRejeu(args.replay)
+        URL_ACCUEIL = serveur_rejeu.demarrer()
+        # Les processus travailleurs relisent l'URL dans l'environnement à l'import
+        os.environ['IQUESTA_URL'] = URL_ACCUEIL
+        arguments_chrome = ARGUMENTS_CHROME_REJEU
+    fabrique = initialiser_driver
+    if args.browser_service:
+        if args.replay:
+            # Les instances du service n'ont pas la résolution DNS réservée au rejeu
+            logger.warning("--browser-service ignoré en mode --replay.")
+        elif args.network_report or args.network_timings is not None:
+            # Le journal « performance » se choisit au lancement de Chrome, pas à l'attachement
+            logger.warning("--browser-service ignoré : --network-report et --network-timings demandent "
+                           "un Chrome lancé par le scraper.")
+        else:
+            fabrique = initialiser_driver_service
+            logger.info("Navigateurs du service : profil complet et profil Chrome de l'instance (le profil "
+                        "persistant et --browser-profile ne valent que pour un Chrome dédié de repli).")
+
+    # Profils persistants : consentement et cache conservés entre les sessions (hors rejeu)
+    profils = None
+    if not args.no_persistent_profile and not args.replay:
+        profils = ProfilsChrome.pour_base(db_path, user_id)
+        profils.nettoyer()
+
+    def fabrique_pour(profil, bloquer):
+        fabrique_profil = functools.partial(fabrique, arguments_chrome, profil, bloquer,
+                                            journal=args.network_report or args.network_timings is not None,
+                                            profils=profils)
+        if args.record:
+            return FabriqueEnregistreuse(fabrique_profil, args.record)
+        return fabrique_profil
 
-    sent_applications_count = 0
+    # Le formulaire de candidature garde le profil complet, sauf --browser-profile leger
+    fabrique_driver = fabrique_pour('leger' if args.browser_profile == 'leger' else 'complet',
+                                    args.block_urls == 'partout')
+    fabrique_lecture = fabrique_pour('complet' if args.browser_profile == 'complet' else 'leger',
+                                     args.block_urls != 'jamais')
+    search_handler.URL_ACCUEIL = URL_ACCUEIL
+
+    if args.snapshots is not None:
+        dossier_instantanes = args.snapshots or dossier_par_defaut(db_path)
+        if not os.path.isabs(dossier_instantanes):
+            dossier_instantanes = os.path.join(project_root, dossier_instantanes)
+        activer_instantanes(dossier_instantanes)
+    if args.replay and args.timeouts == 'adaptatifs':
+        # Le serveur de rejeu répond en quelques millisecondes : des délais appris
+        # sur lui feraient expirer les attentes sur le vrai site, et le rejeu doit
+        # rester reproductible d'une exécution à l'autre
+        logger.info("Mode --replay : délais d'attente fixes.")
+        args.timeouts = 'fixes'
+    # Les processus travailleurs relisent le choix dans l'environnement
+    os.environ['ADAPTIVE_TIMEOUTS'] = '1' if args.timeouts == 'adaptatifs' else '0'
+    os.environ['CIRCUIT_BREAKER'] = '0' if args.no_circuit_breaker else '1'
+    sante().actif = not args.no_circuit_breaker
+    os.environ['NETWORK_REPORT'] = '1' if args.network_report else '0'
+    if args.network_timings is not None:
+        chemin_chronologie = args.network_timings or os.path.join(dossier_artefacts(), 'reseau.jsonl')
+        reseau_cdp.activer_chronologie(chemin_chronologie)
+    serveur_metriques = metriques.servir(args.metrics_port) if args.metrics_port else None
+    resume = {'decouvertes': 0, 'traitees': 0, 'deja_postule': 0, 'doublons': 0, 'envoyees': 0, 'echecs': 0, 'redemarrages': 0}
+    chrono = ChronoEtapes(observateurs=[metriques.observer_etape])
+    profileur = None
+    if args.profile is not None:
+        profileur = Profileur(args.profile or dossier_artefacts())
+        chrono.observateurs.append(profileur.observer_etape)
+        profileur.demarrer()
+    debut_session = time.monotonic()
+    mode = 'async' if args.pipeline == 'async' else (f'workers:{args.workers}' if args.workers > 1 else 'sequentiel')
+    run_id = db.start_run(user_id, search_query, location, contract_type, mode)
+    raison_fin = 'termine'
+    superviseur = None
+    budget = None
+    if args.max_duration or args.max_applications:
+        budget = BudgetSession(args.max_duration, args.max_applications)
+        logger.info(f"Budget de la session : {budget.etat()}")
+    file_attente = db.get_offer_queue(user_id)
+    if file_attente:
+        logger.info(f"{len(file_attente)} offres remises en file par une session précédente.")
+    # Offres non traitées à conserver pour la session suivante (None : file inchangée)
+    restants = None
+    # Score de pertinence des offres découvertes, pour différer les moins pertinentes sous budget serré
+    priorites = {}
+    options_superviseur = {'memoire_max_mo': args.max_browser_memory, 'offres_max': args.recycle_after}
     try:
-        driver.get(URL_ACCUEIL)
-        gerer_cookies(driver)
-        
-        if rechercher_offres(driver, metier=search_query, region_text=location):
-            if contract_type:
-                affiner_recherche_par_contrat(driver, contract_type)
-
-            liens_offres = recuperer_liens_offres(driver)
-            if not liens_offres:
-                logger.info("Aucune offre à traiter. Fin.")
-                conn.close()
-                return
-
-            for i, lien in enumerate(liens_offres):
-                logger.info(f"--- Traitement de l'offre {i+1}/{len(liens_offres)} ---")
-                driver.get(lien)
-                
-                offer_details = collect_offer_details(driver, lien)
-                
-                # Vérifier si déjà postulé
-                cursor.execute('SELECT COUNT(*) FROM applications WHERE user_id = ? AND job_url = ?', 
-                              (user_data['id'], lien))
-                already_applied = cursor.fetchone()[0] > 0
-                
-                if already_applied:
-                    logger.info("Déjà postulé (vérifié dans la DB).")
-                    offer_details['Statut'] = 'Déjà postulé'
-                else:
-                    if verifier_et_postuler(driver, user_data):
-                        logger.info("Candidature envoyée avec succès. Enregistrement dans la base de données...")
-                        offer_details['Statut'] = 'Candidature envoyée'
-                        sent_applications_count += 1
-                    else:
-                        offer_details['Statut'] = 'Échec candidature'
-                
-                # Enregistrer la candidature
-                # Utilise la fonction du module application_handler pour enregistrer la candidature
-                if not enregistrer_candidature(conn, cursor, user_data, offer_details):
-                    logger.warning("Échec de l'enregistrement de la candidature en base de données.")
+        if args.pipeline == 'async':
+            logger.info("========== MODE PIPELINE ASYNC ==========")
+            pipeline = PipelineCandidatures(
+                user_data, db_path, fabrique_driver, preparer_navigateur,
+                decouvrir=lambda driver: completer_avec_file(selectionner_offres(
+                    decouvrir_offres_criteres(driver, criteres), user_data, db_path, args.min_score, criteres,
+                    priorites),
+                    file_attente),
+                extraire=ouvrir_offre,
+                delai_offre=args.offer_timeout,
+                taille_file=args.queue_size,
+                chrono=chrono,
+                budget=budget,
+                options_superviseur=options_superviseur,
+                distance_doublons=args.duplicate_distance,
+                priorites=priorites,
+            )
+            resume.update(asyncio.run(pipeline.executer()))
+            # Navigateurs indisponibles : rien n'a été lu, la file précédente est conservée
+            restants = pipeline.restants if resume['decouvertes'] else None
+            return resume
+
+        # Avec plusieurs processus, le navigateur de la découverte ne sert qu'à lire des pages
+        fabrique_decouverte = fabrique_lecture if args.workers > 1 else fabrique_driver
+        superviseur = SuperviseurDriver(fabrique_decouverte, preparation=preparer_navigateur, delai_offre=args.offer_timeout,
+                                        **options_superviseur)
+        driver = superviseur.demarrer()
+        if not driver:
+            raison_fin = 'navigateur_indisponible'
+            return resume
+
+        with chrono.etape('decouverte'):
+            cartes = decouvrir_offres_criteres(driver, criteres)
+        metriques.compter(resume, 'decouvertes', len(cartes))
+        with chrono.etape('classement'):
+            liens_offres = selectionner_offres(cartes, user_data, db_path, args.min_score, criteres, priorites)
+        resume['ecartees'] = len(cartes) - len(liens_offres)
+        liens_offres = completer_avec_file(liens_offres, file_attente)
+        if not liens_offres:
+            logger.info("Aucune offre à traiter. Fin.")
+            raison_fin = 'aucune_offre'
+            restants = []
+            return resume
+
+        if args.workers > 1:
+            # Le navigateur de découverte est libéré avant de lancer les processus
+            superviseur.fermer()
+            partiel = traiter_offres_en_parallele(
+                liens_offres, user_data, db_path, fabrique_driver, preparer_navigateur, ouvrir_offre,
+                nb_travailleurs=args.workers, debit_par_minute=args.rate_limit, delai_offre=args.offer_timeout,
+                budget=budget, options_superviseur=options_superviseur, distance_doublons=args.duplicate_distance,
+                priorites=priorites)
+            chrono.fusionner(partiel.pop('observations'))
+            restants = partiel.pop('restants')
+            resume.update(partiel)
+            return resume
 
+        restants = traiter_offres_sequentiel(superviseur, liens_offres, user_data, db, resume, chrono, budget,
+                                             args.duplicate_distance, priorites)
+        return resume
 
+    except KeyboardInterrupt:
+        raison_fin = 'interrompu'
+        raise
+    except Exception as e:
+        raison_fin = f"erreur: {type(e).__name__}: {str(e)[:200]}"
+        raise
     finally:
-        logger.info("\n--- Résumé de la session ---")
-        logger.info(f"Nombre total de candidatures envoyées : {sent_applications_count}")
-        if 'driver' in locals() and driver:
+        if superviseur:
+            resume['redemarrages'] += superviseur.redemarrages
+            if args.workers <= 1:
+                resume['memoire'] = superviseur.bilan_memoire()
             logger.info("Fermeture du navigateur.")
-            driver.quit()
-        if 'conn' in locals() and conn:
-            conn.close()
-            logger.info("Connexion à la base de données fermée.")
+            superviseur.fermer()
+        resume['duree'] = round(time.monotonic() - debut_session, 3)
+        if restants is not None:
+            db.save_offer_queue(user_id, restants, run_id)
+            resume['remises_en_file'] = len(restants)
+            if restants and raison_fin == 'termine':
+                raison_fin = 'budget'
+        resume['etapes'] = chrono.rapport()
+        resume['disjoncteur'] = fusionner_bilans_disjoncteur([sante().bilan(), resume.get('disjoncteur', {})])
+        delais_adaptatifs.enregistrer()
+        for cle, delai in delais_adaptatifs.politique().bilan().items():
+            logger.debug(f"Délai d'attente appris pour {cle} : {delai}s")
+        resume['reseau'] = reseau_cdp.fusionner_bilans([reseau_cdp.bilan(), resume.get('reseau', {})])
+        if profileur:
+            try:
+                resume['profil'] = profileur.arreter()
+            except OSError as e:
+                logger.error(f"Impossible d'écrire le profil de la session: {e}")
+        logger.info("\n--- Résumé de la session ---")
+        logger.info(f"Offres découvertes : {resume['decouvertes']} | déjà postulé : {resume['deja_postule']} | échecs : {resume['echecs']}")
+        logger.info(f"Nombre total de candidatures envoyées : {resume['envoyees']}")
+        if resume.get('doublons'):
+            logger.info(f"Offres republiées déjà postulées (doublons) : {resume['doublons']}")
+        if resume.get('ecartees'):
+            logger.info(f"Offres écartées (pertinence < {args.min_score}) : {resume['ecartees']}")
+        if resume.get('remises_en_file'):
+            logger.info(f"Offres remises en file pour la prochaine session : {resume['remises_en_file']}")
+        logger.info(f"Redémarrages du navigateur : {resume['redemarrages']}")
+        memoire = resume.get('memoire') or {}
+        if memoire.get('rss_mo') is not None or memoire.get('recyclages'):
+            logger.info(f"Mémoire du navigateur : {memoire.get('rss_mo') or '-'} Mo (pic {memoire.get('pic_mo') or '-'} Mo), "
+                        f"recyclages : {memoire.get('recyclages', 0)}")
+        if resume['disjoncteur']['ouvertures']:
+            logger.info(f"Ouvertures du disjoncteur : {resume['disjoncteur']['ouvertures']} "
+                        f"({resume['disjoncteur']['pause']:.0f}s de pause)")
+        if resume['reseau']['requetes_bloquees']:
+            logger.info(f"Requêtes bloquées : {resume['reseau']['requetes_bloquees']} "
+                        f"(~{resume['reseau']['octets_evites_estimes'] / 1024:.0f} Kio évités, estimation)")
+        logger.info(f"Durée de la session : {resume['duree']:.1f}s")
+        for etape, mesure in resume['etapes'].items():
+            logger.info(f"  - {etape}: {mesure['total']:.1f}s ({mesure['passages']} passages, {mesure['moyenne']:.2f}s en moyenne)")
+        if run_id:
+            db.finish_run(run_id, resume, raison_fin)
+        metriques.duree_fonctions.observe(resume['duree'], fonction='main')
+        metriques.enregistrer_resume(resume)
+        if args.metrics_file:
+            try:
+                metriques.ecrire_fichier(args.metrics_file)
+            except OSError as e:
+                logger.error(f"Impossible d'écrire le fichier de métriques: {e}")
+        if serveur_metriques:
+            serveur_metriques.shutdown()
+            serveur_metriques.server_close()
+        reseau_cdp.desactiver_chronologie()
+        if serveur_rejeu:
+            serveur_rejeu.arreter()
+        fermer_base()
+        logger.info("Connexion à la base de données fermée.")
         logger.info("--- Scraper iQuesta terminé ---")
 
 if __name__ == "__main__":
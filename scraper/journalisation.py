@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Configuration centrale des logs.
+
+Les modules se contentent de logging.getLogger(__name__). Les points d'entrée
+(scraper, démon, service de navigateurs, cli.py) appellent
+configurer_journalisation() une fois. Tous les enregistrements passent par un
+QueueHandler : l'écriture (console, fichier) est faite par le thread d'un
+QueueListener, pas par le thread du scraper.
+
+Options (arguments ou variables d'environnement) :
+- niveau (LOG_LEVEL, INFO par défaut) ; les boucles par offre et par sélecteur
+  journalisent en DEBUG ;
+- fichier rotatif compressé en gzip (LOG_FILE, LOG_MAX_MB, LOG_BACKUPS) ;
+- format JSON, un objet par ligne (LOG_FORMAT=json) ;
+- mode silencieux (LOG_QUIET) : seuls avertissements et erreurs vont à la
+  console, le fichier garde le niveau configuré.
+
+Les processus travailleurs (pool de navigateurs, démon) reçoivent la file du
+processus principal via contexte_journal() et y envoient leurs
+enregistrements avec rattacher().
+"""
+
+import os
+import sys
+import gzip
+import json
+import atexit
+import shutil
+import logging
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+FORMAT_CONSOLE = '%(levelname)s: %(message)s'
+FORMAT_FICHIER = '%(asctime)s %(processName)s %(name)s %(levelname)s: %(message)s'
+
+# Rotation du fichier de logs (surchargée par LOG_MAX_MB et LOG_BACKUPS)
+TAILLE_MAX_MO_DEFAUT = 10
+NB_ARCHIVES_DEFAUT = 5
+
+
+class FormateurJSON(logging.Formatter):
+    """Un objet JSON par enregistrement."""
+
+    def format(self, record):
+        entree = {
+            'horodatage': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'niveau': record.levelname,
+            'module': record.name,
+            'processus': record.processName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entree['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entree, ensure_ascii=False)
+
+
+class FichierRotatifCompresse(RotatingFileHandler):
+    """RotatingFileHandler dont les archives (fichier.1.gz, fichier.2.gz...) sont compressées en gzip."""
+
+    def __init__(self, chemin, taille_max_mo=TAILLE_MAX_MO_DEFAUT, nb_archives=NB_ARCHIVES_DEFAUT):
+        super().__init__(chemin, maxBytes=int(taille_max_mo * 1024 * 1024), backupCount=nb_archives, encoding='utf-8')
+        self.namer = lambda nom: f"{nom}.gz"
+        self.rotator = self._compresser
+
+    @staticmethod
+    def _compresser(source, destination):
+        with open(source, 'rb') as entree, gzip.open(destination, 'wb') as sortie:
+            shutil.copyfileobj(entree, sortie)
+        os.remove(source)
+
+
+def _vrai(valeur):
+    return str(valeur).lower() in ('1', 'true', 'oui')
+
+
+_listener = None
+_file = None
+
+
+def configurer_journalisation(niveau=None, fichier=None, format_json=None, silencieux=None):
+    """
+    Installe le QueueHandler racine et démarre le QueueListener (une seule fois par processus).
+
+    Args:
+        niveau: Nom du niveau (DEBUG, INFO...) ; défaut LOG_LEVEL ou INFO
+        fichier: Fichier de logs rotatif compressé ; défaut LOG_FILE (aucun si vide)
+        format_json: Enregistrements en JSON ; défaut LOG_FORMAT=json
+        silencieux: Console limitée aux avertissements ; défaut LOG_QUIET
+
+    Returns:
+        QueueListener, ou None si le processus est rattaché à la file d'un autre processus
+    """
+    global _listener, _file
+    racine = logging.getLogger()
+    if _listener is not None or any(isinstance(h, QueueHandler) for h in racine.handlers):
+        return _listener
+    niveau = getattr(logging, (niveau or os.getenv('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    fichier = fichier if fichier is not None else os.getenv('LOG_FILE')
+    format_json = format_json if format_json is not None else os.getenv('LOG_FORMAT', '').lower() == 'json'
+    silencieux = silencieux if silencieux is not None else _vrai(os.getenv('LOG_QUIET', ''))
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setLevel(max(niveau, logging.WARNING) if silencieux else niveau)
+    console.setFormatter(FormateurJSON() if format_json else logging.Formatter(FORMAT_CONSOLE))
+    gestionnaires = [console]
+    if fichier:
+        os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+        sortie = FichierRotatifCompresse(fichier, float(os.getenv('LOG_MAX_MB', TAILLE_MAX_MO_DEFAUT)),
+                                         int(os.getenv('LOG_BACKUPS', NB_ARCHIVES_DEFAUT)))
+        sortie.setFormatter(FormateurJSON() if format_json else logging.Formatter(FORMAT_FICHIER))
+        gestionnaires.append(sortie)
+
+    # File multiprocessing : les processus travailleurs peuvent y écrire aussi
+    _file = multiprocessing.get_context('spawn').Queue(-1)
+    for gestionnaire in racine.handlers[:]:
+        racine.removeHandler(gestionnaire)
+    racine.addHandler(QueueHandler(_file))
+    racine.setLevel(niveau)
+    _listener = QueueListener(_file, *gestionnaires, respect_handler_level=True)
+    _listener.start()
+    atexit.register(arreter_journalisation)
+    return _listener
+
+
+def arreter_journalisation():
+    """Vide la file et arrête le QueueListener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for gestionnaire in _listener.handlers:
+            gestionnaire.close()
+        _listener = None
+
+
+def contexte_journal():
+    """(file, niveau) à transmettre aux processus travailleurs, ou None si la journalisation n'est pas configurée."""
+    if _file is None:
+        return None
+    return _file, logging.getLogger().level
+
+
+def rattacher(contexte):
+    """Dans un processus travailleur : envoie les enregistrements à la file du processus principal."""
+    global _file
+    if not contexte:
+        return
+    file, niveau = contexte
+    # Transmise à son tour aux processus que ce travailleur lance
+    _file = file
+    racine = logging.getLogger()
+    for gestionnaire in racine.handlers[:]:
+        racine.removeHandler(gestionnaire)
+    racine.addHandler(QueueHandler(file))
+    racine.setLevel(niveau)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mémoire résidente (RSS) du navigateur, lue dans /proc.
+
+La mesure porte sur l'arbre de processus du chromedriver : Chrome et tous ses
+processus (rendu, GPU, réseau). Les pages partagées entre processus sont
+comptées plusieurs fois : la valeur surestime la mémoire réellement occupée,
+mais son évolution au fil de la session est fiable.
+
+Hors Linux (pas de /proc), les mesures valent None et le recyclage sur seuil
+mémoire est inactif.
+"""
+
+import os
+import logging
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+_TAILLE_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _parents():
+    """{pid: ppid} de tous les processus visibles."""
+    parents = {}
+    for nom in os.listdir('/proc'):
+        if not nom.isdigit():
+            continue
+        try:
+            with open(f'/proc/{nom}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Le nom du processus (2e champ) peut contenir espaces et parenthèses
+        champs = stat[stat.rindex(b')') + 2:].split()
+        parents[int(nom)] = int(champs[1])
+    return parents
+
+
+def arbre_processus(pid):
+    """pid et tous ses descendants."""
+    enfants = {}
+    for fils, pere in _parents().items():
+        enfants.setdefault(pere, []).append(fils)
+    arbre, a_visiter = [], [pid]
+    while a_visiter:
+        courant = a_visiter.pop()
+        arbre.append(courant)
+        a_visiter.extend(enfants.get(courant, ()))
+    return arbre
+
+
+def rss_processus(pid):
+    """RSS d'un processus en octets (0 s'il a disparu)."""
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _TAILLE_PAGE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def pid_driver(driver):
+    """PID du chromedriver local du driver, ou None."""
+    processus = getattr(getattr(driver, 'service', None), 'process', None)
+    return getattr(processus, 'pid', None)
+
+
+def rss_navigateur(driver):
+    """
+    RSS cumulée du chromedriver et de ses descendants, en Mo.
+
+    Returns:
+        float, ou None si la mesure est impossible (pas de /proc, driver sans processus local)
+    """
+    pid = pid_driver(driver)
+    if pid is None or not os.path.isdir('/proc'):
+        return None
+    try:
+        return round(sum(rss_processus(p) for p in arbre_processus(pid)) / (1024 * 1024), 1)
+    except OSError as e:
+        logger.debug(f"Mesure mémoire du navigateur impossible: {e}")
+        return None
+
+
+def fusionner_memoire(bilans):
+    """Additionne les bilans mémoire de plusieurs navigateurs (simultanés)."""
+    total = {'rss_mo': None, 'pic_mo': None, 'recyclages': 0}
+    for bilan in bilans:
+        for cle in ('rss_mo', 'pic_mo'):
+            if bilan.get(cle) is not None:
+                total[cle] = round((total[cle] or 0) + bilan[cle], 1)
+        total['recyclages'] += bilan.get('recyclages', 0)
+    return total
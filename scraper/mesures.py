@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chronométrage des étapes d'une session du scraper iQuesta.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+
+class ChronoEtapes:
+    """
+    Cumule la durée et le nombre de passages de chaque étape d'une session.
+
+    Args:
+        observateurs: Fonctions observateur(etape, duree) appelées à chaque passage
+    """
+
+    def __init__(self, observateurs=None):
+        self.observateurs = list(observateurs or [])
+        self.durees = {}
+        self.passages = {}
+        self.observations = []
+        # Les étapes du pipeline async sont mesurées depuis plusieurs threads
+        self._verrou = threading.Lock()
+
+    @contextmanager
+    def etape(self, nom):
+        """Mesure la durée du bloc et l'ajoute au cumul de l'étape nom."""
+        debut = time.monotonic()
+        try:
+            yield
+        finally:
+            self.ajouter(nom, time.monotonic() - debut)
+
+    def ajouter(self, nom, duree):
+        with self._verrou:
+            self.durees[nom] = self.durees.get(nom, 0.0) + duree
+            self.passages[nom] = self.passages.get(nom, 0) + 1
+            self.observations.append((nom, duree))
+        for observateur in self.observateurs:
+            observateur(nom, duree)
+
+    def fusionner(self, observations):
+        """Rejoue les observations d'un autre chronomètre (ex: processus travailleur)."""
+        for nom, duree in observations:
+            self.ajouter(nom, duree)
+
+    def rapport(self):
+        """
+        Returns:
+            dict: {étape: {'total': secondes, 'passages': n, 'moyenne': secondes}}
+        """
+        with self._verrou:
+            return {
+                nom: {
+                    'total': round(self.durees[nom], 3),
+                    'passages': self.passages[nom],
+                    'moyenne': round(self.durees[nom] / self.passages[nom], 3),
+                }
+                for nom in self.durees
+            }
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métriques du scraper iQuesta au format texte Prometheus.
+
+Les compteurs et histogrammes sont regroupés dans un registre global. Ils
+peuvent être écrits dans un fichier (collecteur « textfile » de node_exporter)
+ou servis sur un port local (/metrics) pendant la session.
+
+Les compteurs d'offres et de candidatures sont incrémentés au fil de la
+session (compter). Les processus travailleurs ont leur propre registre : ils
+renvoient ses échantillons avec leur résumé, fusionnés dans le registre du
+processus principal.
+"""
+
+import os
+import time
+import logging
+import functools
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Bornes (en secondes) des histogrammes de latence
+BORNES_LATENCE = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _formater_labels(noms, valeurs):
+    if not noms:
+        return ""
+    paires = []
+    for nom, valeur in zip(noms, valeurs):
+        valeur = str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        paires.append(f'{nom}="{valeur}"')
+    return "{" + ",".join(paires) + "}"
+
+
+class _Metrique:
+    type_prometheus = None
+
+    def __init__(self, nom, aide, labels=()):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def _cle(self, labels):
+        return tuple(labels.get(nom, '') for nom in self.labels)
+
+    def lignes(self):
+        yield f"# HELP {self.nom} {self.aide}"
+        yield f"# TYPE {self.nom} {self.type_prometheus}"
+        with self._verrou:
+            valeurs = dict(self._valeurs)
+        for cle, valeur in sorted(valeurs.items()):
+            yield from self._lignes_valeur(cle, valeur)
+
+    def _lignes_valeur(self, cle, valeur):
+        yield f"{self.nom}{_formater_labels(self.labels, cle)} {valeur}"
+
+    def echantillons(self):
+        """Copie des valeurs, transmissible à un autre processus."""
+        with self._verrou:
+            return [(cle, valeur) for cle, valeur in self._valeurs.items()]
+
+    def fusionner(self, echantillons):
+        """Ajoute les échantillons d'un autre processus."""
+        with self._verrou:
+            for cle, valeur in echantillons:
+                self._valeurs[tuple(cle)] = self._ajouter(self._valeurs.get(tuple(cle)), valeur)
+
+    def _ajouter(self, actuelle, valeur):
+        return (actuelle or 0) + valeur
+
+
+class Compteur(_Metrique):
+    """Compteur monotone."""
+    type_prometheus = "counter"
+
+    def inc(self, n=1, **labels):
+        cle = self._cle(labels)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + n
+
+
+class Jauge(_Metrique):
+    """Valeur instantanée."""
+    type_prometheus = "gauge"
+
+    def set(self, valeur, **labels):
+        with self._verrou:
+            self._valeurs[self._cle(labels)] = valeur
+
+    def _ajouter(self, actuelle, valeur):
+        # Dernière valeur connue
+        return valeur
+
+
+class Histogramme(_Metrique):
+    """Histogramme à bornes fixes (buckets cumulés, somme et nombre)."""
+    type_prometheus = "histogram"
+
+    def __init__(self, nom, aide, labels=(), bornes=BORNES_LATENCE):
+        super().__init__(nom, aide, labels)
+        self.bornes = tuple(bornes)
+
+    def observe(self, valeur, **labels):
+        cle = self._cle(labels)
+        with self._verrou:
+            etat = self._valeurs.setdefault(cle, {'buckets': [0] * len(self.bornes), 'somme': 0.0, 'nombre': 0})
+            for i, borne in enumerate(self.bornes):
+                if valeur <= borne:
+                    etat['buckets'][i] += 1
+            etat['somme'] += valeur
+            etat['nombre'] += 1
+
+    def echantillons(self):
+        with self._verrou:
+            return [(cle, {'buckets': list(etat['buckets']), 'somme': etat['somme'], 'nombre': etat['nombre']})
+                    for cle, etat in self._valeurs.items()]
+
+    def _ajouter(self, actuelle, valeur):
+        if actuelle is None:
+            return {'buckets': list(valeur['buckets']), 'somme': valeur['somme'], 'nombre': valeur['nombre']}
+        actuelle['buckets'] = [a + b for a, b in zip(actuelle['buckets'], valeur['buckets'])]
+        actuelle['somme'] += valeur['somme']
+        actuelle['nombre'] += valeur['nombre']
+        return actuelle
+
+    def _lignes_valeur(self, cle, etat):
+        noms = self.labels + ('le',)
+        for borne, cumul in zip(self.bornes, etat['buckets']):
+            yield f"{self.nom}_bucket{_formater_labels(noms, cle + (borne,))} {cumul}"
+        yield f"{self.nom}_bucket{_formater_labels(noms, cle + ('+Inf',))} {etat['nombre']}"
+        yield f"{self.nom}_sum{_formater_labels(self.labels, cle)} {round(etat['somme'], 6)}"
+        yield f"{self.nom}_count{_formater_labels(self.labels, cle)} {etat['nombre']}"
+
+
+class Registre:
+    """Ensemble des métriques exportées."""
+
+    def __init__(self):
+        self.metriques = []
+
+    def ajouter(self, metrique):
+        self.metriques.append(metrique)
+        return metrique
+
+    def echantillons(self):
+        """{nom: échantillons} de toutes les métriques (résumé d'un processus travailleur)."""
+        return {metrique.nom: metrique.echantillons() for metrique in self.metriques}
+
+    def fusionner(self, echantillons):
+        """Ajoute les échantillons d'un autre registre (processus travailleur)."""
+        par_nom = {metrique.nom: metrique for metrique in self.metriques}
+        for nom, valeurs in (echantillons or {}).items():
+            if nom in par_nom:
+                par_nom[nom].fusionner(valeurs)
+
+    def texte(self):
+        """Rendu au format d'exposition texte Prometheus."""
+        lignes = []
+        for metrique in self.metriques:
+            lignes.extend(metrique.lignes())
+        return "\n".join(lignes) + "\n"
+
+
+registre = Registre()
+
+offres_decouvertes = registre.ajouter(Compteur(
+    "iquesta_offres_decouvertes_total", "Offres trouvées sur les pages de résultats."))
+offres_ignorees = registre.ajouter(Compteur(
+    "iquesta_offres_ignorees_total", "Offres ignorées car déjà postulées (y compris republiées sous une autre URL)."))
+candidatures_envoyees = registre.ajouter(Compteur(
+    "iquesta_candidatures_envoyees_total", "Candidatures envoyées avec succès."))
+candidatures_echouees = registre.ajouter(Compteur(
+    "iquesta_candidatures_echouees_total", "Candidatures en échec ou interrompues."))
+replis_selecteurs = registre.ajouter(Compteur(
+    "iquesta_replis_selecteurs_total", "Sélecteurs de repli utilisés faute de sélecteur principal.",
+    labels=("fonction", "repli")))
+redemarrages_navigateur = registre.ajouter(Compteur(
+    "iquesta_redemarrages_navigateur_total", "Navigateurs recréés par le superviseur."))
+duree_etapes = registre.ajouter(Histogramme(
+    "iquesta_duree_etape_secondes", "Durée de chaque passage dans une étape de la session.",
+    labels=("etape",)))
+duree_fonctions = registre.ajouter(Histogramme(
+    "iquesta_duree_fonction_secondes", "Durée des fonctions principales du scraper.",
+    labels=("fonction",)))
+duree_base = registre.ajouter(Histogramme(
+    "iquesta_duree_base_secondes", "Durée des méthodes de UserDatabase.",
+    labels=("methode",), bornes=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)))
+requetes_bloquees = registre.ajouter(Compteur(
+    "iquesta_requetes_bloquees_total", "Requêtes bloquées par la liste de blocage CDP.",
+    labels=("type",)))
+octets_evites_estimes = registre.ajouter(Compteur(
+    "iquesta_octets_evites_estimes_total", "Estimation des octets non téléchargés grâce au blocage."))
+recyclages_navigateur = registre.ajouter(Compteur(
+    "iquesta_recyclages_navigateur_total", "Navigateurs recyclés (seuil mémoire ou nombre d'offres)."))
+memoire_navigateur = registre.ajouter(Jauge(
+    "iquesta_memoire_navigateur_octets", "RSS des navigateurs (chromedriver et Chrome) en fin de session.",
+    labels=("mesure",)))
+ouvertures_disjoncteur = registre.ajouter(Compteur(
+    "iquesta_ouvertures_disjoncteur_total", "Ouvertures du disjoncteur (site lent ou en erreur)."))
+pause_disjoncteur = registre.ajouter(Compteur(
+    "iquesta_pause_disjoncteur_secondes_total", "Temps passé en pause, disjoncteur ouvert."))
+fin_session = registre.ajouter(Jauge(
+    "iquesta_fin_session_timestamp_secondes", "Horodatage Unix de la fin de la dernière session."))
+
+
+def mesurer_duree(nom):
+    """Décorateur alimentant iquesta_duree_fonction_secondes{fonction=nom}."""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            debut = time.monotonic()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                duree_fonctions.observe(time.monotonic() - debut, fonction=nom)
+        return enveloppe
+    return decorateur
+
+
+def repli_selecteur(fonction, repli):
+    """Signale l'utilisation d'un sélecteur de repli."""
+    replis_selecteurs.inc(fonction=fonction, repli=repli)
+
+
+def observer_etape(etape, duree):
+    """Observateur de ChronoEtapes."""
+    duree_etapes.observe(duree, etape=etape)
+
+
+def observer_base(methode, duree):
+    """Observateur de UserDatabase."""
+    duree_base.observe(duree, methode=methode)
+
+
+# Compteur de chaque clé du résumé de session alimentée au fil de l'eau
+_COMPTEURS_RESUME = {
+    'decouvertes': offres_decouvertes,
+    'deja_postule': offres_ignorees,
+    'doublons': offres_ignorees,
+    'envoyees': candidatures_envoyees,
+    'echecs': candidatures_echouees,
+}
+
+
+def compter(resume, cle, n=1):
+    """Incrémente resume[cle] et le compteur Prometheus correspondant (visible aussitôt sur /metrics)."""
+    resume[cle] = resume.get(cle, 0) + n
+    _COMPTEURS_RESUME[cle].inc(n)
+
+
+def enregistrer_resume(resume):
+    """
+    Reporte les bilans de fin de session (réseau, mémoire) et l'horodatage de fin.
+
+    Les compteurs d'offres, de candidatures, de redémarrages et du disjoncteur
+    sont alimentés pendant la session.
+    """
+    reseau = resume.get('reseau', {})
+    for type_ressource, nombre in reseau.get('par_type', {}).items():
+        requetes_bloquees.inc(nombre, type=type_ressource)
+    octets_evites_estimes.inc(reseau.get('octets_evites_estimes', 0))
+    memoire = resume.get('memoire') or {}
+    for mesure, cle in (('actuelle', 'rss_mo'), ('pic', 'pic_mo')):
+        if memoire.get(cle) is not None:
+            memoire_navigateur.set(int(memoire[cle] * 1024 * 1024), mesure=mesure)
+    fin_session.set(round(time.time(), 3))
+
+
+def ecrire_fichier(chemin):
+    """Écrit les métriques dans chemin de façon atomique (fichier temporaire puis renommage)."""
+    dossier = os.path.dirname(chemin)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        f.write(registre.texte())
+    os.replace(temporaire, chemin)
+    logger.info(f"Métriques écrites dans {chemin}")
+
+
+def servir(port, hote='127.0.0.1'):
+    """Sert /metrics sur un port local dans un thread. Retourne le serveur HTTP."""
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            corps = registre.texte().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, format, *args):
+            logger.debug(f"[métriques] {format % args}")
+
+    serveur = ThreadingHTTPServer((hote, port), Gestionnaire)
+    threading.Thread(target=serveur.serve_forever, name="metriques", daemon=True).start()
+    logger.info(f"Métriques servies sur http://{hote}:{serveur.server_address[1]}/metrics")
+    return serveur
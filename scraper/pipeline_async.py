@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Orchestration asyncio du scraper iQuesta.
+Les étapes découverte → extraction → filtrage BDD → candidature tournent en
+parallèle, reliées par des files bornées. Les appels Selenium et sqlite,
+bloquants, sont exécutés dans des exécuteurs dédiés (un thread par ressource).
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException
+
+from application_handler import verifier_et_postuler, enregistrer_candidature, chercher_doublon
+from driver_watchdog import SuperviseurDriver, DelaiOffreDepasse, DELAI_OFFRE_DEFAUT
+from mesures import ChronoEtapes
+from memoire_navigateur import fusionner_memoire
+import metriques
+from disjoncteur import sante
+from database.user_database import UserDatabase
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Taille par défaut des files entre les étapes
+TAILLE_FILE_DEFAUT = 5
+
+# Nombre de navigateurs du pipeline : l'un postule pendant que l'autre lit l'offre suivante
+NB_NAVIGATEURS = 2
+
+# Marqueur de fin de flux entre deux étapes
+_FIN = None
+
+
+class NavigateurIndisponible(WebDriverException):
+    """Levée quand un navigateur ne peut pas être recréé avant une offre."""
+
+
+class PipelineCandidatures:
+    """
+    Pipeline à étapes reliées par des files asyncio bornées.
+
+    Deux navigateurs se relaient : celui qui a ouvert une offre la garde
+    chargée jusqu'à la candidature (la page n'est pas rechargée), pendant que
+    l'autre lit les offres suivantes. Les files bornées limitent la mémoire.
+
+    Args:
+        user_data: Dictionnaire de l'utilisateur (ligne de la table users)
+        db_path: Chemin de la base SQLite
+        fabrique_driver: Fonction sans argument retournant un nouveau driver
+        preparation: Fonction de préparation d'un nouveau driver (accueil, cookies)
+        decouvrir: Fonction decouvrir(driver) retournant la liste des liens d'offres
+        extraire: Fonction extraire(driver, url) retournant les détails de l'offre
+        delai_offre: Échéance en secondes par offre et par navigateur
+        taille_file: Nombre maximal d'éléments en attente entre deux étapes
+        chrono: ChronoEtapes recevant la durée de chaque étape
+        budget: BudgetSession de la session ; les offres hors budget sont
+            rassemblées dans self.restants au lieu d'être traitées
+        options_superviseur: Arguments supplémentaires des SuperviseurDriver
+            (seuils de recyclage du navigateur)
+        distance_doublons: Distance de Hamming maximale des offres republiées
+            (négative : détection désactivée)
+        priorites: {lien: score de pertinence} ; sous budget serré, les offres
+            les moins pertinentes qui ne tiennent plus sont différées
+    """
+
+    def __init__(self, user_data, db_path, fabrique_driver, preparation, decouvrir, extraire,
+                 delai_offre=DELAI_OFFRE_DEFAUT, taille_file=TAILLE_FILE_DEFAUT, chrono=None,
+                 budget=None, options_superviseur=None, distance_doublons=-1, priorites=None):
+        self.user_data = user_data
+        self.db_path = db_path
+        self.decouvrir = decouvrir
+        self.extraire = extraire
+        self.taille_file = taille_file
+        self.chrono = chrono or ChronoEtapes()
+        options_superviseur = options_superviseur or {}
+        # Les deux navigateurs postulent : ils utilisent la même fabrique
+        self.superviseurs = [SuperviseurDriver(fabrique_driver, preparation, delai_offre, **options_superviseur)
+                             for _ in range(NB_NAVIGATEURS)]
+        self.resume = {
+            'decouvertes': 0,
+            'traitees': 0,
+            'deja_postule': 0,
+            'doublons': 0,
+            'envoyees': 0,
+            'echecs': 0,
+        }
+        self.budget = budget
+        self.distance_doublons = distance_doublons
+        self.priorites = priorites
+        self.restants = []
+        # Vrai quand un navigateur n'a pas pu être recréé : les offres suivantes sont remises en file
+        self.arrete = False
+        self._db = None
+
+    # --- Ressources bloquantes (exécutées dans leurs threads dédiés) ---
+
+    def _ouvrir_base(self):
+        # La connexion est créée dans le thread de l'exécuteur BDD qui l'utilisera
+        self._db = UserDatabase(self.db_path)
+
+    def _fermer_base(self):
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    def _deja_postule(self, url):
+        return self._db.check_if_applied(self.user_data['id'], url)
+
+    def _doublon(self, offer_details):
+        return chercher_doublon(self._db, self.user_data['id'], offer_details, self.distance_doublons)
+
+    def _enregistrer(self, offer_details):
+        if not enregistrer_candidature(self._db.conn, self._db.cursor, self.user_data, offer_details):
+            logger.warning("Échec de l'enregistrement de la candidature en base de données.")
+
+    def _ouvrir_offre(self, superviseur, url):
+        if not superviseur.nouvelle_offre():
+            raise NavigateurIndisponible("Navigateur indisponible")
+        return superviseur.executer(self.extraire, url)
+
+    def _postuler(self, superviseur):
+        # La page de l'offre est déjà chargée par l'extraction dans ce navigateur
+        superviseur.relancer_echeance()
+        return superviseur.executer(verifier_et_postuler, self.user_data)
+
+    def _patienter(self, superviseur):
+        return sante().patienter(superviseur.sonder, self.budget.echeance if self.budget else None)
+
+    def _mesurer(self, etape, fonction, *args):
+        with self.chrono.etape(etape):
+            return fonction(*args)
+
+    # --- Étapes ---
+
+    async def _etape_decouverte(self, loop, executeurs, libres, sortie):
+        superviseur = await libres.get()
+        try:
+            liens = await loop.run_in_executor(
+                executeurs[superviseur], self._mesurer, 'decouverte', self.decouvrir, superviseur.driver)
+            logger.info(f"[découverte] {len(liens)} offres trouvées.")
+            libres.put_nowait(superviseur)
+            superviseur = None
+            metriques.compter(self.resume, 'decouvertes', len(liens))
+            en_attente = list(liens)
+            while en_attente:
+                # Budget serré : les offres les moins pertinentes ne sont pas envoyées dans le pipeline
+                if self.budget and self.budget.serre(len(en_attente)):
+                    en_attente, differees = self.budget.differer(en_attente, self.priorites)
+                    if differees:
+                        logger.warning(f"[découverte] Budget serré ({self.budget.etat()}) : {len(differees)} offres "
+                                       f"les moins pertinentes remises en file.")
+                        self.restants.extend(differees)
+                    if not en_attente:
+                        break
+                await sortie.put(en_attente.pop(0))
+        except Exception as e:
+            logger.error(f"[découverte] Erreur: {e}")
+        finally:
+            if superviseur:
+                libres.put_nowait(superviseur)
+            await sortie.put(_FIN)
+
+    async def _etape_extraction(self, loop, executeurs, executeur_bdd, libres, entree, sortie):
+        while (lien := await entree.get()) is not _FIN:
+            if self.arrete or (self.budget and self.budget.epuise()):
+                # La file est vidée sans ouvrir les pages : les offres restent pour la session suivante
+                self.restants.append(lien)
+                continue
+            superviseur = await libres.get()
+            if not await loop.run_in_executor(executeurs[superviseur], self._patienter, superviseur):
+                libres.put_nowait(superviseur)
+                self.restants.append(lien)
+                continue
+            try:
+                details = await loop.run_in_executor(
+                    executeurs[superviseur], self._mesurer, 'extraction', self._ouvrir_offre, superviseur, lien)
+            except NavigateurIndisponible:
+                logger.critical("[extraction] Navigateur indisponible, offres suivantes remises en file.")
+                self.arrete = True
+                self.restants.append(lien)
+                libres.put_nowait(superviseur)
+                continue
+            except (DelaiOffreDepasse, WebDriverException) as e:
+                logger.error(f"[extraction] Offre ignorée, impossible de l'ouvrir ({lien}): {str(e)[:100]}")
+                libres.put_nowait(superviseur)
+                # Comptée et enregistrée comme en mode séquentiel
+                metriques.compter(self.resume, 'echecs')
+                await loop.run_in_executor(executeur_bdd, self._mesurer, 'enregistrement', self._enregistrer,
+                                           {'Lien': lien, 'Statut': 'Échec candidature'})
+                continue
+            # Le navigateur garde la page chargée et suit l'offre jusqu'à la candidature
+            await sortie.put((details, superviseur, time.monotonic()))
+        await sortie.put(_FIN)
+
+    async def _etape_filtrage(self, loop, executeur_bdd, libres, entree, sortie):
+        while (element := await entree.get()) is not _FIN:
+            details, superviseur, _ = element
+            if await loop.run_in_executor(executeur_bdd, self._mesurer, 'filtrage', self._deja_postule, details['Lien']):
+                logger.info(f"[filtrage] Déjà postulé: {details['Lien']}")
+                details['Statut'] = 'Déjà postulé'
+                metriques.compter(self.resume, 'deja_postule')
+            elif await loop.run_in_executor(executeur_bdd, self._mesurer, 'filtrage', self._doublon, details):
+                details['Statut'] = 'Doublon'
+                metriques.compter(self.resume, 'doublons')
+            else:
+                await sortie.put(element)
+                continue
+            libres.put_nowait(superviseur)
+            await loop.run_in_executor(executeur_bdd, self._mesurer, 'enregistrement', self._enregistrer, details)
+        await sortie.put(_FIN)
+
+    async def _etape_candidature(self, loop, executeurs, executeur_bdd, libres, entree):
+        while (element := await entree.get()) is not _FIN:
+            details, superviseur, debut_offre = element
+            if self.budget and (self.budget.epuise() or not self.budget.reserver()):
+                libres.put_nowait(superviseur)
+                self.restants.append(details['Lien'])
+                continue
+            self.resume['traitees'] += 1
+            try:
+                postule = await loop.run_in_executor(
+                    executeurs[superviseur], self._mesurer, 'candidature', self._postuler, superviseur)
+            except (DelaiOffreDepasse, WebDriverException) as e:
+                logger.error(f"[candidature] Candidature interrompue: {str(e)[:100]}")
+                postule = False
+            libres.put_nowait(superviseur)
+            if postule:
+                details['Statut'] = 'Candidature envoyée'
+                metriques.compter(self.resume, 'envoyees')
+            else:
+                details['Statut'] = 'Échec candidature'
+                metriques.compter(self.resume, 'echecs')
+                if self.budget:
+                    self.budget.liberer()
+            await loop.run_in_executor(executeur_bdd, self._mesurer, 'enregistrement', self._enregistrer, details)
+            if self.budget:
+                # Du début de l'extraction à la fin de la candidature, attente dans les files comprise
+                self.budget.observer(time.monotonic() - debut_offre)
+
+    async def executer(self):
+        """Lance toutes les étapes et retourne le résumé de la session."""
+        loop = asyncio.get_running_loop()
+        executeurs = {superviseur: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"navigateur-{i}")
+                      for i, superviseur in enumerate(self.superviseurs)}
+        executeur_bdd = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bdd")
+        try:
+            await loop.run_in_executor(executeur_bdd, self._ouvrir_base)
+            drivers = await asyncio.gather(*(loop.run_in_executor(executeurs[superviseur], superviseur.demarrer)
+                                             for superviseur in self.superviseurs))
+            if not all(drivers):
+                logger.critical("Impossible d'initialiser les navigateurs du pipeline.")
+                return self.resume
+
+            # Navigateurs sans offre en cours
+            libres = asyncio.Queue()
+            for superviseur in self.superviseurs:
+                libres.put_nowait(superviseur)
+            file_liens = asyncio.Queue(maxsize=self.taille_file)
+            file_details = asyncio.Queue(maxsize=self.taille_file)
+            file_candidatures = asyncio.Queue(maxsize=self.taille_file)
+            await asyncio.gather(
+                self._etape_decouverte(loop, executeurs, libres, file_liens),
+                self._etape_extraction(loop, executeurs, executeur_bdd, libres, file_liens, file_details),
+                self._etape_filtrage(loop, executeur_bdd, libres, file_details, file_candidatures),
+                self._etape_candidature(loop, executeurs, executeur_bdd, libres, file_candidatures),
+            )
+            return self.resume
+        finally:
+            self.resume['redemarrages'] = sum(superviseur.redemarrages for superviseur in self.superviseurs)
+            self.resume['memoire'] = fusionner_memoire([superviseur.bilan_memoire() for superviseur in self.superviseurs])
+            await asyncio.gather(
+                *(loop.run_in_executor(executeurs[superviseur], superviseur.fermer) for superviseur in self.superviseurs),
+                loop.run_in_executor(executeur_bdd, self._fermer_base),
+            )
+            for executeur in [*executeurs.values(), executeur_bdd]:
+                executeur.shutdown(wait=True)
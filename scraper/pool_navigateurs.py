@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Répartition des offres d'une session sur plusieurs processus navigateurs.
+Chaque processus possède son propre WebDriver ; ils partagent un seau à jetons
+qui plafonne le débit global de requêtes vers iquesta.com, et se coordonnent
+via la base de données pour ne jamais postuler deux fois à la même offre.
+"""
+
+import time
+import logging
+import multiprocessing
+from queue import Empty
+from selenium.common.exceptions import WebDriverException
+
+from application_handler import verifier_et_postuler, enregistrer_candidature, chercher_doublon
+from driver_watchdog import SuperviseurDriver, DelaiOffreDepasse, DELAI_OFFRE_DEFAUT
+from mesures import ChronoEtapes
+from memoire_navigateur import fusionner_memoire
+import reseau_cdp
+import metriques
+import delais_adaptatifs
+import journalisation
+from disjoncteur import sante, fusionner_bilans as fusionner_bilans_disjoncteur
+from database.user_database import UserDatabase
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Débit global par défaut (requêtes par minute, tous processus confondus)
+DEBIT_PAR_MINUTE_DEFAUT = 30
+
+# Âge (secondes) au-delà duquel une réservation 'En cours' est considérée comme
+# abandonnée par un processus arrêté, et expirée au démarrage de la session
+AGE_MAX_RESERVATION = 3600
+
+
+class SeauJetons:
+    """
+    Seau à jetons partagé entre processus (mémoire partagée + verrou).
+
+    Args:
+        debit_par_minute: Nombre de jetons ajoutés par minute
+        capacite: Nombre maximal de jetons accumulables (rafale autorisée)
+        ctx: Contexte multiprocessing utilisé pour créer les objets partagés
+    """
+
+    def __init__(self, debit_par_minute=DEBIT_PAR_MINUTE_DEFAUT, capacite=2, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.debit = debit_par_minute / 60.0
+        self.capacite = capacite
+        self._jetons = ctx.Value('d', float(capacite), lock=False)
+        self._mise_a_jour = ctx.Value('d', time.time(), lock=False)
+        self._verrou = ctx.Lock()
+
+    def acquerir(self, n=1):
+        """Bloque jusqu'à obtenir n jetons."""
+        while True:
+            with self._verrou:
+                maintenant = time.time()
+                ecoule = max(0.0, maintenant - self._mise_a_jour.value)
+                self._jetons.value = min(self.capacite, self._jetons.value + ecoule * self.debit)
+                self._mise_a_jour.value = maintenant
+                if self._jetons.value >= n:
+                    self._jetons.value -= n
+                    return
+                attente = (n - self._jetons.value) / self.debit
+            time.sleep(attente)
+
+
+def _avec_jeton(seau, fonction):
+    """Enveloppe fonction(driver, *args) pour consommer un jeton avant l'appel."""
+    def appel(driver, *args, **kwargs):
+        seau.acquerir()
+        return fonction(driver, *args, **kwargs)
+    return appel
+
+
+def _travailleur(indice, liens, user_data, db_path, seau, fabrique_driver, preparation, extraire,
+                 delai_offre, file_resultats, budget=None, options_superviseur=None, distance_doublons=-1,
+                 contexte_journal=None, priorites=None, voies=1):
+    """Traite une part des offres dans un processus dédié et publie son résumé."""
+    journalisation.rattacher(contexte_journal)
+    # Processus spawn : l'observateur posé par le processus principal n'est pas hérité
+    UserDatabase.observateur = metriques.observer_base
+    resume = {'travailleur': indice, 'traitees': 0, 'deja_postule': 0, 'doublons': 0, 'envoyees': 0, 'echecs': 0,
+              'restants': []}
+    chrono = ChronoEtapes()
+    db = UserDatabase(db_path)
+    superviseur = SuperviseurDriver(fabrique_driver, _avec_jeton(seau, preparation), delai_offre,
+                                    **(options_superviseur or {}))
+    liens = list(liens)
+    differees = []
+    try:
+        if not superviseur.demarrer():
+            logger.critical(f"[travailleur {indice}] Impossible d'initialiser le navigateur, offres remises en file.")
+            resume['restants'] = list(liens)
+            return
+        for position, lien in enumerate(liens):
+            if budget and budget.epuise():
+                logger.warning(f"[travailleur {indice}] Budget atteint ({budget.etat()}), offres restantes remises en file.")
+                resume['restants'] = liens[position:]
+                break
+            # Budget serré : les offres les moins pertinentes de cette part sont différées
+            if budget and budget.serre(len(liens) - position, voies):
+                a_traiter, ecartees = budget.differer(liens[position:], priorites, voies)
+                if ecartees:
+                    logger.warning(f"[travailleur {indice}] Budget serré ({budget.etat()}) : {len(ecartees)} offres "
+                                   f"les moins pertinentes remises en file.")
+                    differees.extend(ecartees)
+                    # Seule la fin de la liste change : la boucle s'arrête à la nouvelle longueur
+                    liens[position:] = a_traiter
+                    lien = liens[position]
+            # Site en difficulté : pause puis sonde avant de réserver l'offre
+            if not sante().patienter(superviseur.sonder, budget.echeance if budget else None):
+                resume['restants'] = liens[position:]
+                break
+            # La réservation en base garantit qu'un seul processus traite cette offre
+            with chrono.etape('filtrage'):
+                reservee = db.claim_application(user_data['id'], lien)
+            if not reservee:
+                logger.info(f"[travailleur {indice}] Déjà postulé ou pris par un autre processus: {lien}")
+                metriques.compter(resume, 'deja_postule')
+                continue
+            if budget and not budget.reserver():
+                # Rend la réservation : l'offre sera traitée par une prochaine session
+                db.release_application(user_data['id'], lien)
+                resume['restants'] = liens[position:]
+                break
+            resume['traitees'] += 1
+            debut_offre = time.monotonic()
+            offer_details = {'Lien': lien, 'Statut': 'Échec candidature'}
+            try:
+                if not superviseur.nouvelle_offre():
+                    raise WebDriverException("Navigateur indisponible")
+                with chrono.etape('extraction'):
+                    offer_details = superviseur.executer(_avec_jeton(seau, extraire), lien)
+                offer_details['Lien'] = lien
+                with chrono.etape('filtrage'):
+                    doublon = chercher_doublon(db, user_data['id'], offer_details, distance_doublons)
+                if doublon:
+                    offer_details['Statut'] = 'Doublon'
+                    metriques.compter(resume, 'doublons')
+                else:
+                    with chrono.etape('candidature'):
+                        seau.acquerir()
+                        postule = superviseur.executer(verifier_et_postuler, user_data)
+                    if postule:
+                        offer_details['Statut'] = 'Candidature envoyée'
+                        metriques.compter(resume, 'envoyees')
+                    else:
+                        offer_details['Statut'] = 'Échec candidature'
+                        metriques.compter(resume, 'echecs')
+            except (DelaiOffreDepasse, WebDriverException) as e:
+                logger.error(f"[travailleur {indice}] Offre interrompue ({lien}): {str(e)[:100]}")
+                offer_details['Statut'] = 'Échec candidature'
+                metriques.compter(resume, 'echecs')
+            except BaseException:
+                # Erreur inattendue : la réservation est rendue et l'offre remise en file
+                db.release_application(user_data['id'], lien)
+                if budget:
+                    budget.liberer()
+                resume['traitees'] -= 1
+                resume['restants'] = liens[position:]
+                raise
+            with chrono.etape('enregistrement'):
+                enregistrer_candidature(db.conn, db.cursor, user_data, offer_details)
+            if budget:
+                if offer_details['Statut'] != 'Candidature envoyée':
+                    budget.liberer()
+                budget.observer(time.monotonic() - debut_offre)
+    finally:
+        resume['restants'] = list(resume['restants']) + differees
+        resume['redemarrages'] = superviseur.redemarrages
+        resume['memoire'] = superviseur.bilan_memoire()
+        resume['observations'] = chrono.observations
+        resume['metriques'] = metriques.registre.echantillons()
+        resume['reseau'] = reseau_cdp.bilan()
+        resume['disjoncteur'] = sante().bilan()
+        delais_adaptatifs.enregistrer()
+        superviseur.fermer()
+        db.close()
+        file_resultats.put(resume)
+
+
+def traiter_offres_en_parallele(liens, user_data, db_path, fabrique_driver, preparation, extraire,
+                                nb_travailleurs, debit_par_minute=DEBIT_PAR_MINUTE_DEFAUT,
+                                delai_offre=DELAI_OFFRE_DEFAUT, budget=None, options_superviseur=None,
+                                distance_doublons=-1, priorites=None):
+    """
+    Répartit les liens sur nb_travailleurs processus et fusionne leurs résumés.
+
+    Args:
+        liens: Liste des URLs d'offres découvertes
+        user_data: Dictionnaire de l'utilisateur
+        db_path: Chemin de la base SQLite
+        fabrique_driver: Fonction (au niveau module) retournant un nouveau driver
+        preparation: Fonction de préparation d'un nouveau driver
+        extraire: Fonction extraire(driver, url) retournant les détails de l'offre
+        nb_travailleurs: Nombre de processus navigateurs
+        debit_par_minute: Plafond global de requêtes par minute vers le site
+        budget: BudgetSession partagée par les processus (échéance et plafond de candidatures)
+        options_superviseur: Arguments supplémentaires des SuperviseurDriver (seuils de recyclage)
+        distance_doublons: Distance de Hamming maximale des offres republiées (négative : désactivé)
+        priorites: {lien: score de pertinence} ; sous budget serré, chaque processus
+            diffère les offres les moins pertinentes de sa part qui ne tiennent plus
+
+    Returns:
+        dict: Résumé fusionné de la session (compteurs, 'observations' des étapes, bilan 'reseau'
+        et offres 'restants' non traitées faute de budget)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    if budget:
+        budget.partager(ctx)
+    seau = SeauJetons(debit_par_minute, ctx=ctx)
+    file_resultats = ctx.Queue()
+    parts = [liens[i::nb_travailleurs] for i in range(nb_travailleurs)]
+    # Processus lancés : le plafond de candidatures est partagé entre eux
+    voies = sum(1 for part in parts if part)
+    processus = []
+    for indice, part in enumerate(parts):
+        if not part:
+            continue
+        p = ctx.Process(
+            target=_travailleur,
+            args=(indice, part, user_data, db_path, seau, fabrique_driver, preparation, extraire,
+                  delai_offre, file_resultats, budget, options_superviseur, distance_doublons,
+                  journalisation.contexte_journal(), priorites, voies),
+            name=f"navigateur-{indice}",
+        )
+        p.start()
+        processus.append(p)
+    logger.info(f"{len(processus)} processus navigateurs lancés pour {len(liens)} offres "
+                f"(plafond: {debit_par_minute} requêtes/min).")
+
+    resumes = []
+    while len(resumes) < len(processus):
+        try:
+            resumes.append(file_resultats.get(timeout=1))
+        except Empty:
+            if not any(p.is_alive() for p in processus):
+                break
+    for p in processus:
+        p.join()
+        if p.exitcode:
+            logger.error(f"Le processus {p.name} s'est terminé avec le code {p.exitcode}.")
+    # Processus arrêté sans publier son résumé (plantage de Chrome, signal) : ses
+    # réservations sont rendues et les offres qu'il n'a pas enregistrées remises en file
+    rapportes = {partiel['travailleur'] for partiel in resumes}
+    perdues = [parts[indice] for indice in range(nb_travailleurs) if parts[indice] and indice not in rapportes]
+    if perdues:
+        db = UserDatabase(db_path)
+        try:
+            for part in perdues:
+                for lien in part:
+                    db.release_application(user_data['id'], lien)
+                restants = [lien for lien in part if not db.check_if_applied(user_data['id'], lien)]
+                logger.warning(f"{len(restants)} offres d'un processus arrêté remises en file.")
+                resumes.append({'restants': restants})
+        finally:
+            db.close()
+
+    resume = {'travailleurs': len(processus), 'traitees': 0, 'deja_postule': 0, 'doublons': 0, 'envoyees': 0,
+              'echecs': 0, 'redemarrages': 0, 'observations': [], 'restants': [],
+              'reseau': reseau_cdp.fusionner_bilans(partiel.get('reseau', {}) for partiel in resumes),
+              'memoire': fusionner_memoire(partiel.get('memoire', {}) for partiel in resumes),
+              'disjoncteur': fusionner_bilans_disjoncteur(partiel.get('disjoncteur', {}) for partiel in resumes)}
+    for partiel in resumes:
+        for cle in ('traitees', 'deja_postule', 'doublons', 'envoyees', 'echecs', 'redemarrages'):
+            resume[cle] += partiel.get(cle, 0)
+        resume['observations'].extend(partiel.get('observations', []))
+        metriques.registre.fusionner(partiel.get('metriques'))
+        resume['restants'].extend(partiel.get('restants', []))
+    # Les parts sont entrelacées : l'ordre de priorité des offres est rétabli
+    restants = set(resume['restants'])
+    resume['restants'] = [lien for lien in liens if lien in restants]
+    return resume
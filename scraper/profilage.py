@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profilage CPU et mémoire d'une session du scraper iQuesta (option --profile).
+
+Produit dans le dossier d'artefacts :
+- session.pstats : profil cProfile fusionné de tous les threads (pstats, snakeviz...)
+- session.collapsed : piles échantillonnées au format « collapsed » (flamegraph.pl, speedscope)
+- allocations.txt : principaux sites d'allocation (tracemalloc) par étape
+- resume.txt : fonctions les plus coûteuses et répartition du temps par catégorie
+  (logging, json, Selenium, attente du navigateur, pauses...)
+
+Les processus travailleurs (--workers > 1) ne sont pas profilés.
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import linecache
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Période d'échantillonnage des piles (secondes)
+INTERVALLE_ECHANTILLONNAGE = 0.005
+
+# Profondeur des tracebacks conservés par tracemalloc
+PROFONDEUR_TRACEMALLOC = 25
+
+# Nombre de sites d'allocation listés par étape
+NB_SITES_PAR_ETAPE = 10
+
+# Fragments de chemin → catégorie, testés de la frame la plus profonde vers la racine
+_CATEGORIES = (
+    (('logging' + os.sep,), 'logging'),
+    (('json' + os.sep,), 'json'),
+    (('http' + os.sep + 'client.py', 'socket.py', 'urllib3' + os.sep, 'selectors.py', 'ssl.py'), 'attente_navigateur'),
+    (('selenium' + os.sep,), 'selenium'),
+    (('threading.py', 'queue.py', os.sep + 'concurrent' + os.sep), 'attente_thread'),
+)
+
+
+def _nom_frame(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _categorie(frame):
+    """Catégorie de temps d'une pile, d'après la frame la plus profonde reconnue."""
+    feuille = frame
+    while frame is not None:
+        fichier = frame.f_code.co_filename
+        for fragments, categorie in _CATEGORIES:
+            if any(fragment in fichier for fragment in fragments):
+                # Le JSON produit par Selenium est de la sérialisation WebDriver
+                if categorie == 'json' and _dans_selenium(frame):
+                    return 'selenium'
+                return categorie
+        frame = frame.f_back
+    if 'sleep(' in linecache.getline(feuille.f_code.co_filename, feuille.f_lineno):
+        return 'pause'
+    return 'python'
+
+
+def _dans_selenium(frame):
+    while frame is not None:
+        if 'selenium' + os.sep in frame.f_code.co_filename:
+            return True
+        frame = frame.f_back
+    return False
+
+
+class Profileur:
+    """
+    Profilage d'une session : cProfile par thread, échantillonnage des piles et
+    tracemalloc avec instantanés à la fin de chaque étape.
+
+    Args:
+        dossier: Dossier où écrire les artefacts
+        intervalle: Période d'échantillonnage des piles (secondes)
+    """
+
+    def __init__(self, dossier, intervalle=INTERVALLE_ECHANTILLONNAGE):
+        self.dossier = dossier
+        self.intervalle = intervalle
+        self._profil_principal = cProfile.Profile()
+        self._profils_threads = []
+        self._piles = Counter()
+        self._categories = Counter()
+        self._allocations = defaultdict(Counter)
+        self._instantane = None
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._echantillonneur = None
+        self._debut = None
+
+    # --- Démarrage / arrêt ---
+
+    def demarrer(self):
+        self._debut = time.monotonic()
+        tracemalloc.start(PROFONDEUR_TRACEMALLOC)
+        self._instantane = self._prendre_instantane()
+        self._echantillonneur = threading.Thread(target=self._echantillonner, name="profilage", daemon=True)
+        self._echantillonneur.start()
+        # Chaque nouveau thread (exécuteurs, superviseurs) reçoit son propre profil
+        threading.setprofile(self._profiler_thread)
+        self._profil_principal.enable()
+        logger.info(f"Profilage activé (artefacts dans {self.dossier}).")
+
+    def arreter(self):
+        """Arrête le profilage et écrit les artefacts. Retourne le dossier."""
+        self._profil_principal.disable()
+        threading.setprofile(None)
+        self._arret.set()
+        self._echantillonneur.join()
+        memoire_courante, memoire_pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        duree = time.monotonic() - self._debut
+
+        os.makedirs(self.dossier, exist_ok=True)
+        stats = pstats.Stats(self._profil_principal)
+        for profil in self._profils_threads:
+            stats.add(profil)
+        stats.dump_stats(os.path.join(self.dossier, 'session.pstats'))
+        self._ecrire_piles()
+        self._ecrire_allocations()
+        self._ecrire_resume(stats, duree, memoire_courante, memoire_pic)
+        logger.info(f"Profil de la session écrit dans {self.dossier}")
+        return self.dossier
+
+    # --- Collecte ---
+
+    def _profiler_thread(self, frame, evenement, argument):
+        # Appelé une seule fois par thread : le profil installé remplace ce crochet
+        profil = cProfile.Profile()
+        try:
+            profil.enable()
+        except ValueError:
+            # Un seul profileur actif à la fois sur certaines versions : l'échantillonnage suffit
+            sys.setprofile(None)
+            return
+        with self._verrou:
+            self._profils_threads.append(profil)
+
+    def _echantillonner(self):
+        noms_threads = {}
+        moi = threading.get_ident()
+        while not self._arret.wait(self.intervalle):
+            for thread in threading.enumerate():
+                noms_threads[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == moi:
+                    continue
+                pile = []
+                courante = frame
+                while courante is not None:
+                    pile.append(_nom_frame(courante))
+                    courante = courante.f_back
+                pile.append(noms_threads.get(ident, str(ident)))
+                self._piles[";".join(reversed(pile))] += 1
+                self._categories[_categorie(frame)] += 1
+
+    def _prendre_instantane(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def observer_etape(self, etape, duree):
+        """
+        Observateur de ChronoEtapes : attribue à l'étape qui se termine les
+        allocations faites depuis l'instantané précédent.
+        """
+        instantane = self._prendre_instantane()
+        with self._verrou:
+            precedent, self._instantane = self._instantane, instantane
+            for stat in instantane.compare_to(precedent, 'lineno'):
+                if stat.size_diff > 0:
+                    self._allocations[etape][str(stat.traceback[0])] += stat.size_diff
+
+    # --- Écriture des artefacts ---
+
+    def _ecrire_piles(self):
+        with open(os.path.join(self.dossier, 'session.collapsed'), 'w', encoding='utf-8') as f:
+            for pile, nombre in self._piles.most_common():
+                f.write(f"{pile} {nombre}\n")
+
+    def _ecrire_allocations(self):
+        with open(os.path.join(self.dossier, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            for etape, sites in sorted(self._allocations.items()):
+                f.write(f"== {etape} ==\n")
+                for site, taille in sites.most_common(NB_SITES_PAR_ETAPE):
+                    f.write(f"{taille / 1024:>10.1f} Kio  {site}\n")
+                f.write("\n")
+
+    def _ecrire_resume(self, stats, duree, memoire_courante, memoire_pic):
+        total = sum(self._categories.values()) or 1
+        with open(os.path.join(self.dossier, 'resume.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Durée profilée : {duree:.1f}s\n")
+            f.write(f"Mémoire Python : {memoire_courante / 1048576:.1f} Mio (pic {memoire_pic / 1048576:.1f} Mio)\n\n")
+            f.write("Répartition des échantillons (tous threads) :\n")
+            for categorie, nombre in self._categories.most_common():
+                f.write(f"  - {categorie:<20} {nombre / total:>6.1%}  ({nombre} échantillons)\n")
+            f.write("\n")
+            tampon = io.StringIO()
+            stats.stream = tampon
+            stats.sort_stats('cumulative').print_stats(40)
+            f.write(tampon.getvalue())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profils Chrome persistants par utilisateur (user-data-dir).
+
+Les profils sont rangés à côté de users.db, dans profils_chrome/. Cookies,
+consentement et cache HTTP survivent ainsi d'une session à l'autre. Chaque
+profil est réservé par un verrou fcntl : deux navigateurs (processus
+travailleurs, pipeline async) ne partagent jamais le même dossier et
+prennent sinon un emplacement supplémentaire (user-<id>-1, user-<id>-2...).
+
+La taille totale est plafonnée : les profils les moins récemment utilisés et
+non réservés sont supprimés.
+"""
+
+import os
+import time
+import fcntl
+import shutil
+import logging
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Plafond par défaut de la taille totale des profils (surchargé par CHROME_PROFILES_MAX_MB)
+TAILLE_MAX_DEFAUT_MO = 2048
+
+# Nombre maximal d'emplacements par utilisateur (navigateurs simultanés)
+EMPLACEMENTS_MAX = 8
+
+# Durée pendant laquelle le consentement aux cookies est considéré comme acquis
+DUREE_CONSENTEMENT = 30 * 24 * 3600
+
+FICHIER_CONSENTEMENT = '.consentement'
+
+
+def _taille_dossier(chemin):
+    total = 0
+    for racine, _, fichiers in os.walk(chemin):
+        for fichier in fichiers:
+            try:
+                total += os.lstat(os.path.join(racine, fichier)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfilReserve:
+    """Profil réservé pour un navigateur ; liberer() rend le verrou."""
+
+    def __init__(self, chemin, verrou):
+        self.chemin = chemin
+        self._verrou = verrou
+
+    def consentement_donne(self):
+        """Vrai si les cookies ont été acceptés avec ce profil récemment."""
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.chemin, FICHIER_CONSENTEMENT)) < DUREE_CONSENTEMENT
+        except OSError:
+            return False
+
+    def marquer_consentement(self):
+        with open(os.path.join(self.chemin, FICHIER_CONSENTEMENT), 'w', encoding='utf-8') as f:
+            f.write(time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def liberer(self):
+        if self._verrou:
+            # Horodatage d'utilisation pour le nettoyage LRU
+            os.utime(self.chemin)
+            fcntl.flock(self._verrou, fcntl.LOCK_UN)
+            self._verrou.close()
+            self._verrou = None
+
+
+class ProfilsChrome:
+    """
+    Emplacements de profils Chrome d'un utilisateur.
+
+    Objet simple (sérialisable) transmis aux fabriques de driver, y compris
+    dans les processus travailleurs.
+
+    Args:
+        racine: Dossier des profils (profils_chrome/ à côté de users.db)
+        user_id: ID de l'utilisateur
+    """
+
+    def __init__(self, racine, user_id):
+        self.racine = racine
+        self.user_id = user_id
+
+    @classmethod
+    def pour_base(cls, db_path, user_id):
+        return cls(os.path.join(os.path.dirname(os.path.abspath(db_path)), 'profils_chrome'), user_id)
+
+    def reserver(self):
+        """
+        Réserve le premier emplacement libre de l'utilisateur.
+
+        Returns:
+            ProfilReserve, ou None si tous les emplacements sont pris
+        """
+        os.makedirs(self.racine, exist_ok=True)
+        for indice in range(EMPLACEMENTS_MAX):
+            nom = f"user-{self.user_id}" if indice == 0 else f"user-{self.user_id}-{indice}"
+            verrou = open(os.path.join(self.racine, f"{nom}.lock"), 'w')
+            try:
+                fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                verrou.close()
+                continue
+            chemin = os.path.join(self.racine, nom)
+            os.makedirs(chemin, exist_ok=True)
+            logger.info(f"Profil Chrome persistant: {chemin}")
+            return ProfilReserve(chemin, verrou)
+        logger.warning(f"Tous les profils de l'utilisateur {self.user_id} sont utilisés, profil temporaire.")
+        return None
+
+    def nettoyer(self, taille_max_mo=None):
+        """Supprime les profils non réservés les moins récemment utilisés au-delà du plafond."""
+        if taille_max_mo is None:
+            taille_max_mo = int(os.getenv('CHROME_PROFILES_MAX_MB', TAILLE_MAX_DEFAUT_MO))
+        if not os.path.isdir(self.racine):
+            return 0
+        profils = []
+        for nom in os.listdir(self.racine):
+            chemin = os.path.join(self.racine, nom)
+            if os.path.isdir(chemin):
+                profils.append((os.path.getmtime(chemin), chemin, _taille_dossier(chemin)))
+        total = sum(taille for _, _, taille in profils)
+        plafond = taille_max_mo * 1024 * 1024
+        supprimes = 0
+        for _, chemin, taille in sorted(profils):
+            if total <= plafond:
+                break
+            with open(f"{chemin}.lock", 'w') as verrou:
+                try:
+                    fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                shutil.rmtree(chemin, ignore_errors=True)
+            total -= taille
+            supprimes += 1
+            logger.info(f"Profil Chrome supprimé (plafond de {taille_max_mo} Mo): {chemin}")
+        return supprimes
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Enregistrement et rejeu hors ligne des pages visitées par le scraper iQuesta.
+
+- Mode enregistrement : le driver est enveloppé par un EventFiringWebDriver qui
+  sauvegarde le HTML de chaque page visitée (navigation ou clic) dans un dossier
+  de fixtures.
+- Mode rejeu : un serveur HTTP local sert ces fixtures à un Chrome headless dont
+  toute résolution DNS externe est coupée, pour chronométrer le pipeline complet
+  de manière répétable et sans réseau.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, urlunsplit
+from selenium.webdriver.support.event_firing_webdriver import EventFiringWebDriver
+from selenium.webdriver.support.abstract_event_listener import AbstractEventListener
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+URL_SITE = "https://www.iquesta.com/"
+
+# Arguments Chrome du mode rejeu : headless et aucun accès réseau hors serveur local
+ARGUMENTS_CHROME_REJEU = [
+    '--headless=new',
+    '--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE 127.0.0.1',
+]
+
+# Page retournée pour une soumission de formulaire absente des fixtures
+PAGE_SOUMISSION_REJEU = (
+    "<html><head><title>Candidature envoyée</title></head><body>"
+    "<div class='alert alert-success'>Votre candidature a bien été envoyée.</div>"
+    "</body></html>"
+)
+
+
+def normaliser_url(url):
+    """Retire le fragment de l'URL (il n'est jamais envoyé au serveur)."""
+    parties = urlsplit(url)
+    return urlunsplit((parties.scheme, parties.netloc, parties.path or '/', parties.query, ''))
+
+
+def cle_fixture(url):
+    """Nom de fichier (sans extension) d'une fixture pour une URL donnée."""
+    return hashlib.sha1(normaliser_url(url).encode('utf-8')).hexdigest()
+
+
+class EcouteurEnregistrement(AbstractEventListener):
+    """Sauvegarde le HTML de chaque nouvelle page visitée dans le dossier de fixtures."""
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+
+    def _sauvegarder(self, driver, seulement_si_nouvelle=False):
+        try:
+            url = driver.current_url
+            if not url.startswith('http'):
+                return
+            cle = cle_fixture(url)
+            chemin_html = os.path.join(self.dossier, f"{cle}.html")
+            if seulement_si_nouvelle and os.path.exists(chemin_html):
+                return
+            with open(chemin_html, 'w', encoding='utf-8') as f:
+                f.write(driver.page_source)
+            with open(os.path.join(self.dossier, f"{cle}.json"), 'w', encoding='utf-8') as f:
+                json.dump({'url': normaliser_url(url)}, f)
+            logger.debug(f"Fixture enregistrée: {url}")
+        except Exception as e:
+            logger.warning(f"Impossible d'enregistrer la page courante: {e}")
+
+    def after_navigate_to(self, url, driver):
+        self._sauvegarder(driver)
+
+    def after_click(self, element, driver):
+        # Un clic peut changer de page (recherche, soumission) : on ne garde
+        # que la première version d'une URL pour ne pas écraser la page d'origine
+        self._sauvegarder(driver, seulement_si_nouvelle=True)
+
+    def after_execute_script(self, script, driver):
+        self._sauvegarder(driver, seulement_si_nouvelle=True)
+
+
+class FabriqueEnregistreuse:
+    """
+    Fabrique de driver qui enveloppe chaque nouveau driver pour enregistrer les pages.
+    Classe (et non fermeture) pour rester sérialisable vers les processus travailleurs.
+    """
+
+    def __init__(self, fabrique, dossier):
+        self.fabrique = fabrique
+        self.dossier = dossier
+
+    def __call__(self):
+        driver = self.fabrique()
+        if not driver:
+            return None
+        logger.info(f"Mode enregistrement : pages sauvegardées dans {self.dossier}")
+        return EventFiringWebDriver(driver, EcouteurEnregistrement(self.dossier))
+
+
+def charger_fixtures(dossier):
+    """
+    Charge l'index des fixtures d'un dossier.
+
+    Returns:
+        dict: {chemin?requête: chemin du fichier HTML}, relatif au site enregistré
+    """
+    index = {}
+    for nom in os.listdir(dossier):
+        if not nom.endswith('.json'):
+            continue
+        with open(os.path.join(dossier, nom), encoding='utf-8') as f:
+            url = json.load(f)['url']
+        parties = urlsplit(url)
+        cle = parties.path + (f"?{parties.query}" if parties.query else '')
+        index[cle] = os.path.join(dossier, nom[:-len('.json')] + '.html')
+    return index
+
+
+class ServeurRejeu:
+    """
+    Serveur HTTP local servant les fixtures enregistrées.
+
+    Args:
+        dossier: Dossier des fixtures produit par le mode enregistrement
+        port: Port d'écoute (0 = port libre choisi par le système)
+    """
+
+    def __init__(self, dossier, port=0):
+        self.index = charger_fixtures(dossier)
+        # Repli sur le chemin seul quand la requête exacte n'a pas été enregistrée
+        self.index_chemins = {}
+        for cle, chemin in self.index.items():
+            self.index_chemins.setdefault(cle.split('?', 1)[0], chemin)
+        self._serveur = ThreadingHTTPServer(('127.0.0.1', port), self._gestionnaire())
+        self._thread = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self._serveur.server_address[1]}/"
+
+    def _trouver(self, chemin_requete):
+        return self.index.get(chemin_requete) or self.index_chemins.get(chemin_requete.split('?', 1)[0])
+
+    def _gestionnaire(self):
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def _repondre(self, code, contenu):
+                corps = contenu.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def _page(self, chemin):
+                with open(chemin, encoding='utf-8') as f:
+                    # Les liens absolus vers le site pointent vers le serveur local
+                    return f.read().replace(URL_SITE, serveur.url_base)
+
+            def do_GET(self):
+                chemin = serveur._trouver(self.path)
+                if chemin:
+                    self._repondre(200, self._page(chemin))
+                else:
+                    logger.warning(f"[rejeu] Aucune fixture pour {self.path}")
+                    self._repondre(404, "<html><body><h1>Page non enregistrée</h1></body></html>")
+
+            def do_POST(self):
+                longueur = int(self.headers.get('Content-Length', 0))
+                self.rfile.read(longueur)
+                chemin = serveur._trouver(self.path)
+                self._repondre(200, self._page(chemin) if chemin else PAGE_SOUMISSION_REJEU)
+
+            def log_message(self, format, *args):
+                logger.debug(f"[rejeu] {format % args}")
+
+        return Gestionnaire
+
+    def demarrer(self):
+        """Démarre le serveur dans un thread et retourne l'URL de base locale."""
+        self._thread = threading.Thread(target=self._serveur.serve_forever, name="serveur-rejeu", daemon=True)
+        self._thread.start()
+        logger.info(f"Serveur de rejeu démarré sur {self.url_base} ({len(self.index)} pages)")
+        return self.url_base
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
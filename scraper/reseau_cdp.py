@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Réseau du navigateur via le Chrome DevTools Protocol.
+
+- Blocage d'URL (Network.setBlockedURLs) : statistiques, publicités, gestionnaire
+  de consentement et polices, inutiles au scraper.
+- Journal « performance » de chromedriver (options --network-report et
+  --network-timings seulement) : les événements Network.* sont relus après
+  chaque page par collecter(driver, etape) et distribués aux abonnés.
+- Chronologie réseau (option --network-timings) : TTFB, octets transférés et
+  requêtes les plus lentes de chaque navigation, écrits en JSONL.
+
+Les compteurs sont tenus par processus ; bilan() les résume pour la session.
+"""
+
+import os
+import json
+import logging
+import functools
+import threading
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Motifs bloqués par défaut (syntaxe Network.setBlockedURLs : '*' joker)
+MOTIFS_BLOCAGE_DEFAUT = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*googleadservices.com*',
+    '*connect.facebook.net*',
+    '*hotjar.com*',
+    '*sdk.privacy-center.org*',
+    '*didomi.io*',
+    '*fonts.googleapis.com*',
+    '*fonts.gstatic.com*',
+    '*.woff2*',
+    '*.woff*',
+    '*.ttf*',
+]
+
+# Taille moyenne supposée d'une ressource évitée, par type CDP (octets) : les
+# requêtes bloquées n'ont pas de taille réelle, le total n'est qu'une estimation
+TAILLE_ESTIMEE_PAR_TYPE = {
+    'Document': 30000,
+    'Script': 60000,
+    'Stylesheet': 20000,
+    'Image': 40000,
+    'Font': 35000,
+    'Media': 200000,
+    'XHR': 5000,
+    'Fetch': 5000,
+    'Other': 10000,
+}
+
+_abonnes = []
+
+
+def motifs_blocage():
+    """Motifs de BLOCKLIST (séparés par des virgules), de BLOCKLIST_FILE (un par ligne) ou par défaut."""
+    if os.getenv('BLOCKLIST'):
+        return [motif.strip() for motif in os.getenv('BLOCKLIST').split(',') if motif.strip()]
+    fichier = os.getenv('BLOCKLIST_FILE')
+    if fichier:
+        try:
+            with open(fichier, encoding='utf-8') as f:
+                return [ligne.strip() for ligne in f if ligne.strip() and not ligne.startswith('#')]
+        except OSError as e:
+            logger.warning(f"Liste de blocage {fichier} illisible ({e}), motifs par défaut utilisés.")
+    return list(MOTIFS_BLOCAGE_DEFAUT)
+
+
+def activer_journal_performance(options):
+    """Active le journal « performance » (événements réseau CDP) sur les options Chrome."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def activer_blocage(driver, motifs):
+    """Bloque les requêtes dont l'URL correspond à l'un des motifs."""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': motifs})
+    logger.info(f"Blocage réseau actif ({len(motifs)} motifs).")
+
+
+def abonner(abonne):
+    """Enregistre abonne(evenements, etape), appelé avec la liste des (methode, params) Network.* collectés."""
+    _abonnes.append(abonne)
+    return abonne
+
+
+def collecte_active():
+    """Vrai si le journal réseau est relu après chaque page (--network-report ou --network-timings)."""
+    _activer_chronologie_env()
+    return _chronologie is not None or os.getenv('NETWORK_REPORT', '').lower() in ('1', 'true', 'oui')
+
+
+def collecter(driver, etape=None):
+    """Relit le journal « performance » du driver et le distribue aux abonnés (si la collecte est active)."""
+    if not collecte_active():
+        return
+    try:
+        entrees = driver.get_log('performance')
+    except Exception:
+        # Journal non activé sur ce driver (profil complet, navigateur du service...)
+        return
+    evenements = []
+    for entree in entrees:
+        message = json.loads(entree['message'])['message']
+        if message['method'].startswith('Network.'):
+            evenements.append((message['method'], message['params']))
+    if evenements:
+        for abonne in _abonnes:
+            abonne(evenements, etape)
+
+
+def collecter_apres(etape):
+    """Décorateur : collecte le journal réseau du driver (premier argument) après l'appel."""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(driver, *args, **kwargs):
+            try:
+                return fonction(driver, *args, **kwargs)
+            finally:
+                collecter(driver, etape)
+        return enveloppe
+    return decorateur
+
+
+class BilanBlocage:
+    """Compte les requêtes bloquées et estime les octets évités, par type de ressource."""
+
+    def __init__(self):
+        self.par_type = {}
+        self._verrou = threading.Lock()
+
+    def __call__(self, evenements, etape):
+        with self._verrou:
+            for methode, params in evenements:
+                if methode == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+                    type_ressource = params.get('type', 'Other')
+                    self.par_type[type_ressource] = self.par_type.get(type_ressource, 0) + 1
+
+    def reinitialiser(self):
+        """Remet les compteurs à zéro (nouvelle session dans un processus réutilisé)."""
+        with self._verrou:
+            self.par_type.clear()
+
+    def bilan(self):
+        with self._verrou:
+            par_type = dict(self.par_type)
+        return {
+            'requetes_bloquees': sum(par_type.values()),
+            'octets_evites_estimes': sum(TAILLE_ESTIMEE_PAR_TYPE.get(t, TAILLE_ESTIMEE_PAR_TYPE['Other']) * n
+                                         for t, n in par_type.items()),
+            'par_type': par_type,
+        }
+
+
+blocage = abonner(BilanBlocage())
+
+
+class ChronologieReseau:
+    """
+    Regroupe les événements par navigation (loaderId) et écrit une ligne JSON
+    par page : TTFB du document, nombre de requêtes, octets transférés, durée
+    et requêtes les plus lentes.
+
+    Args:
+        chemin: Fichier JSONL de sortie (ajout)
+        nb_lentes: Nombre de requêtes lentes conservées par page
+    """
+
+    def __init__(self, chemin, nb_lentes=5):
+        self.chemin = chemin
+        self.nb_lentes = nb_lentes
+        self._verrou = threading.Lock()
+
+    def __call__(self, evenements, etape):
+        requetes = {}
+        for methode, params in evenements:
+            requete = requetes.setdefault(params.get('requestId'), {})
+            if methode == 'Network.requestWillBeSent':
+                requete.update(loader=params.get('loaderId'), url=params['request']['url'],
+                               type=params.get('type', 'Other'), debut=params.get('timestamp'),
+                               document=params.get('documentURL'))
+            elif methode == 'Network.responseReceived':
+                reponse = params.get('response', {})
+                requete.update(statut=reponse.get('status'), timing=reponse.get('timing'),
+                               type=params.get('type', requete.get('type')))
+            elif methode == 'Network.loadingFinished':
+                requete.update(fin=params.get('timestamp'), octets=params.get('encodedDataLength', 0))
+            elif methode == 'Network.loadingFailed':
+                requete.update(fin=params.get('timestamp'), echec=params.get('blockedReason') or params.get('errorText'))
+
+        navigations = {}
+        for requete in requetes.values():
+            if requete.get('loader') and requete.get('debut') is not None:
+                navigations.setdefault(requete['loader'], []).append(requete)
+        lignes = [self._resumer(etape, liste) for liste in navigations.values()]
+        if lignes:
+            with self._verrou, open(self.chemin, 'a', encoding='utf-8') as f:
+                for ligne in lignes:
+                    f.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+
+    def _resumer(self, etape, requetes):
+        document = next((r for r in requetes if r.get('type') == 'Document'), requetes[0])
+        timing = document.get('timing') or {}
+        ttfb = None
+        if 'receiveHeadersEnd' in timing and 'sendEnd' in timing:
+            ttfb = round(timing['receiveHeadersEnd'] - timing['sendEnd'], 1)
+        debut = min(r['debut'] for r in requetes)
+        fin = max(r.get('fin') or r['debut'] for r in requetes)
+        durees = sorted(
+            ({'url': r['url'][:200], 'type': r.get('type'), 'duree_ms': round((r['fin'] - r['debut']) * 1000, 1),
+              'octets': r.get('octets', 0), 'statut': r.get('statut'), 'echec': r.get('echec')}
+             for r in requetes if r.get('fin') is not None),
+            key=lambda r: -r['duree_ms'])
+        return {
+            'etape': etape,
+            'page': document.get('document') or document.get('url'),
+            'statut': document.get('statut'),
+            'ttfb_ms': ttfb,
+            'duree_ms': round((fin - debut) * 1000, 1),
+            'requetes': len(requetes),
+            'octets': sum(r.get('octets', 0) for r in requetes),
+            'plus_lentes': durees[:self.nb_lentes],
+        }
+
+
+_chronologie = None
+
+
+def activer_chronologie(chemin):
+    """Écrit la chronologie réseau de chaque page dans chemin (JSONL)."""
+    global _chronologie
+    if _chronologie is None or _chronologie.chemin != chemin:
+        os.makedirs(os.path.dirname(chemin) or '.', exist_ok=True)
+        # Les processus travailleurs retrouvent le fichier via l'environnement
+        os.environ['NETWORK_TIMINGS_FILE'] = chemin
+        if _chronologie is None:
+            _chronologie = abonner(ChronologieReseau(chemin))
+        else:
+            # Nouvelle session dans un processus réutilisé (démon)
+            _chronologie.chemin = chemin
+        logger.info(f"Chronologie réseau écrite dans {chemin}")
+    return _chronologie
+
+
+def desactiver_chronologie():
+    """Arrête l'écriture de la chronologie réseau (fin de session d'un processus réutilisé)."""
+    global _chronologie
+    if _chronologie is not None:
+        _abonnes.remove(_chronologie)
+        _chronologie = None
+
+
+def _activer_chronologie_env():
+    if _chronologie is None and os.getenv('NETWORK_TIMINGS_FILE'):
+        activer_chronologie(os.getenv('NETWORK_TIMINGS_FILE'))
+
+
+def bilan():
+    """Résumé réseau de la session pour ce processus."""
+    return blocage.bilan()
+
+
+def fusionner_bilans(bilans):
+    """Additionne des résumés réseau (processus travailleurs)."""
+    total = {'requetes_bloquees': 0, 'octets_evites_estimes': 0, 'par_type': {}}
+    for partiel in bilans:
+        total['requetes_bloquees'] += partiel.get('requetes_bloquees', 0)
+        total['octets_evites_estimes'] += partiel.get('octets_evites_estimes', 0)
+        for type_ressource, nombre in partiel.get('par_type', {}).items():
+            total['par_type'][type_ressource] = total['par_type'].get(type_ressource, 0) + nombre
+    return total
@@ -17,52 +17,58 @@ from selenium.common.exceptions import (
 )
 
 # Import des fonctions utilitaires
-from search_utils import try_select_region, click_search_button, extraire_offres
+from search_utils import try_select_region, click_search_button, extraire_offres, normaliser_libelle
+from metriques import mesurer_duree, repli_selecteur
+from reseau_cdp import collecter_apres
+from delais_adaptatifs import attendre
+from disjoncteur import surveiller
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
 # Variables et constantes
-URL_ACCUEIL = "https://www.iquesta.com/"
+URL_ACCUEIL = os.getenv('IQUESTA_URL', "https://www.iquesta.com/")
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+@collecter_apres('recherche')
+@mesurer_duree('rechercher_offres')
+@surveiller('recherche')
 def rechercher_offres(driver, metier=None, region_text=None):
     """Effectue une recherche d'offres sur iQuesta."""
     try:
         logger.info("========== ÉTAPE : RECHERCHE D'OFFRES ==========")
-        logger.info(f"URL actuelle: {driver.current_url}")
-        logger.info(f"Titre de la page: {driver.title}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"URL actuelle: {driver.current_url} | Titre de la page: {driver.title}")
         logger.info(f"Métier recherché: {metier}, Région: {region_text}")
         
         # Attendre un peu pour que la page se charge complètement
         time.sleep(3)
         
-        # Capturer une partie du HTML pour le debugging
-        logger.info("Aperçu du HTML de la page:")
-        html_source = driver.page_source
-        html_preview = html_source[:200] if len(html_source) > 200 else html_source
-        logger.info(f"{html_preview}...")
+        # Aperçu du HTML et des formulaires pour le débogage (allers-retours WebDriver évités hors DEBUG)
+        if logger.isEnabledFor(logging.DEBUG):
+            html_source = driver.page_source
+            html_preview = html_source[:200] if len(html_source) > 200 else html_source
+            logger.debug(f"Aperçu du HTML de la page: {html_preview}...")
+            try:
+                forms = driver.find_elements(By.TAG_NAME, "form")
+                logger.debug(f"Nombre de formulaires détectés sur la page: {len(forms)}")
+                for i, form in enumerate(forms):
+                    action = form.get_attribute('action') or 'pas d\'action'
+                    form_id = form.get_attribute('id') or 'pas d\'id'
+                    form_class = form.get_attribute('class') or 'pas de classe'
+                    logger.debug(f"Formulaire {i+1}: action={action}, id={form_id}, class={form_class}")
+                    inputs = form.find_elements(By.TAG_NAME, "input")
+                    selects = form.find_elements(By.TAG_NAME, "select")
+                    logger.debug(f"  - Champs: {len(inputs)} inputs, {len(selects)} selects")
+            except Exception as e:
+                logger.debug(f"Erreur lors de l'analyse des formulaires: {e}")
         
-        # Capture la liste de tous les formulaires sur la page
+        # Attendre que le champ de recherche soit chargé (délai appris, 30 secondes au départ)
         try:
-            forms = driver.find_elements(By.TAG_NAME, "form")
-            logger.info(f"Nombre de formulaires détectés sur la page: {len(forms)}")
-            for i, form in enumerate(forms):
-                action = form.get_attribute('action') or 'pas d\'action'
-                form_id = form.get_attribute('id') or 'pas d\'id'
-                form_class = form.get_attribute('class') or 'pas de classe'
-                logger.info(f"Formulaire {i+1}: action={action}, id={form_id}, class={form_class}")
-                
-                # Afficher les champs du formulaire
-                inputs = form.find_elements(By.TAG_NAME, "input")
-                selects = form.find_elements(By.TAG_NAME, "select")
-                logger.info(f"  - Champs: {len(inputs)} inputs, {len(selects)} selects")
-        except Exception as e:
-            logger.error(f"Erreur lors de l'analyse des formulaires: {e}")
-            # Continuer même en cas d'erreur
-        
-        # Attente plus longue pour s'assurer que la page se charge complètement
-        wait = WebDriverWait(driver, 30)  # Augmenté à 30 secondes
+            attendre(driver, "champ_recherche",
+                     EC.presence_of_element_located((By.CSS_SELECTOR, "#controlTerm, input[name='term']")), 30)
+        except TimeoutException:
+            logger.warning("Champ de recherche principal non chargé dans le délai, essai des autres sélecteurs.")
         
         # Essayer de trouver et remplir le champ de recherche métier/mot-clé
         try:
@@ -80,21 +86,21 @@ def rechercher_offres(driver, metier=None, region_text=None):
                 try:
                     champs = driver.find_elements(By.CSS_SELECTOR, selector)
                     if champs:
-                        logger.info(f"Trouvé {len(champs)} champs avec le sélecteur '{selector}'")
+                        logger.debug(f"Trouvé {len(champs)} champs avec le sélecteur '{selector}'")
                         for idx, champ in enumerate(champs):
                             placeholder = champ.get_attribute('placeholder') or 'sans placeholder'
                             name = champ.get_attribute('name') or 'sans nom'
-                            logger.info(f"  - Champ {idx+1}: placeholder='{placeholder}', name='{name}'")
+                            logger.debug(f"  - Champ {idx+1}: placeholder='{placeholder}', name='{name}'")
                             
                             # Sélectionner uniquement le champ de recherche avec le bon placeholder ou le bon nom
                             if (placeholder and 'cherchez-vous' in placeholder.lower()) or (name == 'term'):
                                 champ_metier = champ
-                                logger.info(f"    ✓ Champ de recherche sélectionné: placeholder='{placeholder}', name='{name}'")
+                                logger.debug(f"    ✓ Champ de recherche sélectionné: placeholder='{placeholder}', name='{name}'")
                                 break
                         if champ_metier:
                             break
                     else:
-                        logger.info(f"Aucun champ trouvé avec le sélecteur '{selector}'")
+                        logger.debug(f"Aucun champ trouvé avec le sélecteur '{selector}'")
                 except Exception as e:
                     logger.error(f"Erreur avec le sélecteur '{selector}': {e}")
             
@@ -103,6 +109,7 @@ def rechercher_offres(driver, metier=None, region_text=None):
                 
                 # Tentative alternative avec JavaScript
                 logger.warning("Aucun des sélecteurs n'a fonctionné pour le champ de recherche. Tentative via JS.")
+                repli_selecteur('rechercher_offres', 'champ_recherche_js')
                 search_input_js = "document.querySelector('input[name=\"term\"]').value = arguments[0];"
                 driver.execute_script(search_input_js, metier)
                 
@@ -120,7 +127,7 @@ def rechercher_offres(driver, metier=None, region_text=None):
                 logger.info(f"Champ métier rempli avec: '{metier}'")
                 
                 # Pause explicite après remplissage du champ métier
-                logger.info("Pause de 4 secondes après remplissage du champ métier")
+                logger.debug("Pause de 4 secondes après remplissage du champ métier")
                 time.sleep(4)
                 
                 
@@ -131,6 +138,7 @@ def rechercher_offres(driver, metier=None, region_text=None):
                     if not region_selected:
                         logger.error(f"ERREUR : La région '{region_text}' n'a pas été sélectionnée. Tentative alternative.")
                         # Deuxième tentative directe sur toute la page
+                        repli_selecteur('rechercher_offres', 'region_globale')
                         try:
                             logger.info("Tentative de trouver un champ région dans toute la page...")
                             all_selects = driver.find_elements(By.TAG_NAME, "select")
@@ -142,12 +150,12 @@ def rechercher_offres(driver, metier=None, region_text=None):
                                     options_text = [opt.text.strip() for opt in options]
                                     
                                     # Vérifier si ce select contient des options qui ressemblent à des régions
-                                    logger.info(f"Options trouvées: {options_text}")
+                                    logger.debug(f"Options trouvées: {options_text}")
                                     
-                                    # Si ce select contient l'option Île-de-France, la sélectionner
+                                    # Si ce select contient l'option de la région, la sélectionner
+                                    cible = normaliser_libelle(region_text)
                                     for i, opt_text in enumerate(options_text):
-                                        if ("ile" in opt_text.lower() and "france" in opt_text.lower()) or \
-                                           ("île" in opt_text.lower() and "france" in opt_text.lower()):
+                                        if cible and cible in normaliser_libelle(opt_text):
                                             select.select_by_index(i)
                                             logger.info(f"Région '{opt_text}' sélectionnée via recherche globale")
                                             region_found = True
@@ -197,6 +205,7 @@ def rechercher_offres(driver, metier=None, region_text=None):
             
             # Plan B: Utiliser la recherche directe par URL
             logger.info("Tentative de recherche par URL directe")
+            repli_selecteur('rechercher_offres', 'url_directe')
             query_metier = metier.replace(' ', '+') if metier else ''
             query_region = region_text.replace(' ', '+') if region_text else ''
             direct_url = f"{URL_ACCUEIL}jobs?search_term={query_metier}&regions={query_region}"
@@ -247,7 +256,7 @@ def affiner_recherche_par_contrat(driver, contract_type):
                 elements = driver.find_elements(By.CSS_SELECTOR, selector)
                 if elements:
                     filter_container = elements[0]
-                    logger.info(f"Conteneur de filtres trouvé avec le sélecteur: '{selector}'")
+                    logger.debug(f"Conteneur de filtres trouvé avec le sélecteur: '{selector}'")
                     break
             except Exception as e:
                 logger.debug(f"Erreur avec le sélecteur '{selector}': {e}")
@@ -260,13 +269,13 @@ def affiner_recherche_par_contrat(driver, contract_type):
         checkboxes = filter_container.find_elements(By.CSS_SELECTOR, "input[type='checkbox']")
         labels = filter_container.find_elements(By.TAG_NAME, "label")
         
-        logger.info(f"Nombre de checkboxes: {len(checkboxes)}, nombre de labels: {len(labels)}")
+        logger.debug(f"Nombre de checkboxes: {len(checkboxes)}, nombre de labels: {len(labels)}")
         
         # Chercher le bon label
         clicked = False
         for label in labels:
             if label.text and target_option_text.lower() in label.text.lower():
-                logger.info(f"Label trouvé: '{label.text}'")
+                logger.debug(f"Label trouvé: '{label.text}'")
                 try:
                     label.click()
                     clicked = True
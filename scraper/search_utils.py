@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import time
 import logging
+import unicodedata
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -16,12 +18,45 @@ from selenium.common.exceptions import (
     StaleElementReferenceException
 )
 
+from delais_adaptatifs import attendre
+
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
 # Variables et constantes
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Valeur historique (Ile de France) retenue quand aucune option ne correspond à la région demandée
+VALEUR_REGION_DEFAUT = "10"
+
+def normaliser_libelle(texte):
+    """Minuscules, sans accents ni ponctuation : 'Île-de-France' devient 'ile de france'."""
+    texte = unicodedata.normalize('NFKD', (texte or '').lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', texte))
+
+def valeur_option_region(select_obj, region_target):
+    """
+    Valeur de l'option de région correspondant à region_target.
+
+    La correspondance se fait sur la valeur, puis sur le libellé normalisé
+    (égalité, puis inclusion dans un sens ou dans l'autre).
+
+    Returns:
+        str: Valeur de l'option, ou VALEUR_REGION_DEFAUT si aucune ne correspond
+    """
+    cible = normaliser_libelle(region_target)
+    options = [(opt.get_attribute('value'), normaliser_libelle(opt.text)) for opt in select_obj.options]
+    options = [(valeur, libelle) for valeur, libelle in options if valeur]
+    for valeur, libelle in options:
+        if valeur == str(region_target).strip() or libelle == cible:
+            return valeur
+    for valeur, libelle in options:
+        if cible and libelle and (cible in libelle or libelle in cible):
+            return valeur
+    logger.warning(f"Aucune option ne correspond à la région '{region_target}', valeur par défaut {VALEUR_REGION_DEFAUT}.")
+    return VALEUR_REGION_DEFAUT
+
 def try_select_region(driver, region_target):
     """
     Tente de sélectionner la région spécifiée dans la liste déroulante.
@@ -34,7 +69,7 @@ def try_select_region(driver, region_target):
     logger.info(f"🌍 Tentative de sélection de la région: {region_target}")
     
     # Attendre que tous les éléments de la page soient bien chargés
-    logger.info("Attente pour chargement complet de la page")
+    logger.debug("Attente pour chargement complet de la page")
     time.sleep(5)  # Augmenté à 5 secondes
     
     # ÉTAPE 1: Vérifier si nous sommes sur la page de résultats avec le formulaire #offerFormSearch
@@ -47,27 +82,27 @@ def try_select_region(driver, region_target):
             
             # Tenter de trouver le sélecteur de région dans ce formulaire
             try:
-                select_region_target = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "#offerFormSearch #selectRegion"))
-                )
+                select_region_target = attendre(
+                    driver, "region", EC.presence_of_element_located((By.CSS_SELECTOR, "#offerFormSearch #selectRegion")), 5)
                 
                 # Cliquer pour ouvrir la liste déroulante
-                logger.info("Clic sur le select du formulaire de résultats")
+                logger.debug("Clic sur le select du formulaire de résultats")
                 select_region_target.click()
                 time.sleep(2)
                 
-                # Sélectionner Ile de France par sa value=10
+                # Sélectionner l'option dont le libellé correspond à la région
                 select_obj = Select(select_region_target)
                 try:
-                    select_obj.select_by_value("10")
+                    valeur = valeur_option_region(select_obj, region_target)
+                    select_obj.select_by_value(valeur)
                     time.sleep(1)
                     
                     # Vérification
                     selected_option = select_obj.first_selected_option
                     logger.info(f"Option sélectionnée dans le formulaire de résultats: '{selected_option.text}' (value='{selected_option.get_attribute('value')}')")
                     
-                    if selected_option.get_attribute('value') == "10":
-                        logger.info("✓ Région 'Ile de France' sélectionnée avec succès dans le formulaire de résultats")
+                    if selected_option.get_attribute('value') == valeur:
+                        logger.info(f"✓ Région '{selected_option.text}' sélectionnée avec succès dans le formulaire de résultats")
                         return True
                     
                     # Si la sélection n'a pas fonctionné, essayer par JavaScript
@@ -75,15 +110,15 @@ def try_select_region(driver, region_target):
                     driver.execute_script("""
                         var select = document.querySelector('#offerFormSearch #selectRegion');
                         if (select) {
-                            select.value = '10';
+                            select.value = arguments[0];
                             select.dispatchEvent(new Event('change', { bubbles: true }));
                         }
-                    """)
+                    """, valeur)
                     time.sleep(1)
                     
                     # Vérifier à nouveau
                     selected_option = select_obj.first_selected_option
-                    if selected_option.get_attribute('value') == "10":
+                    if selected_option.get_attribute('value') == valeur:
                         logger.info("✓ Région sélectionnée via JavaScript dans le formulaire de résultats")
                         return True
                         
@@ -108,24 +143,25 @@ def try_select_region(driver, region_target):
             logger.info("✓ Trouvé <select id='selectRegion'>")
             
             # Cliquer sur le select pour ouvrir la liste déroulante
-            logger.info("Clic sur le select pour ouvrir la liste")
+            logger.debug("Clic sur le select pour ouvrir la liste")
             select_region_target.click()
             time.sleep(2)
             
-            # Créer un objet Select et tenter de sélectionner 'Ile de France' par value
-            logger.info("Tentative de sélection par value='10' (Ile de France)")
+            # Créer un objet Select et sélectionner l'option correspondant à la région
             select_obj = Select(select_region_target)
             
             try:
-                select_obj.select_by_value("10")  # 10 = Ile de France
+                valeur = valeur_option_region(select_obj, region_target)
+                logger.debug(f"Tentative de sélection par value='{valeur}'")
+                select_obj.select_by_value(valeur)
                 time.sleep(1)
                 
                 # Vérification
                 selected_option = select_obj.first_selected_option
                 logger.info(f"Option sélectionnée: '{selected_option.text}' (value='{selected_option.get_attribute('value')}')")
                 
-                if selected_option.get_attribute('value') == "10":
-                    logger.info("✓ Région 'Ile de France' sélectionnée avec succès")
+                if selected_option.get_attribute('value') == valeur:
+                    logger.info(f"✓ Région '{selected_option.text}' sélectionnée avec succès")
                     return True
                 
                 # Si la sélection n'a pas fonctionné, essayer par JavaScript
@@ -133,15 +169,15 @@ def try_select_region(driver, region_target):
                 driver.execute_script("""
                     var regionSelect = document.getElementById('selectRegion');
                     if (regionSelect) {
-                        regionSelect.value = '10';
+                        regionSelect.value = arguments[0];
                         regionSelect.dispatchEvent(new Event('change', { bubbles: true }));
                     }
-                """)
+                """, valeur)
                 time.sleep(1)
                 
                 # Vérifier à nouveau
                 selected_option = select_obj.first_selected_option
-                if selected_option.get_attribute('value') == "10":
+                if selected_option.get_attribute('value') == valeur:
                     logger.info("✓ Région sélectionnée via JavaScript")
                     return True
             except Exception as e:
@@ -150,7 +186,7 @@ def try_select_region(driver, region_target):
         logger.error(f"Erreur lors de l'accès au sélecteur principal: {e}")
     
     # Si toutes les méthodes ont échoué
-    logger.error("⛔ Impossible de sélectionner la région 'Ile de France'")
+    logger.error(f"⛔ Impossible de sélectionner la région '{region_target}'")
     return False
 
 def click_search_button(driver, form_element=None):
@@ -175,14 +211,14 @@ def click_search_button(driver, form_element=None):
                     buttons = driver.find_elements(By.CSS_SELECTOR, selector)
                     
                 if buttons:
-                    logger.info(f"Trouvé {len(buttons)} boutons avec le sélecteur '{selector}'")
+                    logger.debug(f"Trouvé {len(buttons)} boutons avec le sélecteur '{selector}'")
                     for idx, button in enumerate(buttons):
                         text = button.text.strip() if button.text else 'sans texte'
-                        logger.info(f"  - Bouton {idx+1}: texte='{text}'")
+                        logger.debug(f"  - Bouton {idx+1}: texte='{text}'")
                         
                         if not bouton_recherche:
                             bouton_recherche = button
-                            logger.info(f"    ✓ Premier bouton sélectionné: '{text}'")
+                            logger.debug(f"    ✓ Premier bouton sélectionné: '{text}'")
                     break
             except Exception as e:
                 logger.error(f"Erreur avec le sélecteur de bouton '{selector}': {e}")
@@ -191,12 +227,12 @@ def click_search_button(driver, form_element=None):
             try:
                 # Faire défiler jusqu'au bouton pour s'assurer qu'il est visible
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", bouton_recherche)
-                logger.info("Attente de 3 secondes après scroll vers le bouton")
+                logger.debug("Attente de 3 secondes après scroll vers le bouton")
                 time.sleep(3)
                 
                 # Cliquer sur le bouton
                 try:
-                    logger.info("Tentative de clic normal")
+                    logger.debug("Tentative de clic normal")
                     bouton_recherche.click()
                     logger.info("Bouton de recherche cliqué")
                     return True
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service de navigateurs Chrome maintenus à chaud.
+
+Le service lance une ou plusieurs instances Chrome avec le débogage distant
+activé et publie leurs ports dans un fichier d'état. Les sessions du scraper
+(option --browser-service) s'attachent à une instance libre au lieu de lancer
+Chrome, ce qui évite le démarrage à froid et conserve le cache HTTP.
+
+Chaque instance est réservée par un verrou fcntl sur un fichier dédié : le
+verrou est libéré à la fermeture du driver ou à la mort du processus client.
+Cookies et stockage du site sont effacés à la restitution de l'instance, pour
+qu'aucun état ne passe d'un utilisateur à l'autre. Si cet effacement échoue,
+l'instance n'est pas rendue : le client demande au service de la relancer, et
+le service efface cookies, stockage et saisies du profil à chaque lancement.
+
+Le service relance aussi une instance arrêtée ou qui ne répond plus à son
+point de débogage distant ; une instance qui ne répond pas au démarrage n'est
+pas publiée.
+
+Lancement du service :
+    python scraper/service_navigateurs.py --instances 2 --headless
+"""
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import signal
+import logging
+import argparse
+import subprocess
+import urllib.request
+from urllib.parse import urlsplit
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from cache_chromedriver import executable_chrome
+from journalisation import configurer_journalisation
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Fichier d'état du service (surchargé par BROWSER_SERVICE_STATE)
+CHEMIN_ETAT_DEFAUT = os.path.join(os.path.expanduser('~'), '.cache', 'iquesta', 'navigateurs.json')
+
+# Premier port de débogage distant attribué aux instances
+PORT_BASE_DEFAUT = 9300
+
+# Période de vérification des instances par le service (secondes)
+INTERVALLE_SURVEILLANCE = 5
+
+# Délai accordé à une instance pour répondre au démarrage (secondes)
+DELAI_DEMARRAGE = 10
+
+# Vérifications consécutives sans réponse avant de relancer une instance
+ECHECS_SANTE_MAX = 3
+
+# Éléments du profil (dossier Default) où le site laisse un état : effacés à
+# chaque lancement d'une instance, le cache HTTP est conservé
+ETAT_SITE_PROFIL = ('Cookies', 'Cookies-journal', 'Network', 'Local Storage', 'Session Storage', 'IndexedDB',
+                    'Service Worker', 'Web Data', 'Web Data-journal')
+
+ARGUMENTS_CHROME_SERVICE = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-gpu',
+]
+
+
+def chemin_etat():
+    return os.getenv('BROWSER_SERVICE_STATE', CHEMIN_ETAT_DEFAUT)
+
+
+def lire_etat(chemin=None):
+    """Instances publiées par le service ([] si le service ne tourne pas)."""
+    try:
+        with open(chemin or chemin_etat(), encoding='utf-8') as f:
+            return json.load(f).get('instances', [])
+    except (OSError, ValueError):
+        return []
+
+
+def _ecrire_etat(chemin, instances):
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump({'pid': os.getpid(), 'instances': instances}, f, indent=2)
+    os.replace(temporaire, chemin)
+
+
+def marqueur_relance(etat, port):
+    """Fichier déposé par un client pour demander la relance d'une instance qu'il n'a pas pu réinitialiser."""
+    return f"{etat}.{port}.relancer"
+
+
+def instance_repond(port, delai=2):
+    """Vérifie que le point de débogage distant de l'instance répond."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=delai) as reponse:
+            return reponse.status == 200
+    except OSError:
+        return False
+
+
+# --- Côté client : réservation d'une instance ---
+
+class NavigateurAttache(webdriver.Chrome):
+    """
+    Driver attaché à une instance du service.
+
+    quit() ne ferme pas Chrome : l'état du site est effacé, le chromedriver
+    local est arrêté et l'instance est rendue au service.
+    """
+
+    def __init__(self, port, verrou, chemin_driver, origines=()):
+        self.port = port
+        self._verrou = verrou
+        self._origines = origines
+        options = webdriver.ChromeOptions()
+        options.debugger_address = f"127.0.0.1:{port}"
+        super().__init__(service=Service(chemin_driver), options=options)
+
+    def reinitialiser(self):
+        """Ferme les onglets supplémentaires et efface cookies et stockage (le cache HTTP est conservé)."""
+        fenetres = self.window_handles
+        for fenetre in fenetres[1:]:
+            self.switch_to.window(fenetre)
+            self.close()
+        self.switch_to.window(fenetres[0])
+        self.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origine in self._origines:
+            self.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                'origin': origine,
+                'storageTypes': 'local_storage,session_storage,indexeddb,websql,service_workers,cache_storage',
+            })
+        self.get('about:blank')
+
+    def quit(self):
+        try:
+            self.reinitialiser()
+        except Exception as e:
+            # Les cookies de l'utilisateur sont peut-être encore là : l'instance est relancée, pas rendue telle quelle
+            logger.warning(f"Réinitialisation de l'instance {self.port} impossible, relance demandée au service: "
+                           f"{str(e)[:100]}")
+            open(marqueur_relance(chemin_etat(), self.port), 'w').close()
+        finally:
+            try:
+                # Arrête le chromedriver local sans fermer le navigateur du service
+                self.service.stop()
+            finally:
+                self._liberer()
+
+    def _liberer(self):
+        if self._verrou:
+            fcntl.flock(self._verrou, fcntl.LOCK_UN)
+            self._verrou.close()
+            self._verrou = None
+            logger.info(f"Instance {self.port} rendue au service.")
+
+
+def _origines_site():
+    url = urlsplit(os.getenv('IQUESTA_URL', "https://www.iquesta.com/"))
+    return (f"{url.scheme}://{url.netloc}",)
+
+
+def attacher_navigateur(chemin_driver):
+    """
+    Réserve une instance libre du service et s'y attache.
+
+    Returns:
+        NavigateurAttache, ou None si aucune instance n'est libre et joignable
+    """
+    etat = chemin_etat()
+    for instance in lire_etat(etat):
+        port = instance['port']
+        verrou = open(f"{etat}.{port}.lock", 'w')
+        try:
+            fcntl.flock(verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            verrou.close()
+            continue
+        if os.path.exists(marqueur_relance(etat, port)) or not instance_repond(port):
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+            verrou.close()
+            continue
+        try:
+            driver = NavigateurAttache(port, verrou, chemin_driver, _origines_site())
+        except Exception as e:
+            logger.warning(f"Attachement à l'instance {port} impossible: {str(e)[:100]}")
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+            verrou.close()
+            continue
+        logger.info(f"Navigateur du service réservé (port {port}).")
+        return driver
+    return None
+
+
+# --- Côté service : instances Chrome ---
+
+def _effacer_etat_site(profil):
+    """Supprime cookies, stockage et saisies du profil (instance arrêtée)."""
+    for nom in ETAT_SITE_PROFIL:
+        chemin = os.path.join(profil, 'Default', nom)
+        if os.path.isdir(chemin):
+            shutil.rmtree(chemin, ignore_errors=True)
+        elif os.path.exists(chemin):
+            os.remove(chemin)
+
+
+def _arreter(processus):
+    processus.terminate()
+    try:
+        processus.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        processus.kill()
+        processus.wait()
+
+
+def lancer_instance(indice, port, dossier_profils, arguments):
+    """
+    Lance une instance Chrome avec le débogage distant sur port.
+
+    Raises:
+        FileNotFoundError: Si l'exécutable Chrome est introuvable
+        RuntimeError: Si l'instance ne répond pas dans DELAI_DEMARRAGE secondes (elle est alors arrêtée)
+    """
+    executable = executable_chrome()
+    if not executable:
+        raise FileNotFoundError("Exécutable Chrome introuvable (définissez CHROME_BINARY).")
+    profil = os.path.join(dossier_profils, f"instance-{indice}")
+    # Aucun état d'un utilisateur précédent (instance tuée ou non réinitialisée)
+    _effacer_etat_site(profil)
+    commande = [executable, f'--remote-debugging-port={port}', f'--user-data-dir={profil}',
+                *ARGUMENTS_CHROME_SERVICE, *arguments, 'about:blank']
+    processus = subprocess.Popen(commande, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    echeance = time.monotonic() + DELAI_DEMARRAGE
+    while not instance_repond(port, delai=1):
+        if processus.poll() is not None or time.monotonic() > echeance:
+            _arreter(processus)
+            raise RuntimeError(f"Instance {indice} sans réponse sur le port {port} après {DELAI_DEMARRAGE}s")
+        time.sleep(0.2)
+    logger.info(f"Instance {indice} prête sur le port {port} (PID {processus.pid}).")
+    return processus, {'indice': indice, 'port': port, 'pid': processus.pid, 'profil': profil}
+
+
+def servir(nb_instances, port_base=PORT_BASE_DEFAUT, headless=False):
+    """Lance les instances, les relance si elles meurent ou ne répondent plus et publie l'état jusqu'à SIGTERM/SIGINT."""
+    etat = chemin_etat()
+    os.makedirs(os.path.dirname(etat) or '.', exist_ok=True)
+    dossier_profils = os.path.join(os.path.dirname(etat) or '.', 'profils-service')
+    arguments = ['--headless=new'] if headless else []
+
+    arret = []
+    def demander_arret(signum, frame):
+        arret.append(signum)
+    signal.signal(signal.SIGTERM, demander_arret)
+    signal.signal(signal.SIGINT, demander_arret)
+
+    processus = {}
+    instances = {}
+    echecs_sante = {}
+
+    def demarrer(indice):
+        port = port_base + indice
+        try:
+            processus[indice], instances[indice] = lancer_instance(indice, port, dossier_profils, arguments)
+        except RuntimeError as e:
+            # Non publiée : nouvel essai à la prochaine vérification
+            logger.error(str(e))
+            processus.pop(indice, None)
+            instances.pop(indice, None)
+        echecs_sante[indice] = 0
+        try:
+            os.remove(marqueur_relance(etat, port))
+        except OSError:
+            pass
+
+    def raison_relance(indice):
+        port = port_base + indice
+        if indice not in processus:
+            return "non démarrée"
+        if processus[indice].poll() is not None:
+            return f"arrêtée (code {processus[indice].returncode})"
+        if os.path.exists(marqueur_relance(etat, port)):
+            return "réinitialisation impossible côté client"
+        if instance_repond(port):
+            echecs_sante[indice] = 0
+            return None
+        echecs_sante[indice] += 1
+        if echecs_sante[indice] >= ECHECS_SANTE_MAX:
+            return f"sans réponse depuis {echecs_sante[indice]} vérifications"
+        return None
+
+    try:
+        for indice in range(nb_instances):
+            demarrer(indice)
+        _ecrire_etat(etat, list(instances.values()))
+        logger.info(f"Service de navigateurs actif ({len(instances)}/{nb_instances} instances, état: {etat}).")
+        while not arret:
+            time.sleep(INTERVALLE_SURVEILLANCE)
+            modifie = False
+            for indice in range(nb_instances):
+                raison = raison_relance(indice)
+                if not raison:
+                    continue
+                logger.warning(f"Instance {indice} {raison}, relance.")
+                if indice in processus:
+                    _arreter(processus.pop(indice))
+                    instances.pop(indice, None)
+                demarrer(indice)
+                modifie = True
+            if modifie:
+                _ecrire_etat(etat, list(instances.values()))
+    finally:
+        try:
+            os.remove(etat)
+        except OSError:
+            pass
+        for p in processus.values():
+            p.terminate()
+        for p in processus.values():
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        logger.info("Service de navigateurs arrêté.")
+
+
+if __name__ == "__main__":
+    configurer_journalisation()
+    parser = argparse.ArgumentParser(description="Maintient des instances Chrome à chaud pour le scraper iQuesta.")
+    parser.add_argument('--instances', type=int, default=1, help="Nombre d'instances Chrome.")
+    parser.add_argument('--port-base', type=int, default=PORT_BASE_DEFAUT, help="Port de débogage de la première instance.")
+    parser.add_argument('--headless', action='store_true', help="Instances sans interface graphique.")
+    args = parser.parse_args()
+    servir(args.instances, args.port_base, args.headless)
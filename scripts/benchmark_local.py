@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du scraper contre un faux iQuesta local.
+
+Lance le serveur local (latence et échecs configurables), crée une base et un
+utilisateur temporaires, exécute main() du scraper puis affiche le débit
+(offres/minute), le temps par étape et le taux de succès.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+# Ajout des chemins du projet pour les imports locaux
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'scraper'))
+
+from database.user_database import UserDatabase
+from faux_iquesta import FauxIquesta
+
+EMAIL_BENCHMARK = "benchmark@iquesta.local"
+
+
+def preparer_base(dossier):
+    """Crée une base temporaire avec un utilisateur et un CV factice."""
+    cv_path = os.path.join(dossier, 'cv.pdf')
+    with open(cv_path, 'wb') as f:
+        f.write(b"%PDF-1.4\n% CV de benchmark\n")
+    db_path = os.path.join(dossier, 'users.db')
+    db = UserDatabase(db_path)
+    db.create_user(EMAIL_BENCHMARK, "Bench", "Mark", cv_path, cv_path,
+                   search_query="Développeur Web", location="Ile de France", contract_type="CDI")
+    db.close()
+    return db_path
+
+
+def afficher_rapport(rapport):
+    """Affiche le rapport du benchmark."""
+    print("\n========== BENCHMARK LOCAL ==========")
+    print(f"Durée totale          : {rapport['duree']:.1f}s")
+    print(f"Offres découvertes    : {rapport['decouvertes']}")
+    print(f"Offres traitées       : {rapport['traitees']}")
+    print(f"Débit                 : {rapport['offres_par_minute']:.2f} offres/minute")
+    print(f"Candidatures envoyées : {rapport['envoyees']} (reçues par le serveur : {rapport['serveur']['candidatures']})")
+    print(f"Taux de succès        : {rapport['taux_succes']:.0%}")
+    print(f"Redémarrages          : {rapport['redemarrages']}")
+    print(f"Échecs injectés       : {rapport['serveur']['echecs_injectes']} / {rapport['serveur']['requetes']} requêtes")
+    print("Temps par étape :")
+    for etape, mesure in rapport['etapes'].items():
+        print(f"  - {etape:<15} {mesure['total']:>8.1f}s  ({mesure['passages']} passages, {mesure['moyenne']:.2f}s/passage)")
+
+
+def lancer_benchmark(args):
+    """Exécute une session complète contre le faux serveur et retourne le rapport."""
+    serveur = FauxIquesta(nb_offres=args.offres, latence=args.latence, gigue=args.gigue,
+                          taux_echec=args.taux_echec, graine=args.graine)
+    url_base = serveur.demarrer()
+    with tempfile.TemporaryDirectory(prefix="iquesta_bench_") as dossier:
+        db_path = preparer_base(dossier)
+        import iquesta_scraper
+        # Le scraper recharge .env (override) à l'import : la configuration
+        # du benchmark est donc appliquée après l'import
+        os.environ['DATABASE_PATH'] = db_path
+        os.environ['IQUESTA_URL'] = url_base
+        # Délais appris sur le serveur local gardés dans le dossier temporaire :
+        # ils ne doivent pas servir aux sessions contre iquesta.com
+        os.environ['ADAPTIVE_TIMEOUTS_FILE'] = os.path.join(dossier, 'delais.json')
+        iquesta_scraper.URL_ACCUEIL = url_base
+
+        argv = ['--email', EMAIL_BENCHMARK, '--pipeline', args.pipeline, '--workers', str(args.workers)]
+        if not args.fenetre:
+            argv.append('--headless')
+        try:
+            resume = iquesta_scraper.main(argv) or {}
+        finally:
+            serveur.arreter()
+
+    duree = resume.get('duree', 0.0)
+    traitees = resume.get('traitees', 0)
+    return {
+        'parametres': vars(args),
+        'duree': duree,
+        'decouvertes': resume.get('decouvertes', 0),
+        'traitees': traitees,
+        'envoyees': resume.get('envoyees', 0),
+        'redemarrages': resume.get('redemarrages', 0),
+        'offres_par_minute': (traitees + resume.get('deja_postule', 0)) * 60 / duree if duree else 0.0,
+        'taux_succes': resume.get('envoyees', 0) / traitees if traitees else 0.0,
+        'etapes': resume.get('etapes', {}),
+        'serveur': dict(serveur.stats),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du scraper contre un faux iQuesta local.")
+    parser.add_argument('--offres', type=int, default=15, help="Nombre d'offres publiées par le serveur local.")
+    parser.add_argument('--latence', type=float, default=0.2, help="Latence fixe par requête (secondes).")
+    parser.add_argument('--gigue', type=float, default=0.1, help="Latence aléatoire supplémentaire maximale (secondes).")
+    parser.add_argument('--taux-echec', type=float, default=0.0, help="Probabilité qu'une requête retourne 503.")
+    parser.add_argument('--graine', type=int, default=42, help="Graine aléatoire du serveur.")
+    parser.add_argument('--pipeline', choices=['sequentiel', 'async'], default='sequentiel')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--fenetre', action='store_true', help="Affiche Chrome (headless par défaut).")
+    parser.add_argument('--json', metavar='FICHIER', help="Écrit le rapport JSON dans FICHIER pour comparaison avant/après.")
+    args = parser.parse_args()
+
+    rapport = lancer_benchmark(args)
+    afficher_rapport(rapport)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+        print(f"\nRapport écrit dans {args.json}")
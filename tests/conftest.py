@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Mêmes imports que les scripts : racine du projet (database) et dossier scraper
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'scraper'))
+
+import pytest
+
+from database.user_database import UserDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    base = UserDatabase(str(tmp_path / 'users.db'))
+    base.create_user('test@example.com', 'Jean', 'Test', '/tmp/cv.pdf', '/tmp/lm.pdf', 'développeur', 'Paris')
+    yield base
+    base.close()
+
+
+@pytest.fixture
+def user_id(db):
+    return db.get_user_by_email('test@example.com')['id']
@@ -0,0 +1,14 @@
+import os
+
+import artefacts
+
+
+def test_une_session_par_appel(tmp_path, monkeypatch):
+    monkeypatch.setenv('ARTIFACTS_DIR', str(tmp_path))
+    premiere = artefacts.nouvelle_session()
+    dossier = artefacts.dossier_artefacts()
+    seconde = artefacts.nouvelle_session()
+    assert premiere != seconde
+    assert os.path.basename(dossier) == premiere
+    assert artefacts.dossier_artefacts() != dossier
+    assert str(os.getpid()) in seconde
@@ -0,0 +1,112 @@
+import multiprocessing
+import time
+
+import budget
+from budget import FENETRE_COUTS, BudgetSession
+
+
+def test_illimite():
+    b = BudgetSession()
+    assert b.offres_restantes() is None
+    assert not b.epuise()
+    assert not b.serre(1000)
+    assert b.reserver()
+    assert b.etat() == 'illimité'
+
+
+def test_plafond_de_candidatures():
+    b = BudgetSession(candidatures_max=2)
+    assert b.reserver() and b.reserver()
+    assert not b.reserver()
+    assert b.epuise()
+    b.liberer()
+    assert b.offres_restantes() == 1
+    assert b.reserver()
+
+
+def test_serre_selon_les_offres_en_attente():
+    b = BudgetSession(candidatures_max=3)
+    assert not b.serre(3)
+    assert b.serre(4)
+
+
+def test_cout_mesure_sur_la_fenetre_recente():
+    b = BudgetSession(cout_initial=60)
+    assert b.cout_offre() == 60
+    for _ in range(FENETRE_COUTS):
+        b.observer(100)
+    for _ in range(FENETRE_COUTS):
+        b.observer(10)
+    assert b.cout_offre() == 10
+
+
+def test_offres_qui_tiennent_dans_le_temps(monkeypatch):
+    horloge = [1000.0]
+    monkeypatch.setattr(budget.time, 'time', lambda: horloge[0])
+    b = BudgetSession(duree_max=100, cout_initial=20, marge=0.25)
+    # 100 s restantes, 25 s par offre marge comprise
+    assert b.offres_restantes() == 4
+    horloge[0] += 80
+    assert b.offres_restantes() == 0
+    assert b.epuise()
+
+
+def test_plafond_et_temps_combines(monkeypatch):
+    monkeypatch.setattr(budget.time, 'time', lambda: 1000.0)
+    b = BudgetSession(duree_max=1000, candidatures_max=2, cout_initial=10, marge=0)
+    assert b.offres_restantes() == 2
+
+
+def test_echeance_reelle():
+    avant = time.time()
+    b = BudgetSession(duree_max=60)
+    assert avant + 60 <= b.echeance <= time.time() + 60
+
+
+def _reserver(b, n, resultats):
+    resultats.put(sum(b.reserver() for _ in range(n)))
+
+
+def test_plafond_partage_entre_processus():
+    ctx = multiprocessing.get_context('spawn')
+    b = BudgetSession(candidatures_max=5).partager(ctx)
+    resultats = ctx.Queue()
+    processus = [ctx.Process(target=_reserver, args=(b, 4, resultats)) for _ in range(3)]
+    for p in processus:
+        p.start()
+    total = sum(resultats.get(timeout=30) for _ in processus)
+    for p in processus:
+        p.join()
+    assert total == 5
+    assert b.epuise()
+
+
+# --- Offres différées sous budget serré ---
+
+PRIORITES = {'a': 0.9, 'b': 0.2, 'c': 0.7, 'd': 0.1}
+
+
+def test_differer_sans_contrainte_garde_l_ordre():
+    b = BudgetSession(candidatures_max=10)
+    assert b.differer(['b', 'a', 'c'], PRIORITES) == (['b', 'a', 'c'], [])
+
+
+def test_differer_garde_les_plus_pertinentes():
+    b = BudgetSession(candidatures_max=2)
+    a_traiter, differees = b.differer(['b', 'a', 'd', 'c'], PRIORITES)
+    assert a_traiter == ['a', 'c']
+    assert differees == ['b', 'd']
+
+
+def test_offre_sans_score_passe_apres_les_offres_classees():
+    b = BudgetSession(candidatures_max=2)
+    a_traiter, differees = b.differer(['file', 'd', 'a'], PRIORITES)
+    assert a_traiter == ['a', 'd']
+    assert differees == ['file']
+
+
+def test_plafond_partage_entre_voies():
+    b = BudgetSession(candidatures_max=5)
+    assert b.offres_restantes(voies=2) == 3
+    assert b.serre(4, voies=2)
+    assert len(b.differer(['a', 'b', 'c', 'd'], PRIORITES, voies=2)[0]) == 3
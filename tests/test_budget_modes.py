@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+import queue
+
+import pytest
+
+pytest.importorskip('selenium')
+
+import iquesta_scraper
+import pipeline_async
+import pool_navigateurs
+from budget import BudgetSession
+from database.user_database import UserDatabase
+from driver_watchdog import SuperviseurDriver
+from mesures import ChronoEtapes
+
+# Offres remises en file (sans score) en tête, comme le fait completer_avec_file
+LIENS = ['https://www.iquesta.com/offre/file'] + [f"https://www.iquesta.com/offre/{i}" for i in range(5)]
+PRIORITES = {f"https://www.iquesta.com/offre/{i}": score for i, score in enumerate((0.3, 0.9, 0.1, 0.8, 0.2))}
+# Plafond de 2 candidatures : seules les deux offres les plus pertinentes sont traitées
+RETENUES = ['https://www.iquesta.com/offre/1', 'https://www.iquesta.com/offre/3']
+
+
+class FauxDriver:
+    current_window_handle = 'principale'
+    title = 'iQuesta'
+
+    def __init__(self):
+        self.current_url = 'about:blank'
+
+    def set_page_load_timeout(self, delai):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+
+    def quit(self):
+        pass
+
+
+def extraire(driver, url):
+    driver.get(url)
+    return {'Lien': url, 'Titre': url, 'Entreprise': 'ACME', 'Lieu': 'Paris', 'Description': url}
+
+
+def postuler(driver, user_data):
+    return True
+
+
+def verifier(db, user_id, restants, envoyees):
+    assert envoyees == len(RETENUES)
+    assert sorted(restants) == sorted(set(LIENS) - set(RETENUES))
+    assert all(db.check_if_applied(user_id, lien) for lien in RETENUES)
+    assert not any(db.check_if_applied(user_id, lien) for lien in restants)
+
+
+def test_mode_sequentiel(db, user_id, monkeypatch):
+    monkeypatch.setattr(iquesta_scraper, 'ouvrir_offre', extraire)
+    monkeypatch.setattr(iquesta_scraper, 'verifier_et_postuler', postuler)
+    superviseur = SuperviseurDriver(FauxDriver)
+    superviseur.demarrer()
+    resume = {'decouvertes': 0, 'traitees': 0, 'deja_postule': 0, 'doublons': 0, 'envoyees': 0, 'echecs': 0}
+    restants = iquesta_scraper.traiter_offres_sequentiel(
+        superviseur, LIENS, db.get_user_by_email('test@example.com'), db, resume, ChronoEtapes(),
+        BudgetSession(candidatures_max=2), priorites=PRIORITES)
+    verifier(db, user_id, restants, resume['envoyees'])
+
+
+def test_mode_async(db, user_id, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_async, 'verifier_et_postuler', postuler)
+    pipeline = pipeline_async.PipelineCandidatures(
+        db.get_user_by_email('test@example.com'), str(tmp_path / 'users.db'), FauxDriver, None,
+        decouvrir=lambda driver: list(LIENS), extraire=extraire,
+        budget=BudgetSession(candidatures_max=2), priorites=PRIORITES)
+    resume = asyncio.run(pipeline.executer())
+    verifier(db, user_id, pipeline.restants, resume['envoyees'])
+
+
+def test_mode_processus(db, user_id, tmp_path, monkeypatch):
+    monkeypatch.setattr(pool_navigateurs, 'verifier_et_postuler', postuler)
+    monkeypatch.setattr(UserDatabase, 'observateur', None)
+    resultats = queue.Queue()
+    seau = pool_navigateurs.SeauJetons(6000, ctx=multiprocessing.get_context())
+    # Une part dans ce processus, comme un travailleur
+    pool_navigateurs._travailleur(0, LIENS, db.get_user_by_email('test@example.com'), str(tmp_path / 'users.db'),
+                                  seau, FauxDriver, lambda driver: None, extraire, 300, resultats,
+                                  BudgetSession(candidatures_max=2), priorites=PRIORITES)
+    resume = resultats.get_nowait()
+    verifier(db, user_id, resume['restants'], resume['envoyees'])
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from delais_adaptatifs import OBSERVATIONS_MIN, PolitiqueDelais, percentile
+
+
+def politique(tmp_path, site='www.iquesta.com'):
+    return PolitiqueDelais(str(tmp_path / 'delais.json'), percentile=0.95, marge=0.5, plancher=1.0, plafond=60.0, site=site)
+
+
+def test_percentile():
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([1, 2, 3, 4, 5], 1.0) == 5
+    assert percentile([1.0, 2.0], 0.5) == pytest.approx(1.5)
+
+
+def test_delai_par_defaut_sans_observations_suffisantes(tmp_path):
+    delais = politique(tmp_path)
+    for _ in range(OBSERVATIONS_MIN - 1):
+        delais.observer('cookies', 0.2)
+    assert delais.delai('cookies', 5) == 5
+
+
+def test_delai_appris_borne(tmp_path):
+    delais = politique(tmp_path)
+    for _ in range(OBSERVATIONS_MIN):
+        delais.observer('rapide', 0.1)
+        delais.observer('lent', 4.0)
+        delais.observer('tres_lent', 100.0)
+    assert delais.delai('rapide', 5) == 1.0
+    assert delais.delai('lent', 5) == pytest.approx(6.0)
+    assert delais.delai('tres_lent', 5) == 60.0
+
+
+def test_selecteur_jamais_trouve_au_plancher(tmp_path):
+    delais = politique(tmp_path)
+    for _ in range(OBSERVATIONS_MIN):
+        delais.observer('repli', 10, abouti=False)
+    assert delais.delai('repli', 10) == 1.0
+
+
+def test_observations_rangees_par_site(tmp_path):
+    local = politique(tmp_path, site='127.0.0.1:8765')
+    for _ in range(OBSERVATIONS_MIN):
+        local.observer('cookies', 0.01)
+    local.enregistrer()
+    assert politique(tmp_path).delai('cookies', 5) == 5
+    assert politique(tmp_path, site='127.0.0.1:8765').delai('cookies', 5) == 1.0
+
+
+def test_fichier_sans_site_ignore(tmp_path):
+    (tmp_path / 'delais.json').write_text(json.dumps({'cookies': {'durees': [0.01] * 20, 'succes': 20, 'expirations': 0}}))
+    delais = politique(tmp_path)
+    assert delais.delai('cookies', 5) == 5
+    for _ in range(OBSERVATIONS_MIN):
+        delais.observer('cookies', 2.0)
+    delais.enregistrer()
+    contenu = json.loads((tmp_path / 'delais.json').read_text())
+    assert list(contenu) == ['www.iquesta.com']
@@ -0,0 +1,129 @@
+import pytest
+
+import disjoncteur
+from disjoncteur import FERME, OBSERVATIONS_MIN, OUVERT, Disjoncteur, fusionner_bilans, surveiller
+
+
+def nouveau(**options):
+    reglages = dict(taux_erreur_max=0.5, latence_max=20.0, pause_initiale=0.01, pause_max=0.04)
+    reglages.update(options)
+    return Disjoncteur(**reglages)
+
+
+@pytest.fixture
+def sante(monkeypatch):
+    instance = nouveau()
+    monkeypatch.setattr(disjoncteur, '_sante', instance)
+    return instance
+
+
+def test_reste_ferme_sous_le_minimum_d_observations():
+    d = nouveau()
+    for _ in range(OBSERVATIONS_MIN - 1):
+        d.observer(False)
+    assert d.ferme()
+
+
+def test_ouvert_par_le_taux_d_erreur():
+    d = nouveau()
+    for succes in (True, False, True, False):
+        d.observer(succes)
+    assert d.etat == OUVERT
+    assert d.ouvertures == 1
+
+
+def test_ouvert_par_la_latence_mediane():
+    d = nouveau(latence_max=1.0)
+    for duree in (0.5, 3.0, 4.0, 5.0):
+        d.observer_chargement(duree)
+    assert d.etat == OUVERT
+
+
+def test_inactif_ignore_les_observations():
+    d = nouveau(actif=False)
+    for _ in range(10):
+        d.observer(False)
+    assert d.ferme()
+    assert d.patienter(lambda: None)
+
+
+def test_sonde_reussie_referme():
+    d = nouveau()
+    for _ in range(OBSERVATIONS_MIN):
+        d.observer(False)
+    sondes = []
+    assert d.patienter(lambda: sondes.append(1))
+    assert d.etat == FERME
+    assert sondes == [1]
+    # Fenêtre vidée : les erreurs de la panne ne rouvrent pas le disjoncteur
+    d.observer(False)
+    assert d.ferme()
+
+
+def test_sonde_en_echec_double_la_pause():
+    d = nouveau()
+    for _ in range(OBSERVATIONS_MIN):
+        d.observer(False)
+    essais = []
+
+    def sonde():
+        essais.append(1)
+        if len(essais) < 3:
+            raise RuntimeError("503")
+
+    assert d.patienter(sonde)
+    assert len(essais) == 3
+    assert d.ouvertures == 3
+    assert d.ouvertures_consecutives == 0
+    assert d.pause_totale == pytest.approx(0.01 + 0.02 + 0.04, abs=0.05)
+
+
+def test_pause_au_dela_de_l_echeance():
+    d = nouveau(pause_initiale=60, pause_max=60)
+    for _ in range(OBSERVATIONS_MIN):
+        d.observer(False)
+    assert not d.patienter(lambda: None, echeance=0)
+    assert d.etat == OUVERT
+
+
+def test_surveiller_ignore_les_refus_metier(sante):
+    @surveiller('candidature')
+    def postuler():
+        # Pas de formulaire, candidature externe...
+        return False
+
+    for _ in range(10):
+        assert postuler() is False
+    assert sante.ferme()
+    assert list(sante.resultats) == [True] * 10
+
+
+def test_surveiller_compte_les_exceptions(sante):
+    @surveiller('ouverture')
+    def ouvrir():
+        raise TimeoutError("page bloquée")
+
+    for _ in range(OBSERVATIONS_MIN):
+        with pytest.raises(TimeoutError):
+            ouvrir()
+    assert sante.etat == OUVERT
+
+
+def test_statut_http():
+    class Driver:
+        def __init__(self, valeur):
+            self.valeur = valeur
+
+        def execute_script(self, script):
+            if isinstance(self.valeur, Exception):
+                raise self.valeur
+            return self.valeur
+
+    assert disjoncteur.statut_http(Driver(503)) == 503
+    assert disjoncteur.statut_http(Driver(0)) is None
+    assert disjoncteur.statut_http(Driver(None)) is None
+    assert disjoncteur.statut_http(Driver(RuntimeError())) is None
+
+
+def test_fusionner_bilans():
+    assert fusionner_bilans([{'ouvertures': 1, 'pause': 30.0}, {'ouvertures': 2, 'pause': 12.5}, {}]) == {'ouvertures': 3, 'pause': 42.5}
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+pytest.importorskip('selenium')
+
+import driver_watchdog
+from driver_watchdog import SuperviseurDriver
+
+
+class DriverBloque:
+    """Driver dont chaque commande reste bloquée, comme un chromedriver figé."""
+
+    current_window_handle = 'principale'
+
+    @property
+    def title(self):
+        time.sleep(30)
+
+    def quit(self):
+        time.sleep(30)
+
+
+class DriverSain:
+    current_window_handle = 'principale'
+    title = 'iQuesta'
+
+    def quit(self):
+        pass
+
+
+def test_est_vivant_borne_pour_un_driver_bloque(monkeypatch):
+    monkeypatch.setattr(driver_watchdog, 'DELAI_SONDE', 0.2)
+    superviseur = SuperviseurDriver(fabrique=DriverBloque)
+    superviseur.driver = DriverBloque()
+    debut = time.monotonic()
+    assert not superviseur.est_vivant()
+    assert time.monotonic() - debut < 2
+
+
+def test_est_vivant_pour_un_driver_sain():
+    superviseur = SuperviseurDriver(fabrique=DriverSain)
+    superviseur.driver = DriverSain()
+    assert superviseur.est_vivant()
+
+
+def test_fermeture_bornee_pour_un_driver_bloque(monkeypatch):
+    monkeypatch.setattr(driver_watchdog, 'DELAI_SONDE', 0.2)
+    superviseur = SuperviseurDriver(fabrique=DriverBloque)
+    superviseur.driver = DriverBloque()
+    debut = time.monotonic()
+    superviseur.fermer()
+    assert superviseur.driver is None
+    assert time.monotonic() - debut < 2
+
+
+def test_mesure_memoire_espacee(monkeypatch):
+    mesures = []
+    monkeypatch.setattr(driver_watchdog, 'rss_navigateur', lambda driver: mesures.append(driver) or 100.0)
+    superviseur = SuperviseurDriver(fabrique=DriverSain, memoire_max_mo=500)
+    superviseur.driver = DriverSain()
+    for _ in range(10):
+        assert superviseur.nouvelle_offre()
+    assert len(mesures) == 1
+    monkeypatch.setattr(driver_watchdog, 'INTERVALLE_MESURE_MEMOIRE', 0)
+    superviseur.nouvelle_offre()
+    assert len(mesures) == 2
+
+
+def test_recyclage_sur_seuil_memoire(monkeypatch):
+    monkeypatch.setattr(driver_watchdog, 'rss_navigateur', lambda driver: 800.0)
+    superviseur = SuperviseurDriver(fabrique=DriverSain, memoire_max_mo=500)
+    superviseur.driver = DriverSain()
+    superviseur.nouvelle_offre()
+    assert superviseur.recyclages == 1
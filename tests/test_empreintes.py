@@ -0,0 +1,67 @@
+import random
+
+from empreintes import DISTANCE_DEFAUT, distance_hamming, empreinte_offre, simhash
+
+VOCABULAIRE = [f"terme{i}" for i in range(3000)]
+POIDS = [1 / (rang + 1) for rang in range(len(VOCABULAIRE))]
+
+
+def texte(alea, nb_mots):
+    # Fréquences de Zipf, comme les mots d'une langue
+    return alea.choices(VOCABULAIRE, weights=POIDS, k=nb_mots)
+
+
+def modifier(alea, mots, nb_changes):
+    mots = list(mots)
+    for indice in alea.sample(range(len(mots)), nb_changes):
+        mots[indice] = alea.choice(VOCABULAIRE)
+    return mots
+
+
+def distance(a, b):
+    return distance_hamming(simhash(' '.join(a)), simhash(' '.join(b)))
+
+
+def test_texte_vide():
+    assert simhash('') is None
+    assert empreinte_offre(None, None, None) is None
+
+
+def test_empreinte_identique():
+    assert empreinte_offre('Développeur Python', 'ACME', 'Poste à Paris') == empreinte_offre('Développeur Python', 'ACME', 'Poste à Paris')
+
+
+def test_offre_republiee_sous_le_seuil():
+    alea = random.Random(1)
+    distances = []
+    for _ in range(200):
+        mots = texte(alea, 300)
+        distances.append(distance(mots, modifier(alea, mots, 5)))
+    proches = sum(d <= DISTANCE_DEFAUT for d in distances) / len(distances)
+    assert proches >= 0.95, sorted(distances)
+
+
+def test_offre_courte_republiee_sous_le_seuil():
+    alea = random.Random(2)
+    distances = []
+    for _ in range(200):
+        mots = texte(alea, 80)
+        distances.append(distance(mots, modifier(alea, mots, 2)))
+    proches = sum(d <= DISTANCE_DEFAUT for d in distances) / len(distances)
+    assert proches >= 0.9, sorted(distances)
+
+
+def test_offres_distinctes_sur_le_meme_gabarit():
+    # Deux offres partageant la moitié de leur texte (présentation de l'entreprise)
+    alea = random.Random(3)
+    for _ in range(200):
+        gabarit = texte(alea, 150)
+        assert distance(gabarit + texte(alea, 150), gabarit + texte(alea, 150)) > DISTANCE_DEFAUT
+
+
+def test_offres_independantes():
+    alea = random.Random(4)
+    distances = sorted(distance(texte(alea, 300), texte(alea, 300)) for _ in range(200))
+    assert distances[0] > DISTANCE_DEFAUT
+    # Environ la moitié des 64 bits diffèrent
+    assert 28 <= distances[len(distances) // 2] <= 36
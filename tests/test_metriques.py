@@ -0,0 +1,49 @@
+import metriques
+from metriques import Compteur, Histogramme, Jauge, Registre
+
+
+def test_compter_alimente_le_resume_et_le_compteur():
+    resume = {'envoyees': 0}
+    avant = dict(metriques.candidatures_envoyees.echantillons()).get((), 0)
+    metriques.compter(resume, 'envoyees')
+    metriques.compter(resume, 'envoyees', 2)
+    assert resume['envoyees'] == 3
+    assert dict(metriques.candidatures_envoyees.echantillons())[()] == avant + 3
+    assert 'iquesta_candidatures_envoyees_total' in metriques.registre.texte()
+
+
+def test_fusion_des_echantillons_d_un_travailleur():
+    def registre():
+        r = Registre()
+        r.ajouter(Compteur('c_total', 'compteur', labels=('type',)))
+        r.ajouter(Histogramme('h_secondes', 'histogramme', bornes=(1, 5)))
+        r.ajouter(Jauge('j', 'jauge'))
+        return r
+
+    principal, travailleur = registre(), registre()
+    principal.metriques[0].inc(type='a')
+    principal.metriques[1].observe(0.5)
+    travailleur.metriques[0].inc(2, type='a')
+    travailleur.metriques[0].inc(type='b')
+    travailleur.metriques[1].observe(3)
+    travailleur.metriques[2].set(7)
+
+    principal.fusionner(travailleur.echantillons())
+    texte = principal.texte()
+    assert 'c_total{type="a"} 3' in texte
+    assert 'c_total{type="b"} 1' in texte
+    assert 'h_secondes_bucket{le="1"} 1' in texte
+    assert 'h_secondes_bucket{le="5"} 2' in texte
+    assert 'h_secondes_count 2' in texte
+    assert 'j 7' in texte
+
+
+def test_histogramme_cumule():
+    h = Histogramme('h', 'aide', bornes=(1, 2))
+    for valeur in (0.5, 1.5, 3):
+        h.observe(valeur)
+    lignes = list(h.lignes())
+    assert 'h_bucket{le="1"} 1' in lignes
+    assert 'h_bucket{le="2"} 2' in lignes
+    assert 'h_bucket{le="+Inf"} 3' in lignes
+    assert 'h_sum 5.0' in lignes
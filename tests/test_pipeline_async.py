@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('selenium')
+
+import pipeline_async
+from driver_watchdog import SuperviseurDriver
+from pipeline_async import PipelineCandidatures
+
+LIENS = [f"https://www.iquesta.com/offre/{i}" for i in range(6)]
+
+
+class FauxDriver:
+    current_window_handle = 'principale'
+    title = 'iQuesta'
+
+    def __init__(self, chargements):
+        self.chargements = chargements
+        self.current_url = 'about:blank'
+
+    def get(self, url):
+        self.chargements.append(url)
+        self.current_url = url
+
+    def quit(self):
+        pass
+
+
+def extraire(driver, url):
+    driver.get(url)
+    numero = url.rsplit('/', 1)[-1]
+    return {'Lien': url, 'Titre': f"Poste {numero}", 'Entreprise': f"Société {numero}", 'Lieu': 'Paris',
+            'Description': f"Description sans rapport numéro {numero} " * 5}
+
+
+def nouveau_pipeline(db, tmp_path, chargements):
+    user_data = db.get_user_by_email('test@example.com')
+    return PipelineCandidatures(user_data, str(tmp_path / 'users.db'), lambda: FauxDriver(chargements), None,
+                                decouvrir=lambda driver: list(LIENS), extraire=extraire)
+
+
+def test_chaque_offre_chargee_une_seule_fois(db, user_id, tmp_path, monkeypatch):
+    chargements = []
+    candidatures = []
+
+    def postuler(driver, user_data):
+        candidatures.append(driver.current_url)
+        return True
+
+    monkeypatch.setattr(pipeline_async, 'verifier_et_postuler', postuler)
+    pipeline = nouveau_pipeline(db, tmp_path, chargements)
+    resume = asyncio.run(pipeline.executer())
+    assert sorted(chargements) == sorted(LIENS)
+    # Chaque candidature part de la page chargée par l'extraction, dans le même navigateur
+    assert sorted(candidatures) == sorted(LIENS)
+    assert resume['envoyees'] == len(LIENS)
+    assert all(db.check_if_applied(user_id, lien) for lien in LIENS)
+
+
+def test_navigateur_indisponible_remet_les_offres_en_file(db, user_id, tmp_path, monkeypatch):
+    monkeypatch.setattr(SuperviseurDriver, 'nouvelle_offre', lambda self: None)
+    pipeline = nouveau_pipeline(db, tmp_path, [])
+    resume = asyncio.run(pipeline.executer())
+    assert sorted(pipeline.restants) == sorted(LIENS)
+    assert resume['echecs'] == 0
+    assert not any(db.check_if_applied(user_id, lien) for lien in LIENS)
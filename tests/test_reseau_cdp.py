@@ -0,0 +1,34 @@
+import json
+
+import reseau_cdp
+
+
+class FauxDriver:
+    def __init__(self):
+        self.lectures = 0
+
+    def get_log(self, type_journal):
+        self.lectures += 1
+        message = {'message': {'method': 'Network.loadingFailed',
+                               'params': {'blockedReason': 'inspector', 'type': 'Font'}}}
+        return [{'message': json.dumps(message)}]
+
+
+def test_journal_non_relu_par_defaut(monkeypatch):
+    monkeypatch.delenv('NETWORK_REPORT', raising=False)
+    monkeypatch.delenv('NETWORK_TIMINGS_FILE', raising=False)
+    driver = FauxDriver()
+    reseau_cdp.collecter(driver, 'offre')
+    assert driver.lectures == 0
+
+
+def test_rapport_reseau_compte_les_requetes_bloquees(monkeypatch):
+    monkeypatch.setenv('NETWORK_REPORT', '1')
+    reseau_cdp.blocage.reinitialiser()
+    driver = FauxDriver()
+    reseau_cdp.collecter(driver, 'offre')
+    assert driver.lectures == 1
+    bilan = reseau_cdp.bilan()
+    assert bilan['requetes_bloquees'] == 1
+    assert bilan['octets_evites_estimes'] == reseau_cdp.TAILLE_ESTIMEE_PAR_TYPE['Font']
+    reseau_cdp.blocage.reinitialiser()
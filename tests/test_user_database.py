@@ -0,0 +1,152 @@
+import os
+
+from database.user_database import RACINE_PROJET, UserDatabase, chemin_base_de_donnees
+from empreintes import DISTANCE_DEFAUT, empreinte_offre
+
+
+def offre(lien, statut, description="Développement d'applications web en Python et Django pour nos clients"):
+    return {'Lien': lien, 'Titre': 'Développeur Python', 'Entreprise': 'ACME', 'Lieu': 'Paris',
+            'Description': description, 'Statut': statut,
+            'Empreinte': empreinte_offre('Développeur Python', 'ACME', description)}
+
+
+def statut(db, user_id, lien):
+    db.cursor.execute('SELECT status FROM applications WHERE user_id = ? AND job_url = ?', (user_id, lien))
+    return db.cursor.fetchone()['status']
+
+
+# --- Enregistrement des candidatures ---
+
+def test_candidature_envoyee_garde_son_statut(db, user_id):
+    assert db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    for suivant in ('Déjà postulé', 'Doublon', 'Échec candidature'):
+        assert db.record_application(user_id, offre('https://x/1', suivant))
+        assert statut(db, user_id, 'https://x/1') == 'Candidature envoyée'
+
+
+def test_reservation_remplacee_par_le_resultat(db, user_id):
+    assert db.claim_application(user_id, 'https://x/1')
+    assert db.record_application(user_id, offre('https://x/1', 'Échec candidature'))
+    assert statut(db, user_id, 'https://x/1') == 'Échec candidature'
+    assert db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    assert statut(db, user_id, 'https://x/1') == 'Candidature envoyée'
+
+
+def test_echec_conserve_au_passage_suivant(db, user_id):
+    assert db.record_application(user_id, offre('https://x/1', 'Échec candidature'))
+    # Passage suivant : check_if_applied trouve la ligne, l'offre est marquée 'Déjà postulé'
+    assert db.check_if_applied(user_id, 'https://x/1')
+    for suivant in ('Déjà postulé', 'Doublon'):
+        assert db.record_application(user_id, {'Lien': 'https://x/1', 'Statut': suivant})
+        assert statut(db, user_id, 'https://x/1') == 'Échec candidature'
+    db.cursor.execute('SELECT job_title FROM applications WHERE job_url = ?', ('https://x/1',))
+    assert db.cursor.fetchone()['job_title'] == 'Développeur Python'
+
+
+def test_doublon_remplace_une_reservation(db, user_id):
+    assert db.claim_application(user_id, 'https://x/1')
+    assert db.record_application(user_id, offre('https://x/1', 'Doublon'))
+    assert statut(db, user_id, 'https://x/1') == 'Doublon'
+
+
+def test_empreinte_conservee_si_absente(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    db.record_application(user_id, {'Lien': 'https://x/1', 'Statut': 'Déjà postulé'})
+    db.cursor.execute('SELECT simhash FROM applications WHERE job_url = ?', ('https://x/1',))
+    assert db.cursor.fetchone()['simhash'] is not None
+
+
+# --- Offres republiées ---
+
+def test_doublon_apres_un_nouveau_passage(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    # Passage suivant sur la même URL : la candidature doit rester détectable
+    db.record_application(user_id, offre('https://x/1', 'Déjà postulé'))
+    republiee = offre('https://x/2', 'En attente')
+    doublon = db.find_near_duplicate(user_id, republiee['Empreinte'], DISTANCE_DEFAUT, 'https://x/2')
+    assert doublon['job_url'] == 'https://x/1'
+    assert doublon['distance'] == 0
+
+
+def test_doublon_ignore_les_echecs_et_la_meme_url(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Échec candidature'))
+    empreinte = offre('https://x/2', 'En attente')['Empreinte']
+    assert db.find_near_duplicate(user_id, empreinte, DISTANCE_DEFAUT, 'https://x/2') is None
+    db.record_application(user_id, offre('https://x/2', 'Candidature envoyée'))
+    assert db.find_near_duplicate(user_id, empreinte, DISTANCE_DEFAUT, 'https://x/2') is None
+
+
+def test_doublon_desactive(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    empreinte = offre('https://x/2', 'En attente')['Empreinte']
+    assert db.find_near_duplicate(user_id, empreinte, -1, 'https://x/2') is None
+    assert db.find_near_duplicate(user_id, None, DISTANCE_DEFAUT, 'https://x/2') is None
+
+
+def test_offre_differente_non_doublon(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    autre = offre('https://x/2', 'En attente', "Comptable confirmé pour la gestion de la paie et des déclarations fiscales")
+    assert db.find_near_duplicate(user_id, autre['Empreinte'], DISTANCE_DEFAUT, 'https://x/2') is None
+
+
+# --- Réservations des processus travailleurs ---
+
+def test_une_seule_reservation_par_offre(db, user_id):
+    assert db.claim_application(user_id, 'https://x/1')
+    assert not db.claim_application(user_id, 'https://x/1')
+    assert db.check_if_applied(user_id, 'https://x/1')
+
+
+def test_reservation_rendue(db, user_id):
+    db.claim_application(user_id, 'https://x/1')
+    assert db.release_application(user_id, 'https://x/1')
+    assert not db.check_if_applied(user_id, 'https://x/1')
+    assert db.claim_application(user_id, 'https://x/1')
+
+
+def test_liberation_sans_effet_sur_un_resultat(db, user_id):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    assert not db.release_application(user_id, 'https://x/1')
+    assert statut(db, user_id, 'https://x/1') == 'Candidature envoyée'
+
+
+def test_reservations_abandonnees_expirees(db, user_id):
+    db.claim_application(user_id, 'https://x/ancienne')
+    db.claim_application(user_id, 'https://x/recente')
+    db.record_application(user_id, offre('https://x/envoyee', 'Candidature envoyée'))
+    db.cursor.execute("UPDATE applications SET applied_at = datetime('now', '-2 hours') WHERE job_url != 'https://x/recente'")
+    db.conn.commit()
+    assert db.release_stale_claims(user_id, 3600) == 1
+    assert not db.check_if_applied(user_id, 'https://x/ancienne')
+    assert db.check_if_applied(user_id, 'https://x/recente')
+    assert statut(db, user_id, 'https://x/envoyee') == 'Candidature envoyée'
+
+
+# --- Copie pour le rejeu ---
+
+def test_copie_sans_historique(db, user_id, tmp_path):
+    db.record_application(user_id, offre('https://x/1', 'Candidature envoyée'))
+    db.save_offer_queue(user_id, ['https://x/2'])
+    db.start_run(user_id)
+    copie = str(tmp_path / 'rejeu.db')
+    assert db.copy_profiles(copie)
+    rejeu = UserDatabase(copie)
+    try:
+        assert rejeu.get_user_by_email('test@example.com')['id'] == user_id
+        assert not rejeu.check_if_applied(user_id, 'https://x/1')
+        assert rejeu.get_offer_queue(user_id) == []
+        assert rejeu.get_run_history(user_id) == []
+    finally:
+        rejeu.close()
+    assert db.check_if_applied(user_id, 'https://x/1')
+
+
+# --- Chemin de la base ---
+
+def test_chemin_relatif_a_la_racine(monkeypatch):
+    monkeypatch.delenv('DATABASE_PATH', raising=False)
+    assert chemin_base_de_donnees() == os.path.join(RACINE_PROJET, 'database', 'users.db')
+    monkeypatch.setenv('DATABASE_PATH', 'donnees/base.db')
+    assert chemin_base_de_donnees() == os.path.join(RACINE_PROJET, 'donnees', 'base.db')
+    # Un chemin explicite (--db) l'emporte sur DATABASE_PATH
+    assert chemin_base_de_donnees('/tmp/autre.db') == '/tmp/autre.db'